@@ -0,0 +1,153 @@
+"""
+Image Analysis Cache
+Evita pagar uma nova chamada Gemini Vision quando a mesma foto é re-analisada.
+
+Chave: SHA-256 dos bytes decodificados da imagem + versão do prompt de análise
+Camadas: LRU em memória (limitada) -> tabela image_analyses (persistente), ambas com TTL
+Quase-duplicatas (re-compressão, resize, screenshot): dHash + índice de Hamming em memória
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from database import db as database
+from image_hashing import phash_index, hex_to_hash, PHASH_MAX_DISTANCE
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '256'))
+ANALYSIS_CACHE_TTL = int(os.environ.get('ANALYSIS_CACHE_TTL', str(7 * 24 * 3600)))  # segundos
+
+
+def hash_image_bytes(data: bytes) -> str:
+    """SHA-256 of the decoded image bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class AnalysisCache:
+    """LRU + TTL em memória na frente da tabela image_analyses"""
+
+    def __init__(self, max_entries: int = ANALYSIS_CACHE_SIZE, ttl: int = ANALYSIS_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.similar_hits = 0
+
+    async def get(self, digest: str, prompt_version: str) -> Optional[Dict[str, Any]]:
+        """Return the cached analysis dict or None"""
+        key = (digest, prompt_version)
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, analysis = entry
+            if time.time() - stored_at < self.ttl:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return analysis
+            del self._entries[key]
+
+        min_timestamp = (datetime.now(timezone.utc) - timedelta(seconds=self.ttl)).isoformat()
+        row = await database.get_cached_image_analysis(digest, prompt_version, min_timestamp)
+        if row:
+            analysis = json.loads(row['analysis'])
+            stored_at = datetime.fromisoformat(row['timestamp']).timestamp()
+            self._remember(key, analysis, stored_at)
+            self.db_hits += 1
+            return analysis
+
+        self.misses += 1
+        return None
+
+    async def get_similar(self, phash: int, prompt_version: str) -> Optional[Dict[str, Any]]:
+        """Nearest stored analysis within PHASH_MAX_DISTANCE bits: {analysis_id, distance, analysis}"""
+        min_timestamp = (datetime.now(timezone.utc) - timedelta(seconds=self.ttl)).isoformat()
+
+        for analysis_id, distance in phash_index.search(phash):
+            row = await database.get_image_analysis(analysis_id)
+            if not row or row.get('phash') is None:
+                # Apagada da galeria ou invalidada
+                phash_index.remove(analysis_id)
+                continue
+            if row.get('prompt_version') != prompt_version or row['timestamp'] < min_timestamp:
+                continue
+
+            self.similar_hits += 1
+            return {
+                "analysis_id": analysis_id,
+                "distance": distance,
+                "analysis": json.loads(row['analysis'])
+            }
+        return None
+
+    async def load_phash_index(self, prompt_version: str):
+        """Rebuild the in-memory Hamming index from image_analyses (startup)"""
+        phash_index.clear()
+        for row in await database.get_image_phashes(prompt_version):
+            phash_index.add(row['id'], hex_to_hash(row['phash']))
+        logger.info(f"🔎 Perceptual hash index loaded ({len(phash_index)} images, max distance {PHASH_MAX_DISTANCE})")
+
+    def put(
+        self,
+        digest: str,
+        prompt_version: str,
+        analysis: Dict[str, Any],
+        analysis_id: Optional[str] = None,
+        phash: Optional[int] = None
+    ):
+        """Store in memory (the persistent row is written by the analyze endpoint)"""
+        self._remember((digest, prompt_version), analysis, time.time())
+        if analysis_id and phash is not None:
+            phash_index.add(analysis_id, phash)
+
+    def _remember(self, key: Tuple[str, str], analysis: Dict[str, Any], stored_at: float):
+        self._entries[key] = (stored_at, analysis)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def invalidate(self, digest: Optional[str] = None) -> Dict[str, int]:
+        """Drop one image (or everything) from both layers"""
+        if digest:
+            keys = [key for key in self._entries if key[0] == digest]
+        else:
+            keys = list(self._entries)
+        for key in keys:
+            del self._entries[key]
+
+        analysis_ids = await database.invalidate_cached_image_analyses(digest)
+        if digest:
+            for analysis_id in analysis_ids:
+                phash_index.remove(analysis_id)
+        else:
+            phash_index.clear()
+
+        logger.info(f"🧹 Analysis cache invalidated ({digest or 'all'}): {len(keys)} memory, {len(analysis_ids)} stored")
+        return {"memory_entries": len(keys), "stored_entries": len(analysis_ids)}
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.db_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "similar_hits": self.similar_hits,  # subconjunto dos misses exatos
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "phash_index_size": len(phash_index)
+        }
+
+
+# Instância global
+analysis_cache = AnalysisCache()
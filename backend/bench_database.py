@@ -0,0 +1,84 @@
+"""
+Micro-benchmark: per-call aiosqlite.connect vs pooled Database connections
+Usage: python bench_database.py [n_inserts] [concurrency]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+import aiosqlite
+
+from database import Database
+
+
+def _usage_doc():
+    return {
+        "id": str(uuid.uuid4()),
+        "service": "fal_ai",
+        "operation": "video_generation_veo3",
+        "cost": 1.6,
+        "details": {"duration": 8},
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+
+async def _insert_per_call(db_path: str, data: dict):
+    """Previous behavior: new connection for every insert"""
+    async with aiosqlite.connect(db_path) as db:
+        await db.execute('''
+            INSERT INTO token_usage (id, service, operation, cost, details, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (data['id'], data['service'], data['operation'], data['cost'], None, data['timestamp']))
+        await db.commit()
+
+
+async def _run(label: str, insert, n: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await insert(_usage_doc())
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:<12} {n / elapsed:>10.0f} inserts/s   p50 {p50:7.2f} ms   p99 {p99:7.2f} ms")
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print("=" * 70)
+        print(f"SQLite insert benchmark ({n} inserts, concurrency {concurrency})")
+        print("=" * 70)
+
+        legacy_path = os.path.join(tmp, "legacy.db")
+        legacy = Database(legacy_path)
+        await legacy.init_db()
+        await legacy.close()
+        async with aiosqlite.connect(legacy_path) as db:
+            # Comportamento anterior: journal padrão (rollback), sem WAL
+            await db.execute('PRAGMA journal_mode=DELETE')
+        await _run("per-call", lambda d: _insert_per_call(legacy_path, d), n, concurrency)
+
+        pooled = Database(os.path.join(tmp, "pooled.db"))
+        await pooled.init_db()
+        await _run("pooled", pooled.insert_token_usage, n, concurrency)
+        await pooled.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""
+Benchmark: /gallery/items (SELECT * x3) vs /gallery/feed (projection + keyset cursor)
+Usage: python bench_gallery.py [rows_per_type] [audio_kb]
+"""
+import asyncio
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from database import Database
+
+
+async def _seed(db: Database, rows: int, audio_kb: int):
+    now = datetime.now(timezone.utc)
+    audio_url = "data:audio/mpeg;base64," + base64.b64encode(os.urandom(audio_kb * 1024)).decode()
+    analysis = json.dumps({"description": "x" * 1500, "prompt_veo3": "y" * 1500, "prompt_sora2": "z" * 1500})
+
+    for i in range(rows):
+        ts = (now - timedelta(seconds=i)).isoformat()
+        await db.insert_video_generation({
+            "id": str(uuid.uuid4()), "image_id": "https://example.com/image.jpg", "model": "veo3",
+            "prompt": "p" * 1000, "duration": 8, "cost": 0.6, "status": "completed",
+            "result_url": "https://example.com/video.mp4", "timestamp": ts
+        })
+        await db.insert_audio_generation({
+            "id": str(uuid.uuid4()), "audio_url": audio_url, "source": "generated", "duration": 4.0,
+            "text": "t" * 300, "voice_id": "cgSgspJ2msm6clMCkdW9", "cost": 0.09, "timestamp": ts
+        })
+        await db.insert_image_analysis({
+            "id": str(uuid.uuid4()), "image_url": "base64://uploaded_image", "analysis": analysis,
+            "suggested_model": "veo3", "timestamp": ts
+        })
+
+
+async def _measure(label: str, fetch, runs: int = 20):
+    timings = []
+    payload = b""
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = await fetch()
+        payload = json.dumps(result).encode()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"{label:<28} payload {len(payload) / 1024:>10.1f} KB   p50 {timings[len(timings) // 2] * 1000:8.2f} ms")
+
+
+async def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    audio_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        await db.init_db()
+        print(f"Seeding {rows} rows per type ({audio_kb} KB audio each)...")
+        await _seed(db, rows, audio_kb)
+
+        print("=" * 70)
+
+        async def legacy():
+            return {
+                "videos": await db.get_video_generations(status="completed", limit=100),
+                "audios": await db.get_audio_generations(limit=100),
+                "images": await db.get_image_analyses(limit=100)
+            }
+
+        await _measure("gallery/items (legacy)", legacy)
+        await _measure("gallery/feed first page", lambda: db.get_gallery_feed(limit=50))
+
+        # Página profunda: cursor no meio da tabela
+        page = await db.get_gallery_feed(limit=50)
+        for _ in range(rows // 50):
+            next_page = await db.get_gallery_feed(cursor=(page[-1]["timestamp"], page[-1]["id"]), limit=50)
+            if not next_page:
+                break
+            page = next_page
+        cursor = (page[-1]["timestamp"], page[-1]["id"])
+        await _measure("gallery/feed deep page", lambda: db.get_gallery_feed(cursor=cursor, limit=50))
+
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
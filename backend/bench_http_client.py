@@ -0,0 +1,112 @@
+"""
+Benchmark: shared keep-alive HTTP client vs. one connection per download
+Sobe um servidor HTTP/1.1 local que conta as conexões TCP aceitas e simula o custo do
+handshake TCP+TLS de uma rede real (atraso antes de atender cada conexão nova).
+Usage: python bench_http_client.py [downloads] [concurrency] [size_kb] [handshake_ms]
+"""
+import asyncio
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import requests
+
+from http_client import SharedHttpClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    body = b""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+    handshake = 0.0
+
+    def process_request_thread(self, request, client_address):
+        time.sleep(self.handshake)
+        super().process_request_thread(request, client_address)
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+def _start_server(size: int, handshake_ms: float) -> _CountingServer:
+    _Handler.body = bytes(range(256)) * (size // 256)
+    server = _CountingServer(("127.0.0.1", 0), _Handler)
+    server.handshake = handshake_ms / 1000
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def _run(label, server, downloads, concurrency, fetch):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            t0 = time.perf_counter()
+            await fetch()
+            latencies.append(time.perf_counter() - t0)
+
+    server.connections = 0
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(downloads)))
+    total = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{label:<34} {server.connections:>6} conns {total:>7.2f}s  p50 {p50:7.2f} ms  p99 {p99:7.2f} ms")
+
+
+async def main():
+    downloads = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    size_kb = int(sys.argv[3]) if len(sys.argv) > 3 else 256
+    handshake_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 30
+
+    server = _start_server(size_kb * 1024, handshake_ms)
+    url = f"http://127.0.0.1:{server.server_address[1]}/image.jpg"
+    print(f"{downloads} downloads of {size_kb} KB, concurrency {concurrency}, simulated handshake {handshake_ms:.0f} ms")
+    print("=" * 90)
+
+    loop = asyncio.get_running_loop()
+
+    async def legacy_requests():
+        # Antes: requests.get síncrono (nova conexão a cada chamada), numa thread do executor
+        await loop.run_in_executor(None, lambda: requests.get(url).content)
+
+    async def new_client_per_call():
+        async with httpx.AsyncClient() as client:
+            (await client.get(url)).content
+
+    shared = SharedHttpClient()
+
+    async def shared_client():
+        await shared.fetch_bytes(url)
+
+    await _run("requests.get per call (executor)", server, downloads, concurrency, legacy_requests)
+    await _run("httpx.AsyncClient per call", server, downloads, concurrency, new_client_per_call)
+    await _run("shared client (keep-alive pool)", server, downloads, concurrency, shared_client)
+
+    await shared.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""
+Benchmark: image work on the event loop vs. in the image worker pool (image_worker.py)
+Dispara N uploads base64 simultâneos (decode + verify + dHash) e mede, ao mesmo tempo, o atraso
+de um "request qualquer" (um sleep de 1 ms no mesmo loop) - é a latência que os outros clientes sentem.
+Usage: python bench_image_worker.py [uploads] [megapixels]
+"""
+import io
+import sys
+import time
+import base64
+import asyncio
+
+import numpy as np
+from PIL import Image
+
+from image_worker import ImageWorkerPool, inspect_base64_image
+
+
+def _payload(megapixels: float) -> str:
+    side = int((megapixels * 1e6) ** 0.5)
+    pixels = (np.random.rand(side, side, 3) * 255).astype('uint8')
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, 'JPEG', quality=90)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+async def _probe_loop(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def _run(label: str, uploads: int, payload: str, inspect):
+    stop = asyncio.Event()
+    lags: list = []
+    probe = asyncio.create_task(_probe_loop(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(inspect(payload) for _ in range(uploads)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0
+    print(f"{label:<22} {elapsed * 1000:>8.0f} ms total   loop lag max {max(lags or [0]) * 1000:>7.1f} ms   "
+          f"p99 {p99 * 1000:>7.1f} ms")
+
+
+async def main():
+    uploads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    megapixels = float(sys.argv[2]) if len(sys.argv) > 2 else 4
+    payload = _payload(megapixels)
+    print(f"{uploads} concurrent uploads, {megapixels} MP JPEG ({len(payload) / 1e6:.1f} MB base64)")
+    print("=" * 90)
+
+    async def on_loop(data):
+        return inspect_base64_image(data)
+
+    await _run("on the event loop", uploads, payload, on_loop)
+
+    pool = ImageWorkerPool()
+    await pool.start()
+    try:
+        await _run(f"worker pool ({pool.workers} procs)", uploads, payload, pool.inspect_base64)
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
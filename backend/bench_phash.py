@@ -0,0 +1,100 @@
+"""
+Benchmark: perceptual hash robustness + multi-index Hamming lookup vs. linear scan
+Usage: python bench_phash.py [stored_images]
+"""
+import io
+import random
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from image_hashing import MultiIndexHashIndex, PHASH_MAX_DISTANCE, dhash, hamming_distance
+
+
+def _encode(image: Image.Image, quality: int = 92) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def _robustness():
+    """Distance between a photo and its re-encoded/resized/blurred variants"""
+    rng = np.random.default_rng(42)
+    # Gradiente + ruído de baixa frequência: imita uma foto real
+    base = np.linspace(0, 255, 1024)[None, :] * np.linspace(0.3, 1.0, 768)[:, None]
+    blobs = np.kron(rng.integers(0, 90, (12, 16)), np.ones((64, 64)))
+    pixels = np.clip(base + blobs, 0, 255).astype(np.uint8)
+    original = Image.fromarray(np.stack([pixels, pixels[::-1], pixels[:, ::-1]], axis=-1))
+
+    reference = dhash(_encode(original))
+    variants = {
+        "JPEG quality 40": _encode(original, 40),
+        "resized 50%": _encode(original.resize((512, 384))),
+        "screenshot-like (PNG, 800px)": _png(original.resize((800, 600))),
+        "slight blur": _encode(original.filter(ImageFilter.GaussianBlur(1.5))),
+        "different image": _encode(original.transpose(Image.Transpose.ROTATE_180)),
+    }
+    print("Robustness (Hamming distance, 64 bits):")
+    for label, data in variants.items():
+        print(f"  {label:<30} {hamming_distance(reference, dhash(data)):>3}")
+
+
+def _png(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _flip_bits(value: int, bits: int) -> int:
+    for position in random.sample(range(64), bits):
+        value ^= 1 << position
+    return value
+
+
+def main():
+    stored = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    random.seed(7)
+
+    _robustness()
+    print("=" * 60)
+
+    hashes = [random.getrandbits(64) for _ in range(stored)]
+    index = MultiIndexHashIndex()
+    start = time.perf_counter()
+    for n, value in enumerate(hashes):
+        index.add(str(n), value)
+    print(f"Indexed {stored} hashes in {time.perf_counter() - start:.2f}s (max distance {PHASH_MAX_DISTANCE})")
+
+    queries = [_flip_bits(random.choice(hashes), random.randint(0, PHASH_MAX_DISTANCE)) for _ in range(500)]
+    queries += [random.getrandbits(64) for _ in range(500)]
+
+    def timed(search):
+        timings, results = [], []
+        for query in queries:
+            t0 = time.perf_counter()
+            results.append(search(query))
+            timings.append(time.perf_counter() - t0)
+        timings.sort()
+        return timings, results
+
+    mih_timings, mih_results = timed(index.search)
+    linear_timings, linear_results = timed(lambda q: sorted(
+        ((str(n), d) for n, value in enumerate(hashes) if (d := hamming_distance(value, q)) <= PHASH_MAX_DISTANCE),
+        key=lambda match: match[1]
+    ))
+
+    same = all(
+        sorted(a, key=lambda m: (m[1], m[0])) == sorted(b, key=lambda m: (m[1], m[0]))
+        for a, b in zip(mih_results, linear_results)
+    )
+    for label, timings in (("multi-index", mih_timings), ("linear scan", linear_timings)):
+        p50 = timings[len(timings) // 2] * 1000
+        p99 = timings[int(len(timings) * 0.99)] * 1000
+        print(f"{label:<12} p50 {p50:8.3f} ms   p99 {p99:8.3f} ms")
+    print(f"Results identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+"""
+Benchmark + identity check: prompt_sanitizer vs. the legacy per-request sanitizers
+Usage: python bench_sanitizer.py [fuzz_iterations]
+
+The legacy functions below are verbatim copies of the nested sanitizers that used to
+live in server.generate_video / server.analyze_image; every output of the new engine
+must be identical to theirs.
+"""
+import copy
+import random
+import sys
+import time
+
+from prompt_sanitizer import sanitize_analysis, sanitize_prompt
+
+
+# ==================== LEGACY (reference) ====================
+
+def legacy_sanitize_prompt(prompt):
+    """Remove ALL potentially problematic content that triggers FAL.AI and Google Veo filters"""
+    import re
+
+    # STEP 1: Remove ALL mentions of facial fidelity/identity/preservation
+    # These trigger DEEPFAKE DETECTION in all services
+    fidelity_removal_patterns = [
+        r'\[Manter[^\]]*\]',  # Remove all [Manter...] blocks
+        r'\[.*?identidade.*?\]',  # Any block mentioning identity
+        r'\[.*?fidelidade.*?\]',  # Any block mentioning fidelity
+        r'\[.*?NÃO DEVEM.*?\]',  # Any block with NÃO DEVEM
+        r'\[.*?preserv.*?\]',  # Any block mentioning preserve
+        r'[Mm]anter.*?identidade[^.]*\.',  # Sentences about maintaining identity
+        r'[Pp]reserv.*?fidelidade[^.]*\.',  # Sentences about preserving fidelity
+        r'[Ee]xata.*?semelhança[^.]*\.',  # Exact likeness
+        r'[Ii]dentidade.*?visual[^.]*\.',  # Visual identity
+        r'[Cc]aracterísticas.*?físicas[^.]*?mantidas[^.]*?\.',  # Physical characteristics maintained
+        r'[^.]*?expressões faciais[^.]*?fidelidade[^.]*?\.',  # Any sentence with facial expressions + fidelity
+        r'[Aa]s expressões faciais devem ser preservadas[^.]*?\.',  # Specific phrase
+        r'com alta fidelidade',  # Remove "with high fidelity" mentions
+        r'devem ser preservadas[^.]*?fidelidade[^.]*?',  # Must be preserved with fidelity
+        r'alta fidelidade[^.]*?',  # Remove "high fidelity"
+        r'[^.]*?preservadas com alta fidelidade[^.]*?\.',  # Preserved with high fidelity sentence
+        r'expressões faciais[^.]*?alta fidelidade[^.]*?\.',  # Facial expressions with high fidelity
+        r'[Ss]emelhança.*?exata.*?',  # Exact similarity
+        r'100%.*?(identidade|fidelidade|semelhança)',  # 100% identity/fidelity/likeness
+    ]
+
+    sanitized = prompt
+    for pattern in fidelity_removal_patterns:
+        sanitized = re.sub(pattern, '', sanitized, flags=re.IGNORECASE | re.DOTALL)
+
+    # STEP 2: Replace VIOLENT and GRAPHIC content words
+    violence_replacements = [
+        (r'ameaçador(a|amente|es)?', 'impressionante'),
+        (r'assustador(a|es)?', 'surpreendente'),
+        (r'violento?(a|amente|s)?', 'intenso'),
+        (r'afiado?(a|s)?', 'visível'),
+        (r'ataca(r|ndo|m)?', 'aproxima'),
+        (r'ataque', 'aproximação'),
+        (r'medo', 'admiração'),
+        (r'terror', 'impacto'),
+        (r'pânico', 'intensidade'),
+        (r'perigoso?(a|s)?', 'impressionante'),
+        (r'sangue', 'efeito visual dramático'),
+        (r'sangrento?(a|s)?', 'dramático'),
+        (r'mort(e|o|a|os|as)', 'drama'),
+        (r'morre(r|ndo|u|m)?', 'desaparece'),
+        (r'mata(r|ndo|m|ram)?', 'neutraliza'),
+        (r'agressiv(o|a|amente|os|as)', 'energétic'),
+        (r'ferimento', 'marca dramática'),
+        (r'ferido?(a|s)?', 'afetado'),
+        (r'ferir', 'impactar'),
+        (r'tortura', 'tensão extrema'),
+        (r'mutilação', 'transformação'),
+        (r'brutal(idade)?', 'intenso'),
+    ]
+
+    for pattern, replacement in violence_replacements:
+        sanitized = re.sub(pattern, replacement, sanitized, flags=re.IGNORECASE)
+
+    # STEP 3: Replace WEAPONS mentions (contextual)
+    weapons_replacements = [
+        (r'\barma\b', 'objeto cênico'),
+        (r'\barmas\b', 'objetos cênicos'),
+        (r'\bfaca\b', 'objeto metálico'),
+        (r'\bfacas\b', 'objetos metálicos'),
+        (r'\bespada\b', 'lâmina cênica'),
+        (r'\bpistola\b', 'objeto de cena'),
+        (r'\brevólver\b', 'objeto de cena'),
+    ]
+
+    for pattern, replacement in weapons_replacements:
+        sanitized = re.sub(pattern, replacement, sanitized, flags=re.IGNORECASE)
+
+    # STEP 4: Replace EXPLICIT content (if any slips through)
+    explicit_replacements = [
+        (r'\bnu\b', 'natural'),
+        (r'\bnua\b', 'natural'),
+        (r'\bnudez\b', 'naturalidade'),
+        (r'\bdespido?(a|s)?\b', 'simples'),
+    ]
+
+    for pattern, replacement in explicit_replacements:
+        sanitized = re.sub(pattern, replacement, sanitized, flags=re.IGNORECASE)
+
+    # STEP 5: Replace ILLEGAL ACTIVITIES
+    illegal_replacements = [
+        (r'\bdroga\b', 'substância'),
+        (r'\bdrogas\b', 'substâncias'),
+    ]
+
+    for pattern, replacement in illegal_replacements:
+        sanitized = re.sub(pattern, replacement, sanitized, flags=re.IGNORECASE)
+
+    # STEP 6: Clean up extra spaces and formatting
+    sanitized = re.sub(r'\s+', ' ', sanitized)  # Multiple spaces to single
+    sanitized = re.sub(r'\.\s*\.', '.', sanitized)  # Double periods
+    sanitized = re.sub(r'\s+([,.])', r'\1', sanitized)  # Space before punctuation
+    sanitized = sanitized.strip()
+
+    return sanitized
+
+
+def legacy_sanitize_analysis_prompts(data):
+    """Clean all prompts in analysis data - Remove content policy violations"""
+
+    # 1. VIOLÊNCIA E CONTEÚDO GRÁFICO
+    violence_words = {
+        'ameaçador': 'impressionante',
+        'ameaçadora': 'impressionante',
+        'ameaçadoramente': 'majestosamente',
+        'assustador': 'surpreendente',
+        'assustadora': 'surpreendente',
+        'violento': 'intenso',
+        'violenta': 'intensa',
+        'violentamente': 'intensamente',
+        'afiados': 'visíveis',
+        'afiado': 'visível',
+        'afiada': 'visível',
+        'ataque': 'aproximação',
+        'atacar': 'se aproximar',
+        'atacando': 'se aproximando',
+        'medo': 'admiração',
+        'terror': 'impacto',
+        'pânico': 'intensidade',
+        'sangue': 'efeito visual dramático',
+        'morte': 'drama',
+        'morrer': 'desaparecer',
+        'morto': 'imóvel',
+        'matar': 'neutralizar',
+        'agressiv': 'energétic',
+        'ferimento': 'marca dramática',
+        'ferido': 'afetado',
+        'ferir': 'impactar',
+        'tortura': 'tensão extrema',
+        'mutilação': 'transformação dramática',
+        'brutal': 'intenso',
+        'sangrento': 'dramático',
+        'arma': 'objeto cênico',
+        'armas': 'objetos cênicos',
+        'faca': 'objeto metálico',
+        'facas': 'objetos metálicos',
+        'espada': 'lâmina cênica',
+        'pistola': 'objeto de cena',
+        'revólver': 'objeto de cena',
+    }
+
+    # 2. CONTEÚDO SEXUAL/EXPLÍCITO (adicional)
+    explicit_words = {
+        'nu': 'sem adornos',
+        'nua': 'natural',
+        'nudez': 'naturalidade',
+        'despido': 'simples',
+        'sensual': 'elegante',
+    }
+
+    # 3. DEEPFAKE E IDENTIDADE (já coberto nos patterns abaixo)
+
+    # 4. DISCURSO DE ÓDIO (prevenção)
+    hate_speech_words = {
+        'odiar': 'desgostar',
+        'ódio': 'antipatia',
+    }
+
+    # 5. ATIVIDADES ILEGAIS
+    illegal_words = {
+        'droga': 'substância',
+        'drogas': 'substâncias',
+        'cocaína': 'pó branco',
+        'maconha': 'erva',
+    }
+
+    # Combinar todos os dicionários
+    problematic_words = {
+        **violence_words,
+        **explicit_words,
+        **hate_speech_words,
+        **illegal_words
+    }
+
+    # Clean all string fields recursively
+    def clean_text(text):
+        if not isinstance(text, str):
+            return text
+        cleaned = text
+
+        # Remove problematic words
+        for word, replacement in problematic_words.items():
+            cleaned = cleaned.replace(word, replacement)
+
+        # Remove facial fidelity instructions (triggers deepfake detection)
+        import re
+        fidelity_patterns = [
+            r'\[Manter a identidade facial.*?\]',
+            r'\[.*?NÃO DEVEM ser alterados.*?\]',
+            r'\[.*?preservando 100%.*?\]',
+            r'Manter a identidade facial.*?características físicas\.',
+            r'Os rostos.*?NÃO DEVEM.*?substituídos\.',
+            r'preservando 100% da fidelidade.*?\.'
+        ]
+
+        for pattern in fidelity_patterns:
+            cleaned = re.sub(pattern, '', cleaned, flags=re.IGNORECASE | re.DOTALL)
+
+        # Clean up extra spaces
+        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+
+        return cleaned
+
+    def clean_dict(d):
+        if isinstance(d, dict):
+            return {k: clean_dict(v) for k, v in d.items()}
+        elif isinstance(d, list):
+            return [clean_dict(item) for item in d]
+        elif isinstance(d, str):
+            return clean_text(d)
+        return d
+
+    return clean_dict(data)
+
+
+# ==================== INPUTS ====================
+
+REALISTIC = [
+    "Gato malhado laranja levantando a cabeça lentamente, orelhas se movendo em atenção. Medium shot com lente 35mm.",
+    "[Manter a identidade facial e características físicas da pessoa] Mulher sorrindo para a câmera. Lente 85mm.",
+    "Um leão ameaçador ataca a presa com dentes afiados, sangue na grama. Terror e pânico na savana.",
+    "As expressões faciais devem ser preservadas com alta fidelidade. Homem caminhando na praia ao pôr do sol.",
+    "Personagem com arma e faca, cena de tortura brutal e morte violenta. Close-up dramático.",
+    "Preservando 100% da fidelidade facial. Manter identidade visual exata. Semelhança exata com a foto original.",
+    "Os rostos NÃO DEVEM ser alterados ou substituídos. Criança brincando no parque, wide shot, luz natural.",
+    "Características físicas devem ser mantidas. Expressões faciais com alta fidelidade e detalhe.  Cena  calma ..",
+]
+
+FRAGMENTS = [
+    "[", "]", ".", ". ", "  ", "\n", ",", " , ", "100%", "%",
+    "Manter", "manter", "MANTER", "[Manter", "identidade", "IDENTIDADE", "fidelidade", "Fidelidade",
+    "NÃO DEVEM", "não devem", "preserv", "preservadas", "Preservando 100%", "preservando 100% da fidelidade",
+    "exata", "Exata", "semelhança", "visual", "características", "físicas", "mantidas",
+    "expressões faciais", "Expressões Faciais", "As expressões faciais devem ser preservadas",
+    "com alta fidelidade", "alta fidelidade", "devem ser preservadas", "preservadas com alta fidelidade",
+    "Os rostos", "substituídos", "ser alterados", "características físicas",
+    "ameaçador", "ameaçadora", "ameaçadoramente", "assustador", "violento", "violenta", "violentamente",
+    "afiado", "afiados", "ataca", "atacar", "atacando", "ataque", "taque", "medo", "terror", "pânico",
+    "perigoso", "sangue", "sangrento", "morte", "morto", "mortos", "morrer", "matar", "mata", "agressivo",
+    "agressivamente", "agressiv", "ferimento", "ferido", "ferir", "tortura", "mutilação", "brutal",
+    "brutalidade", "arma", "armas", "faca", "facas", "espada", "pistola", "revólver", "nu", "nua", "nudez",
+    "despido", "despida", "droga", "drogas", "sensual", "odiar", "ódio", "cocaína", "maconha",
+    "ta", "ca", "ar", "ma", "que", "a", "o", "s", "e", "de", "lente 50mm", "gato", "cena", "luz",
+    "İDENTİDADE", "ıdentıdade", "ſangue", "MORTE", "Nudez",
+]
+
+
+def random_prompt(rng: random.Random, pieces: int) -> str:
+    return "".join(
+        rng.choice(FRAGMENTS) + (" " if rng.random() < 0.5 else "")
+        for _ in range(pieces)
+    )
+
+
+def adversarial_prompts(size: int = 10_000):
+    """10 KB inputs that make the legacy lazy/DOTALL patterns backtrack"""
+    return {
+        "realistic x N": (" ".join(REALISTIC) * (size // 600 + 1))[:size],
+        "clean prose": ("Gato sentado olhando para cima com curiosidade, luz suave de janela. " * 200)[:size],
+        "'[' flood + identidade": "[" * (size - 10) + "identidade",
+        "no-dot expressões faciais": ("expressões faciais " * (size // 19))[:size],
+        "no-dot sentence": ("palavra " * (size // 8))[:size] + " preservadas com alta fidelidade",
+        "características chain": ("características físicas " * (size // 25))[:size],
+        "100% flood": "100%" * (size // 4),
+        "semelhança flood": ("semelhança " * (size // 11))[:size],
+    }
+
+
+# ==================== CHECKS ====================
+
+def check_identity(iterations: int) -> bool:
+    rng = random.Random(1234)
+    inputs = list(REALISTIC)
+    inputs += [random_prompt(rng, rng.randint(1, 40)) for _ in range(iterations)]
+
+    for text in inputs:
+        expected = legacy_sanitize_prompt(text)
+        actual = sanitize_prompt(text)
+        if expected != actual:
+            print(f"[ERROR] video mismatch\n  input:    {text!r}\n  legacy:   {expected!r}\n  new:      {actual!r}")
+            return False
+
+        data = {"prompt": text, "nested": [text, {"tips": text[::-1]}], "count": 3}
+        expected = legacy_sanitize_analysis_prompts(copy.deepcopy(data))
+        actual = sanitize_analysis(copy.deepcopy(data))
+        if expected != actual:
+            print(f"[ERROR] analysis mismatch\n  input:    {text!r}\n  legacy:   {expected!r}\n  new:      {actual!r}")
+            return False
+
+    print(f"[OK] Outputs identical on {len(inputs)} prompts (video + analysis)")
+    return True
+
+
+def _time(fn, text, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn(text)
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def benchmark():
+    print(f"{'input (10 KB)':<28} {'legacy ms':>12} {'engine ms':>12} {'speedup':>9}")
+    for label, text in adversarial_prompts().items():
+        legacy = _time(legacy_sanitize_prompt, text, 1)
+        engine = _time(sanitize_prompt, text, 20)
+        assert legacy_sanitize_prompt(text) == sanitize_prompt(text), label
+        print(f"{label:<28} {legacy:>12.2f} {engine:>12.3f} {legacy / engine:>8.0f}x")
+
+    analysis = {"prompt_veo3": REALISTIC[2] * 20, "prompt_sora2": REALISTIC[5] * 20,
+                "cinematic_details": {"camera_work": REALISTIC[0], "style": REALISTIC[3]}}
+    legacy = _time(lambda d: legacy_sanitize_analysis_prompts(copy.deepcopy(d)), analysis, 50)
+    engine = _time(lambda d: sanitize_analysis(copy.deepcopy(d)), analysis, 50)
+    print(f"{'analysis dict':<28} {legacy:>12.2f} {engine:>12.3f} {legacy / engine:>8.0f}x")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    print("=" * 66)
+    ok = check_identity(iterations)
+    print("=" * 66)
+    if ok:
+        benchmark()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
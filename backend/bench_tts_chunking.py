@@ -0,0 +1,125 @@
+"""
+Benchmark: one TTS call vs. parallel sentence-chunked synthesis
+A síntese é simulada com latência proporcional ao tamanho do texto (como na ElevenLabs)
+e devolve frames MP3 válidos (128 kbps, 44.1 kHz), para validar a junção sem re-encode.
+Usage: python bench_tts_chunking.py [chars] [ms_per_100_chars] [concurrency] [failure_rate]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from mp3_frames import audio_frames_span, join_mp3, parse_frame_header
+from provider_scheduler import ProviderLimiter
+from retry_policy import RetryBudget, RetryPolicy
+from tts_chunker import TtsChunker, split_tts_text
+
+_FRAME = b'\xff\xfb\x90\x00' + b'\x00' * 413          # MPEG1 Layer III, 128 kbps, 44.1 kHz
+_INFO_FRAME = b'\xff\xfb\x90\x00' + b'\x00' * 32 + b'Info' + b'\x00' * 377
+_ID3 = b'ID3\x04\x00\x00\x00\x00\x00\x0a' + b'\x00' * 10
+
+_SENTENCES = [
+    "O sol nasceu devagar sobre a cidade.",
+    "Ninguém esperava que a chuva voltasse tão cedo!",
+    "Ela abriu a janela e ouviu o barulho da feira.",
+    "Quantas histórias cabem numa única rua?",
+    "O velho livreiro sorriu; sabia a resposta.",
+]
+
+
+class _ServerError(Exception):
+    status_code = 503
+
+
+def _make_text(chars: int) -> str:
+    paragraphs, paragraph, size = [], [], 0
+    while size < chars:
+        sentence = random.choice(_SENTENCES)
+        paragraph.append(sentence)
+        size += len(sentence) + 1
+        if len(paragraph) == 6:
+            paragraphs.append(" ".join(paragraph))
+            paragraph = []
+    paragraphs.append(" ".join(paragraph))
+    return "\n\n".join(p for p in paragraphs if p)
+
+
+def _frames(data: bytes) -> int:
+    offset, count = 0, 0
+    while offset < len(data):
+        header = parse_frame_header(data, offset)
+        assert header, f"broken frame at {offset}"
+        offset += header.frame_length
+        count += 1
+    return count
+
+
+def _fake_synth(
+    ms_per_100: float,
+    failure_rate: float,
+    calls: list,
+    limiter: ProviderLimiter = None,
+    retry: RetryPolicy = None
+):
+    async def call(text):
+        calls.append(len(text))
+        await asyncio.sleep(0.05 + len(text) / 100 * ms_per_100 / 1000)
+        if random.random() < failure_rate:
+            raise _ServerError("503 Service Unavailable")
+        # ~1 frame por 10 caracteres, com ID3 + Info frame como um encoder real
+        return _ID3 + _INFO_FRAME + _FRAME * max(1, len(text) // 10)
+
+    async def synth(text, previous_text, next_text):
+        if limiter is None:
+            return await call(text)
+        # Como no server: cada parte ocupa um slot "elevenlabs" do scheduler e é repetida pelo retry_policy
+        await limiter.acquire("premium", shed=False)
+        start = time.monotonic()
+        try:
+            return await retry.run(lambda: call(text))
+        finally:
+            limiter.release(time.monotonic() - start)
+    return synth
+
+
+async def main():
+    chars = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    ms_per_100 = float(sys.argv[2]) if len(sys.argv) > 2 else 30
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    failure_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 0.1
+
+    random.seed(42)
+    text = _make_text(chars)
+    chunks = split_tts_text(text)
+    assert all(len(c) <= 1000 for c in chunks)
+    assert " ".join(" ".join(chunks).split()) == " ".join(text.split()), "chunking lost text"
+    print(f"{len(text)} chars -> {len(chunks)} chunks, {ms_per_100:.0f} ms/100 chars, "
+          f"concurrency {concurrency}, failure rate {failure_rate:.0%}")
+    print("=" * 80)
+
+    # Antes: uma chamada só com o texto inteiro (uma falha perde tudo)
+    calls = []
+    start = time.perf_counter()
+    single = await _fake_synth(ms_per_100, 0.0, calls)(text, None, None)
+    print(f"{'single call':<28} {time.perf_counter() - start:>7.2f}s  {len(calls):>3} calls")
+
+    for slots in (1, 2, concurrency, concurrency * 2):
+        calls = []
+        chunker = TtsChunker()
+        limiter = ProviderLimiter("elevenlabs", slots, 0, 1)
+        retry = RetryPolicy("elevenlabs", 6, 0.01, 0.01, 60, 0, budget=RetryBudget(1.0, 60))
+        start = time.perf_counter()
+        audio = await chunker.synthesize(text, _fake_synth(ms_per_100, failure_rate, calls, limiter, retry))
+        elapsed = time.perf_counter() - start
+
+        assert audio_frames_span(audio) == (0, len(audio))
+        expected = sum(max(1, len(c) // 10) for c in chunks)
+        assert _frames(audio) == expected, "frames lost while joining"
+        print(f"{f'chunked, {slots} slots':<28} {elapsed:>7.2f}s  {len(calls):>3} calls "
+              f"({retry.retries} retries)")
+
+    assert _frames(join_mp3([single])) == max(1, len(text) // 10)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
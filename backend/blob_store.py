@@ -0,0 +1,357 @@
+"""
+Content-addressed Blob Store
+Armazena bytes por SHA-256; as tabelas guardam só a referência blob://<sha256>
+
+Backends:
+- local: filesystem com shards (ab/cd/<sha256>)
+- s3: qualquer storage S3-compatível (AWS S3, MinIO local para testes)
+"""
+
+import os
+import re
+import json
+import asyncio
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Iterator, Optional
+
+# boto3 é opcional - só precisa se BLOB_BACKEND=s3
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+BLOB_BACKEND = os.environ.get('BLOB_BACKEND', 'local')
+BLOB_DIR = os.environ.get('BLOB_DIR', str(Path(__file__).parent / 'blobs'))
+BLOB_S3_BUCKET = os.environ.get('BLOB_S3_BUCKET', '')
+BLOB_S3_PREFIX = os.environ.get('BLOB_S3_PREFIX', 'blobs/')
+BLOB_S3_ENDPOINT_URL = os.environ.get('BLOB_S3_ENDPOINT_URL')  # ex: http://localhost:9000 (MinIO)
+BLOB_S3_REGION = os.environ.get('BLOB_S3_REGION', 'us-east-1')
+
+BLOB_REF_PREFIX = "blob://"
+READ_CHUNK_SIZE = 256 * 1024
+
+_DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+_BLOB_URL_RE = re.compile(r'/api/blobs/([0-9a-f]{64})$')
+
+
+def is_valid_digest(digest: str) -> bool:
+    return bool(_DIGEST_RE.match(digest or ''))
+
+
+def blob_ref(digest: str) -> str:
+    """Short reference stored in the database"""
+    return f"{BLOB_REF_PREFIX}{digest}"
+
+
+def parse_blob_ref(value: Optional[str]) -> Optional[str]:
+    """Return the digest for a blob://<sha256> reference or a /api/blobs/<sha256> URL"""
+    if not value:
+        return None
+
+    if value.startswith(BLOB_REF_PREFIX):
+        digest = value[len(BLOB_REF_PREFIX):]
+        return digest if is_valid_digest(digest) else None
+
+    match = _BLOB_URL_RE.search(value)
+    return match.group(1) if match else None
+
+
+class BlobInfo:
+    """Metadata of a stored blob"""
+    def __init__(self, digest: str, size: int, content_type: str):
+        self.digest = digest
+        self.size = size
+        self.content_type = content_type
+
+    @property
+    def ref(self) -> str:
+        return blob_ref(self.digest)
+
+    def to_dict(self):
+        return {
+            "digest": self.digest,
+            "size": self.size,
+            "content_type": self.content_type
+        }
+
+
+class BlobSpool:
+    """Incremental blob writer: chunks go to a temp file while the SHA-256 is computed
+
+    Usado para uploads em streaming - o corpo nunca fica inteiro em memória.
+    """
+
+    def __init__(self, store: "BlobStore"):
+        self.store = store
+        self.size = 0
+        self._hash = hashlib.sha256()
+        spool_dir = store.spool_dir()
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=spool_dir, prefix='.spool-')
+        self._file = os.fdopen(fd, 'wb')
+
+    def _write(self, chunk: bytes):
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    async def write(self, chunk: bytes):
+        self.size += len(chunk)
+        await asyncio.get_event_loop().run_in_executor(None, self._write, chunk)
+
+    def _commit(self, content_type: str) -> BlobInfo:
+        self._file.close()
+        return self.store.put_file(self.path, self._hash.hexdigest(), self.size, content_type)
+
+    async def commit(self, content_type: str) -> BlobInfo:
+        """Move the spooled bytes into the store (dedupe by hash) and return the blob"""
+        try:
+            return await asyncio.get_event_loop().run_in_executor(None, self._commit, content_type)
+        finally:
+            self.discard()
+
+    def discard(self):
+        """Drop the temp file (no-op after a successful commit)"""
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class BlobStore:
+    """Interface comum dos backends (métodos sync + wrappers async)"""
+
+    name = "base"
+
+    def put_bytes(self, data: bytes, content_type: str) -> BlobInfo:
+        raise NotImplementedError
+
+    def put_file(self, path: str, digest: str, size: int, content_type: str) -> BlobInfo:
+        """Store a spooled file whose digest is already known (the file is consumed)"""
+        raise NotImplementedError
+
+    def spool_dir(self) -> Path:
+        return Path(tempfile.gettempdir())
+
+    def open_spool(self) -> BlobSpool:
+        return BlobSpool(self)
+
+    def stat(self, digest: str) -> Optional[BlobInfo]:
+        raise NotImplementedError
+
+    def iter_range(self, digest: str, start: int, end: int) -> Iterator[bytes]:
+        """Yield bytes [start, end] (inclusive) in chunks"""
+        raise NotImplementedError
+
+    def delete(self, digest: str) -> bool:
+        raise NotImplementedError
+
+    def read_bytes(self, digest: str) -> bytes:
+        info = self.stat(digest)
+        if not info:
+            raise FileNotFoundError(f"Blob not found: {digest}")
+        if info.size == 0:
+            return b""
+        return b"".join(self.iter_range(digest, 0, info.size - 1))
+
+    # Async wrappers (I/O de disco/rede fora do event loop)
+    async def put(self, data: bytes, content_type: str) -> BlobInfo:
+        return await asyncio.get_event_loop().run_in_executor(None, self.put_bytes, data, content_type)
+
+    async def get_info(self, digest: str) -> Optional[BlobInfo]:
+        return await asyncio.get_event_loop().run_in_executor(None, self.stat, digest)
+
+    async def read(self, digest: str) -> bytes:
+        return await asyncio.get_event_loop().run_in_executor(None, self.read_bytes, digest)
+
+
+class LocalBlobStore(BlobStore):
+    """Filesystem backend: <root>/ab/cd/<sha256> + <sha256>.json (metadata)"""
+
+    name = "local"
+
+    def __init__(self, root: str = BLOB_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def put_bytes(self, data: bytes, content_type: str) -> BlobInfo:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        info = BlobInfo(digest, len(data), content_type)
+
+        # Conteúdo idêntico já armazenado (dedupe por hash)
+        if path.exists():
+            return info
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._atomic_write(path.with_name(digest + '.json'), json.dumps(info.to_dict()).encode())
+        self._atomic_write(path, data)
+        return info
+
+    def spool_dir(self) -> Path:
+        # Mesmo filesystem dos shards: o commit é um rename atômico
+        return self.root / '.spool'
+
+    def put_file(self, path: str, digest: str, size: int, content_type: str) -> BlobInfo:
+        target = self._path(digest)
+        info = BlobInfo(digest, size, content_type)
+
+        if target.exists():
+            os.unlink(path)
+            return info
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        self._atomic_write(target.with_name(digest + '.json'), json.dumps(info.to_dict()).encode())
+        os.replace(path, target)
+        return info
+
+    def _atomic_write(self, path: Path, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def stat(self, digest: str) -> Optional[BlobInfo]:
+        path = self._path(digest)
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return None
+
+        content_type = "application/octet-stream"
+        meta_path = path.with_name(digest + '.json')
+        if meta_path.exists():
+            content_type = json.loads(meta_path.read_bytes()).get('content_type', content_type)
+
+        return BlobInfo(digest, size, content_type)
+
+    def iter_range(self, digest: str, start: int, end: int) -> Iterator[bytes]:
+        with open(self._path(digest), 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, digest: str) -> bool:
+        path = self._path(digest)
+        if not path.exists():
+            return False
+        path.unlink()
+        meta_path = path.with_name(digest + '.json')
+        if meta_path.exists():
+            meta_path.unlink()
+        return True
+
+
+class S3BlobStore(BlobStore):
+    """S3-compatible backend (AWS S3 ou MinIO via BLOB_S3_ENDPOINT_URL)"""
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str = BLOB_S3_BUCKET,
+        prefix: str = BLOB_S3_PREFIX,
+        endpoint_url: Optional[str] = BLOB_S3_ENDPOINT_URL,
+        region: str = BLOB_S3_REGION
+    ):
+        if not BOTO3_AVAILABLE:
+            raise RuntimeError("boto3 não instalado. Para usar BLOB_BACKEND=s3, instale: pip install boto3")
+        if not bucket:
+            raise ValueError("BLOB_S3_BUCKET não configurado")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        # Credenciais via AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+
+    def _key(self, digest: str) -> str:
+        return f"{self.prefix}{digest[:2]}/{digest}"
+
+    def put_bytes(self, data: bytes, content_type: str) -> BlobInfo:
+        digest = hashlib.sha256(data).hexdigest()
+        info = BlobInfo(digest, len(data), content_type)
+
+        if self.stat(digest):
+            return info
+
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._key(digest),
+            Body=data,
+            ContentType=content_type
+        )
+        return info
+
+    def put_file(self, path: str, digest: str, size: int, content_type: str) -> BlobInfo:
+        info = BlobInfo(digest, size, content_type)
+        try:
+            if not self.stat(digest):
+                # upload_file faz multipart upload automaticamente para arquivos grandes
+                self.client.upload_file(path, self.bucket, self._key(digest), ExtraArgs={'ContentType': content_type})
+        finally:
+            os.unlink(path)
+        return info
+
+    def stat(self, digest: str) -> Optional[BlobInfo]:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(digest))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return BlobInfo(digest, head['ContentLength'], head.get('ContentType', 'application/octet-stream'))
+
+    def iter_range(self, digest: str, start: int, end: int) -> Iterator[bytes]:
+        response = self.client.get_object(
+            Bucket=self.bucket,
+            Key=self._key(digest),
+            Range=f"bytes={start}-{end}"
+        )
+        body = response['Body']
+        try:
+            for chunk in body.iter_chunks(READ_CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    def delete(self, digest: str) -> bool:
+        if not self.stat(digest):
+            return False
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(digest))
+        return True
+
+
+def create_blob_store() -> BlobStore:
+    """Create the configured backend (BLOB_BACKEND=local|s3)"""
+    if BLOB_BACKEND == 's3':
+        store = S3BlobStore()
+        logger.info(f"🗄️ Blob store: S3 (bucket={store.bucket}, endpoint={BLOB_S3_ENDPOINT_URL or 'aws'})")
+        return store
+
+    store = LocalBlobStore()
+    logger.info(f"🗄️ Blob store: local ({store.root})")
+    return store
+
+
+# Instância global
+blob_store = create_blob_store()
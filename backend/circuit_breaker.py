@@ -0,0 +1,209 @@
+"""
+Circuit Breakers por provider de vídeo
+Quando um provider insiste em devolver 5xx/timeouts, os próximos requests falham na hora
+(ou o video_router passa para o próximo provider) em vez de cada um esperar o timeout inteiro.
+
+- closed: tudo passa; CIRCUIT_FAILURE_THRESHOLD falhas seguidas do provider => open
+- open: CircuitOpenError imediato (HTTP 503 com Retry-After) por CIRCUIT_OPEN_SECONDS
+- half_open: passado o tempo, CIRCUIT_HALF_OPEN_PROBES requests de teste passam;
+  sucesso => closed, falha => open de novo com o dobro do tempo (até CIRCUIT_MAX_OPEN_SECONDS)
+- só falhas do provider contam (provider_errors.classify_exception); erro de conteúdo/parâmetro
+  prova que o provider respondeu e conta como sucesso
+"""
+
+import os
+import math
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from provider_errors import classify_exception
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_OPEN_SECONDS = float(os.environ.get('CIRCUIT_OPEN_SECONDS', '60'))
+CIRCUIT_MAX_OPEN_SECONDS = float(os.environ.get('CIRCUIT_MAX_OPEN_SECONDS', '600'))
+CIRCUIT_HALF_OPEN_PROBES = int(os.environ.get('CIRCUIT_HALF_OPEN_PROBES', '1'))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Provider circuit is open: fail fast (HTTP 503)"""
+
+    def __init__(self, provider: str, retry_after: int):
+        # "service unavailable" => classify_video_error devolve SERVICE_UNAVAILABLE para jobs em segundo plano
+        super().__init__(f"{provider} service unavailable (circuit open after repeated failures), retry in {retry_after}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Estado closed/open/half_open de um provider"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        open_seconds: float = CIRCUIT_OPEN_SECONDS,
+        max_open_seconds: float = CIRCUIT_MAX_OPEN_SECONDS,
+        half_open_probes: int = CIRCUIT_HALF_OPEN_PROBES
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._open_for = open_seconds
+        self._opened_at = 0.0
+        self._probes = 0
+        self.times_opened = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    def _retry_after(self) -> int:
+        remaining = self._opened_at + self._open_for - time.monotonic()
+        return max(1, math.ceil(remaining))
+
+    def _refresh(self):
+        if self.state == OPEN and time.monotonic() >= self._opened_at + self._open_for:
+            self.state = HALF_OPEN
+            self._probes = 0
+            logger.info(f"🟡 Circuit {self.name}: half-open, letting a probe through")
+
+    @property
+    def is_open(self) -> bool:
+        """True while requests would be rejected (open, or half-open with probes in flight)"""
+        self._refresh()
+        return self.state == OPEN or (self.state == HALF_OPEN and self._probes >= self.half_open_probes)
+
+    def check(self):
+        """Raise CircuitOpenError without taking a probe (cheap pre-check before queueing)"""
+        if self.is_open:
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self._retry_after() if self.state == OPEN else 1)
+
+    def allow(self) -> bool:
+        """Admit one call; returns True when it is a half-open probe"""
+        self.check()
+        if self.state == HALF_OPEN:
+            self._probes += 1
+            return True
+        return False
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        logger.warning(
+            f"🔴 Circuit {self.name}: open for {self._open_for:.0f}s "
+            f"({self.consecutive_failures} consecutive failures, last: {self.last_error})"
+        )
+
+    def record_success(self, probe: bool = False):
+        if probe:
+            self._probes = max(0, self._probes - 1)
+        if self.state != CLOSED:
+            logger.info(f"🟢 Circuit {self.name}: closed (provider recovered)")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._open_for = self.open_seconds
+
+    def record_failure(self, error: str, probe: bool = False):
+        self.last_error = error[:200]
+        self.consecutive_failures += 1
+        if probe:
+            self._probes = max(0, self._probes - 1)
+        if self.state == HALF_OPEN:
+            # Probe falhou: volta a abrir, com backoff
+            self._open_for = min(self.max_open_seconds, self._open_for * 2)
+            self._open()
+        elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def release(self, probe: bool):
+        """Call ended without telling anything about the provider (cancelled)"""
+        if probe:
+            self._probes = max(0, self._probes - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        self._refresh()
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after": self._retry_after() if self.state == OPEN else None,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "last_error": self.last_error
+        }
+
+
+class CircuitBreakerRegistry:
+    """Um CircuitBreaker por provider, criado no primeiro uso"""
+
+    def __init__(self):
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, provider: str) -> CircuitBreaker:
+        if provider not in self.breakers:
+            self.breakers[provider] = CircuitBreaker(provider)
+        return self.breakers[provider]
+
+    def is_open(self, provider: str) -> bool:
+        return self.get(provider).is_open
+
+    def check(self, provider: str):
+        self.get(provider).check()
+
+    async def call(
+        self,
+        provider: str,
+        fn: Callable[[Optional[Callable[[str], Awaitable[None]]]], Awaitable[Any]],
+        on_operation: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Any:
+        """Run fn(on_operation) through the provider's breaker
+
+        O provider aceitar o job (on_operation) já conta como sucesso: libera o probe do
+        half-open sem esperar os minutos de geração.
+        """
+        breaker = self.get(provider)
+        probe = breaker.allow()
+        settled = False
+
+        async def accepted(operation_name: str):
+            nonlocal settled
+            if not settled:
+                settled = True
+                breaker.record_success(probe)
+            if on_operation:
+                await on_operation(operation_name)
+
+        try:
+            result = await fn(accepted)
+        except asyncio.CancelledError:
+            if not settled:
+                breaker.release(probe)
+            raise
+        except Exception as e:
+            classified = classify_exception(e)
+            if classified.provider_failure:
+                breaker.record_failure(str(e) or type(e).__name__, probe and not settled)
+            elif not settled:
+                breaker.record_success(probe)
+            raise
+
+        if not settled:
+            breaker.record_success(probe)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+
+
+# Instância global
+provider_breakers = CircuitBreakerRegistry()
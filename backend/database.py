@@ -3,11 +3,13 @@ SQLite Database Manager for Video Generation App
 Replaces MongoDB with local SQLite database
 """
 import aiosqlite
+import asyncio
 import json
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import List, Dict, Optional, Any
-from datetime import datetime
+from datetime import datetime, timezone
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,21 +18,160 @@ logger = logging.getLogger(__name__)
 DB_DIR = Path(__file__).parent / 'database'
 DB_PATH = os.environ.get('DB_PATH', str(DB_DIR / 'video_gen.db'))
 
+# Gallery feed: metadados leves por tipo (nunca inclui data: URLs)
+_MEDIA_REF = "CASE WHEN {col} LIKE 'data:%' OR {col} LIKE 'base64:%' THEN NULL ELSE {col} END"
+GALLERY_FEED_FIELDS = ('model', 'mode', 'status', 'duration', 'cost', 'voice_id', 'media_url', 'thumbnail_url')
+GALLERY_FEED_SOURCES = {
+    'video': ('video_generations', "status = 'completed'", {
+        'model': 'model',
+        'mode': 'mode',
+        'status': 'status',
+        'duration': 'duration',
+        'cost': 'cost',
+        'media_url': 'result_url',
+        'thumbnail_url': _MEDIA_REF.format(col='image_id'),
+    }),
+    'audio': ('audio_generations', None, {
+        'duration': 'duration',
+        'cost': 'cost',
+        'voice_id': 'voice_id',
+        'media_url': _MEDIA_REF.format(col='audio_url'),
+    }),
+    'image': ('image_analyses', None, {
+        'model': 'suggested_model',
+        'media_url': _MEDIA_REF.format(col='image_url'),
+        'thumbnail_url': _MEDIA_REF.format(col='image_url'),
+    }),
+}
+
+# Índices do feed: (nome, tabela, colunas). O de vídeo cobre todas as colunas lidas pelo feed;
+# audio_url/image_url ficam de fora (linhas antigas guardam data: URLs de vários MB, que seriam
+# copiadas para o índice) - a página lê a coluna na tabela, uma busca por item
+_FEED_INDEXES = (
+    ('idx_video_feed', 'video_generations',
+     'status, timestamp DESC, id DESC, model, mode, duration, cost, result_url, image_id'),
+    ('idx_audio_feed', 'audio_generations', 'timestamp DESC, id DESC, duration, voice_id, cost'),
+    ('idx_image_feed', 'image_analyses', 'timestamp DESC, id DESC, suggested_model'),
+)
+
+# Token usage rollups: bucket horário (UTC ISO 'YYYY-MM-DDTHH') e custo inteiro em micro-dólares
+_HOUR_BUCKET = "substr({row}.timestamp, 1, 13)"
+_COST_MICROS = "CAST(ROUND({row}.cost * 1000000) AS INTEGER)"
+MICROS_PER_DOLLAR = 1_000_000
+TIMESERIES_GRANULARITIES = {'hour': 13, 'day': 10}
+
+# Connection pool: 1 writer + N readers (WAL permite leituras concorrentes)
+DB_READERS = int(os.environ.get('DB_READERS', '4'))
+DB_STATEMENT_CACHE = 256
+
 
 class Database:
-    """Async SQLite database manager"""
+    """Async SQLite database manager with a persistent connection pool"""
 
-    def __init__(self, db_path: str = DB_PATH):
+    def __init__(self, db_path: str = DB_PATH, readers: int = DB_READERS):
         self.db_path = db_path
+        self.readers = readers
+        self._writer_conn: Optional[aiosqlite.Connection] = None
+        self._reader_pool: Optional[asyncio.Queue] = None
+        self._reader_conns: List[aiosqlite.Connection] = []
+        self._write_lock = asyncio.Lock()
+        self._connect_lock = asyncio.Lock()
         self._ensure_dir()
 
     def _ensure_dir(self):
         """Ensure database directory exists"""
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
+    @property
+    def connected(self) -> bool:
+        return self._writer_conn is not None
+
+    async def _open_connection(self) -> aiosqlite.Connection:
+        """Open a tuned connection (statement cache, NORMAL sync, busy timeout)"""
+        conn = aiosqlite.connect(self.db_path, cached_statements=DB_STATEMENT_CACHE)
+        conn.daemon = True  # Não bloqueia o encerramento do processo se close() não for chamado
+        await conn
+        conn.row_factory = aiosqlite.Row
+        for pragma in ('PRAGMA busy_timeout=5000', 'PRAGMA synchronous=NORMAL'):
+            # PRAGMAs retornam linhas; fechar o cursor libera o lock de leitura
+            async with conn.execute(pragma):
+                pass
+        return conn
+
+    async def connect(self):
+        """Open the writer connection and the reader pool"""
+        async with self._connect_lock:
+            if self.connected:
+                return
+
+            writer = await self._open_connection()
+            async with writer.execute('PRAGMA journal_mode=WAL'):
+                pass
+
+            reader_pool = asyncio.Queue()
+            reader_conns = []
+            for _ in range(self.readers):
+                conn = await self._open_connection()
+                reader_conns.append(conn)
+                reader_pool.put_nowait(conn)
+
+            self._reader_conns = reader_conns
+            self._reader_pool = reader_pool
+            self._writer_conn = writer
+            logger.info(f"Database pool opened (1 writer, {self.readers} readers, WAL)")
+
+    async def close(self):
+        """Close all pooled connections"""
+        async with self._connect_lock:
+            if not self.connected:
+                return
+
+            async with self._write_lock:
+                await self._writer_conn.close()
+                self._writer_conn = None
+
+            for conn in self._reader_conns:
+                await conn.close()
+            self._reader_conns = []
+            self._reader_pool = None
+            logger.info("Database pool closed")
+
+    async def ping(self) -> bool:
+        """Cheap liveness check (SELECT 1 on a reader connection)"""
+        async with self._reader() as db:
+            async with db.execute('SELECT 1') as cursor:
+                return (await cursor.fetchone())[0] == 1
+
+    @asynccontextmanager
+    async def _writer(self):
+        """Serialized access to the writer connection; commits on success"""
+        if not self.connected:
+            await self.connect()
+
+        async with self._write_lock:
+            try:
+                yield self._writer_conn
+                await self._writer_conn.commit()
+            except BaseException:
+                await self._writer_conn.rollback()
+                raise
+
+    @asynccontextmanager
+    async def _reader(self):
+        """Borrow a reader connection from the pool"""
+        if not self.connected:
+            await self.connect()
+
+        pool = self._reader_pool
+        conn = await pool.get()
+        try:
+            yield conn
+        finally:
+            pool.put_nowait(conn)
+
     async def init_db(self):
         """Initialize database with all tables"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             # Image analyses table
             await db.execute('''
                 CREATE TABLE IF NOT EXISTS image_analyses (
@@ -100,6 +241,67 @@ class Database:
                 )
             ''')
 
+            # Token usage rollups (custo em micro-dólares inteiros = soma exata)
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS token_usage_rollup (
+                    bucket TEXT NOT NULL,
+                    service TEXT NOT NULL,
+                    operation TEXT NOT NULL,
+                    cost_micros INTEGER NOT NULL DEFAULT 0,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (bucket, service, operation)
+                ) WITHOUT ROWID
+            ''')
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS token_usage_totals (
+                    service TEXT PRIMARY KEY,
+                    cost_micros INTEGER NOT NULL DEFAULT 0,
+                    count INTEGER NOT NULL DEFAULT 0
+                ) WITHOUT ROWID
+            ''')
+
+            # Mantidas pelo SQLite na mesma transação do INSERT/DELETE
+            await db.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_token_usage_rollup_insert
+                AFTER INSERT ON token_usage
+                BEGIN
+                    INSERT INTO token_usage_rollup (bucket, service, operation, cost_micros, count)
+                    VALUES ({_HOUR_BUCKET.format(row='NEW')}, NEW.service, NEW.operation, {_COST_MICROS.format(row='NEW')}, 1)
+                    ON CONFLICT (bucket, service, operation) DO UPDATE SET
+                        cost_micros = cost_micros + excluded.cost_micros,
+                        count = count + 1;
+                    INSERT INTO token_usage_totals (service, cost_micros, count)
+                    VALUES (NEW.service, {_COST_MICROS.format(row='NEW')}, 1)
+                    ON CONFLICT (service) DO UPDATE SET
+                        cost_micros = cost_micros + excluded.cost_micros,
+                        count = count + 1;
+                END
+            ''')
+            await db.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_token_usage_rollup_delete
+                AFTER DELETE ON token_usage
+                BEGIN
+                    UPDATE token_usage_rollup SET
+                        cost_micros = cost_micros - {_COST_MICROS.format(row='OLD')},
+                        count = count - 1
+                    WHERE bucket = {_HOUR_BUCKET.format(row='OLD')}
+                      AND service = OLD.service AND operation = OLD.operation;
+                    UPDATE token_usage_totals SET
+                        cost_micros = cost_micros - {_COST_MICROS.format(row='OLD')},
+                        count = count - 1
+                    WHERE service = OLD.service;
+                END
+            ''')
+
+            # Backfill para bancos criados antes das rollups
+            async with db.execute('SELECT COALESCE(SUM(count), 0) FROM token_usage_totals') as cursor:
+                rolled_up = (await cursor.fetchone())[0]
+            async with db.execute('SELECT COUNT(*) FROM token_usage') as cursor:
+                usage_rows = (await cursor.fetchone())[0]
+            if rolled_up != usage_rows:
+                await self._rebuild_token_rollups(db)
+                logger.info(f"Token usage rollups rebuilt from {usage_rows} rows")
+
             # API balances table
             await db.execute('''
                 CREATE TABLE IF NOT EXISTS api_balances (
@@ -111,33 +313,108 @@ class Database:
                 )
             ''')
 
+            # Idempotency keys (chamadas pagas: vídeo/imagem) - compartilhado entre workers do uvicorn
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    key TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    owner TEXT,
+                    resource_id TEXT,
+                    status_code INTEGER,
+                    response TEXT,
+                    created_at TEXT NOT NULL,
+                    expires_at TEXT NOT NULL,
+                    locked_until TEXT
+                )
+            ''')
+
+            # Migrações: colunas adicionadas depois da criação das tabelas
+            await self._add_missing_columns(db, 'image_analyses', {
+                'content_hash': 'TEXT',
+                'prompt_version': 'TEXT',
+                'phash': 'TEXT'
+            })
+            await self._add_missing_columns(db, 'audio_generations', {
+                'cache_key': 'TEXT',   # chave do cache de TTS (NULL = fora do cache)
+                'size': 'INTEGER',     # bytes do áudio armazenado
+                'last_used': 'TEXT'    # LRU do cache de TTS
+            })
+            await self._add_missing_columns(db, 'video_generations', {
+                'provider': 'TEXT',
+                'operation_provider': 'TEXT',  # provider que executa operation_name (ex.: google_veo31_gemini)
+                'operation_name': 'TEXT',
+                'owner': 'TEXT',        # processo (worker do uvicorn) dono do registro - ver video_leases.py
+                'lease_until': 'TEXT'   # lease do dono; vencido => outro processo pode retomar o registro
+            })
+
             # Create indexes for better performance
             await db.execute('CREATE INDEX IF NOT EXISTS idx_video_status ON video_generations(status)')
             await db.execute('CREATE INDEX IF NOT EXISTS idx_video_timestamp ON video_generations(timestamp)')
             await db.execute('CREATE INDEX IF NOT EXISTS idx_audio_timestamp ON audio_generations(timestamp)')
             await db.execute('CREATE INDEX IF NOT EXISTS idx_image_timestamp ON image_analyses(timestamp)')
             await db.execute('CREATE INDEX IF NOT EXISTS idx_token_service ON token_usage(service)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_token_timestamp ON token_usage(timestamp)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys(expires_at)')
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_image_cache ON image_analyses
+                (content_hash, prompt_version, timestamp DESC)
+            ''')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_image_phash ON image_analyses(phash) WHERE phash IS NOT NULL')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_audio_cache ON audio_generations(cache_key) WHERE cache_key IS NOT NULL')
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_audio_cache_lru ON audio_generations
+                (last_used DESC, id, size) WHERE cache_key IS NOT NULL
+            ''')
+
+            # Gallery feed indexes (keyset on timestamp, id)
+            for name, table, columns in _FEED_INDEXES:
+                await self._ensure_index(db, name, table, columns)
 
-            await db.commit()
             logger.info(f"Database initialized at {self.db_path}")
 
+    async def _add_missing_columns(self, db: aiosqlite.Connection, table: str, columns: Dict[str, str]):
+        """ALTER TABLE ... ADD COLUMN for columns not present yet (idempotent migration)"""
+        async with db.execute(f'PRAGMA table_info({table})') as cursor:
+            existing = {row['name'] for row in await cursor.fetchall()}
+
+        for name, definition in columns.items():
+            if name not in existing:
+                await db.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+                logger.info(f"Migrated {table}: added column {name}")
+
+    async def _ensure_index(self, db: aiosqlite.Connection, name: str, table: str, columns: str):
+        """CREATE INDEX, recreating it when an older definition with other columns exists (idempotent migration)"""
+        sql = f'CREATE INDEX {name} ON {table} ({columns})'
+        async with db.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)) as cursor:
+            row = await cursor.fetchone()
+        if row is not None:
+            if ' '.join(row['sql'].split()) == sql:
+                return
+            await db.execute(f'DROP INDEX {name}')
+            logger.info(f"Migrated index {name}: new columns ({columns})")
+        await db.execute(sql)
+
     # Image Analyses Operations
     async def insert_image_analysis(self, data: Dict[str, Any]) -> bool:
         """Insert image analysis record"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._writer() as db:
                 await db.execute('''
-                    INSERT INTO image_analyses (id, image_url, cloudinary_id, analysis, suggested_model, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                    INSERT INTO image_analyses
+                    (id, image_url, cloudinary_id, analysis, suggested_model, content_hash, prompt_version, phash, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     data['id'],
                     data['image_url'],
                     data.get('cloudinary_id'),
                     data['analysis'],
                     data['suggested_model'],
+                    data.get('content_hash'),
+                    data.get('prompt_version'),
+                    data.get('phash'),
                     data['timestamp']
                 ))
-                await db.commit()
                 return True
         except Exception as e:
             logger.error(f"Error inserting image analysis: {e}")
@@ -145,8 +422,7 @@ class Database:
 
     async def get_image_analyses(self, limit: int = 100) -> List[Dict]:
         """Get all image analyses"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._reader() as db:
             async with db.execute(
                 'SELECT * FROM image_analyses ORDER BY timestamp DESC LIMIT ?',
                 (limit,)
@@ -154,22 +430,75 @@ class Database:
                 rows = await cursor.fetchall()
                 return [dict(row) for row in rows]
 
+    async def get_cached_image_analysis(
+        self,
+        content_hash: str,
+        prompt_version: str,
+        min_timestamp: Optional[str] = None
+    ) -> Optional[Dict]:
+        """Most recent analysis of the same image bytes with the same prompt version"""
+        query = 'SELECT * FROM image_analyses WHERE content_hash = ? AND prompt_version = ?'
+        params: List[Any] = [content_hash, prompt_version]
+        if min_timestamp:
+            query += ' AND timestamp >= ?'
+            params.append(min_timestamp)
+        query += ' ORDER BY timestamp DESC LIMIT 1'
+
+        async with self._reader() as db:
+            async with db.execute(query, params) as cursor:
+                row = await cursor.fetchone()
+                return dict(row) if row else None
+
+    async def get_image_analysis(self, analysis_id: str) -> Optional[Dict]:
+        """Get image analysis by ID"""
+        async with self._reader() as db:
+            async with db.execute('SELECT * FROM image_analyses WHERE id = ?', (analysis_id,)) as cursor:
+                row = await cursor.fetchone()
+                return dict(row) if row else None
+
+    async def get_image_phashes(self, prompt_version: str) -> List[Dict]:
+        """(id, phash, timestamp) of cacheable analyses, used to build the in-memory Hamming index"""
+        async with self._reader() as db:
+            async with db.execute(
+                'SELECT id, phash, timestamp FROM image_analyses WHERE phash IS NOT NULL AND prompt_version = ?',
+                (prompt_version,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+
+    async def invalidate_cached_image_analyses(self, content_hash: Optional[str] = None) -> List[str]:
+        """Detach analyses from the cache (rows stay in the gallery); returns the affected IDs"""
+        async with self._writer() as db:
+            if content_hash:
+                query = '''
+                    UPDATE image_analyses SET content_hash = NULL, phash = NULL
+                    WHERE content_hash = ? RETURNING id
+                '''
+                params: tuple = (content_hash,)
+            else:
+                query = '''
+                    UPDATE image_analyses SET content_hash = NULL, phash = NULL
+                    WHERE content_hash IS NOT NULL OR phash IS NOT NULL RETURNING id
+                '''
+                params = ()
+            async with db.execute(query, params) as cursor:
+                return [row['id'] for row in await cursor.fetchall()]
+
     async def delete_image_analysis(self, image_id: str) -> bool:
         """Delete image analysis by ID"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             cursor = await db.execute('DELETE FROM image_analyses WHERE id = ?', (image_id,))
-            await db.commit()
             return cursor.rowcount > 0
 
     # Audio Generations Operations
     async def insert_audio_generation(self, data: Dict[str, Any]) -> bool:
         """Insert audio generation record"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._writer() as db:
                 await db.execute('''
                     INSERT INTO audio_generations
-                    (id, audio_url, source, duration, text, voice_id, voice_settings, cost, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    (id, audio_url, source, duration, text, voice_id, voice_settings, cost, cache_key, size, last_used, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     data['id'],
                     data['audio_url'],
@@ -179,9 +508,11 @@ class Database:
                     data.get('voice_id'),
                     json.dumps(data.get('voice_settings')) if data.get('voice_settings') else None,
                     data.get('cost'),
+                    data.get('cache_key'),
+                    data.get('size'),
+                    data.get('last_used') or (data['timestamp'] if data.get('cache_key') else None),
                     data['timestamp']
                 ))
-                await db.commit()
                 return True
         except Exception as e:
             logger.error(f"Error inserting audio generation: {e}")
@@ -189,8 +520,7 @@ class Database:
 
     async def get_audio_generations(self, limit: int = 100) -> List[Dict]:
         """Get all audio generations"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._reader() as db:
             async with db.execute(
                 'SELECT * FROM audio_generations ORDER BY timestamp DESC LIMIT ?',
                 (limit,)
@@ -204,27 +534,81 @@ class Database:
                     result.append(data)
                 return result
 
+    async def get_cached_audio(self, cache_key: str) -> Optional[Dict]:
+        """Most recent audio row for a TTS cache key; marks it as recently used"""
+        async with self._writer() as db:
+            async with db.execute('''
+                UPDATE audio_generations SET last_used = ?
+                WHERE id = (
+                    SELECT id FROM audio_generations
+                    WHERE cache_key = ?
+                    ORDER BY timestamp DESC
+                    LIMIT 1
+                )
+                RETURNING id, audio_url, duration, size
+            ''', (datetime.now(timezone.utc).isoformat(), cache_key)) as cursor:
+                row = await cursor.fetchone()
+                return dict(row) if row else None
+
+    async def evict_cached_audio(self, max_bytes: int, max_entries: int) -> int:
+        """Drop least-recently-used rows from the TTS cache until it fits (rows and blobs are kept)"""
+        async with self._writer() as db:
+            cursor = await db.execute('''
+                UPDATE audio_generations SET cache_key = NULL
+                WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id,
+                               SUM(COALESCE(size, 0)) OVER (ORDER BY last_used DESC, id) AS running_bytes,
+                               ROW_NUMBER() OVER (ORDER BY last_used DESC, id) AS position
+                        FROM audio_generations
+                        WHERE cache_key IS NOT NULL
+                    )
+                    WHERE running_bytes > ? OR position > ?
+                )
+            ''', (max_bytes, max_entries))
+            return cursor.rowcount
+
+    async def uncache_audio(self, cache_key: Optional[str] = None) -> int:
+        """Remove one key (or every entry) from the TTS cache"""
+        async with self._writer() as db:
+            if cache_key:
+                cursor = await db.execute('UPDATE audio_generations SET cache_key = NULL WHERE cache_key = ?', (cache_key,))
+            else:
+                cursor = await db.execute('UPDATE audio_generations SET cache_key = NULL WHERE cache_key IS NOT NULL')
+            return cursor.rowcount
+
+    async def get_cached_audio_usage(self) -> Dict[str, int]:
+        """Entries and bytes currently in the TTS cache"""
+        async with self._reader() as db:
+            async with db.execute('''
+                SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes
+                FROM audio_generations WHERE cache_key IS NOT NULL
+            ''') as cursor:
+                row = await cursor.fetchone()
+                return {"entries": row['entries'], "bytes": row['bytes']}
+
     async def delete_audio_generation(self, audio_id: str) -> bool:
         """Delete audio generation by ID"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             cursor = await db.execute('DELETE FROM audio_generations WHERE id = ?', (audio_id,))
-            await db.commit()
             return cursor.rowcount > 0
 
     # Video Generations Operations
     async def insert_video_generation(self, data: Dict[str, Any]) -> bool:
         """Insert video generation record"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._writer() as db:
                 await db.execute('''
                     INSERT INTO video_generations
-                    (id, image_id, audio_id, model, mode, prompt, duration, cost, estimated_cost, status, result_url, error, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    (id, image_id, audio_id, model, provider, mode, prompt, duration, cost, estimated_cost, status, result_url, error,
+                     owner, lease_until, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     data['id'],
                     data['image_id'],
                     data.get('audio_id'),
                     data['model'],
+                    data.get('provider'),
                     data.get('mode', 'premium'),
                     data['prompt'],
                     data.get('duration'),
@@ -233,9 +617,10 @@ class Database:
                     data.get('status', 'pending'),
                     data.get('result_url'),
                     data.get('error'),
+                    data.get('owner'),
+                    data.get('lease_until'),
                     data['timestamp']
                 ))
-                await db.commit()
                 return True
         except Exception as e:
             logger.error(f"Error inserting video generation: {e}")
@@ -247,21 +632,26 @@ class Database:
             set_clause = ', '.join([f"{k} = ?" for k in updates.keys()])
             values = list(updates.values()) + [video_id]
 
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._writer() as db:
                 await db.execute(
                     f'UPDATE video_generations SET {set_clause} WHERE id = ?',
                     values
                 )
-                await db.commit()
                 return True
         except Exception as e:
             logger.error(f"Error updating video generation: {e}")
             return False
 
+    async def get_video_generation(self, video_id: str) -> Optional[Dict]:
+        """Get a single video generation by ID"""
+        async with self._reader() as db:
+            async with db.execute('SELECT * FROM video_generations WHERE id = ?', (video_id,)) as cursor:
+                row = await cursor.fetchone()
+                return dict(row) if row else None
+
     async def get_video_generations(self, status: Optional[str] = None, limit: int = 100) -> List[Dict]:
         """Get video generations, optionally filtered by status"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._reader() as db:
             if status:
                 query = 'SELECT * FROM video_generations WHERE status = ? ORDER BY timestamp DESC LIMIT ?'
                 params = (status, limit)
@@ -273,18 +663,60 @@ class Database:
                 rows = await cursor.fetchall()
                 return [dict(row) for row in rows]
 
+    async def get_unfinished_video_generations(self, now: Optional[str] = None) -> List[Dict]:
+        """Pending/processing video generations, oldest first (recovery)
+
+        now: só registros sem dono vivo (sem owner ou com lease vencido antes de `now`)
+        """
+        query = "SELECT * FROM video_generations WHERE status IN ('pending', 'processing')"
+        params: List[Any] = []
+        if now is not None:
+            query += " AND (owner IS NULL OR lease_until IS NULL OR lease_until < ?)"
+            params.append(now)
+        async with self._reader() as db:
+            async with db.execute(query + " ORDER BY timestamp", params) as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+
+    async def claim_video_generation(self, video_id: str, status: str, owner: str, lease_until: str, now: str) -> bool:
+        """Take ownership of an unfinished row whose lease is free or expired (atomic across processes)"""
+        async with self._writer() as db:
+            async with db.execute('''
+                UPDATE video_generations SET owner = ?, lease_until = ?
+                WHERE id = ? AND status = ? AND (owner IS NULL OR lease_until IS NULL OR lease_until < ?)
+                RETURNING id
+            ''', (owner, lease_until, video_id, status, now)) as cursor:
+                return await cursor.fetchone() is not None
+
+    async def renew_video_leases(self, owner: str, lease_until: str) -> int:
+        """Extend the leases of the owner's unfinished rows"""
+        async with self._writer() as db:
+            cursor = await db.execute('''
+                UPDATE video_generations SET lease_until = ?
+                WHERE owner = ? AND status IN ('pending', 'processing')
+            ''', (lease_until, owner))
+            return cursor.rowcount
+
+    async def release_video_leases(self, owner: str) -> int:
+        """Give up the owner's unfinished rows (shutdown): the next recovery sweep can take them at once"""
+        async with self._writer() as db:
+            cursor = await db.execute('''
+                UPDATE video_generations SET owner = NULL, lease_until = NULL
+                WHERE owner = ? AND status IN ('pending', 'processing')
+            ''', (owner,))
+            return cursor.rowcount
+
     async def delete_video_generation(self, video_id: str) -> bool:
         """Delete video generation by ID"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             cursor = await db.execute('DELETE FROM video_generations WHERE id = ?', (video_id,))
-            await db.commit()
             return cursor.rowcount > 0
 
     # Generated Images Operations
     async def insert_generated_image(self, data: Dict[str, Any]) -> bool:
         """Insert generated image record"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._writer() as db:
                 await db.execute('''
                     INSERT INTO generated_images (id, prompt, image_url, cost, timestamp)
                     VALUES (?, ?, ?, ?, ?)
@@ -295,7 +727,6 @@ class Database:
                     data.get('cost', 0.039),
                     data['timestamp']
                 ))
-                await db.commit()
                 return True
         except Exception as e:
             logger.error(f"Error inserting generated image: {e}")
@@ -303,8 +734,7 @@ class Database:
 
     async def get_generated_images(self, limit: int = 100) -> List[Dict]:
         """Get all generated images"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._reader() as db:
             async with db.execute(
                 'SELECT * FROM generated_images ORDER BY timestamp DESC LIMIT ?',
                 (limit,)
@@ -314,16 +744,64 @@ class Database:
 
     async def delete_generated_image(self, image_id: str) -> bool:
         """Delete generated image by ID"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             cursor = await db.execute('DELETE FROM generated_images WHERE id = ?', (image_id,))
-            await db.commit()
             return cursor.rowcount > 0
 
+    # Gallery Feed Operations
+    async def get_gallery_feed(
+        self,
+        types: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[tuple] = None,
+        limit: int = 50
+    ) -> List[Dict]:
+        """Keyset-paginated gallery feed ordered by (timestamp, id) DESC
+
+        Args:
+            types: subset of GALLERY_FEED_SOURCES (video, audio, image)
+            fields: subset of GALLERY_FEED_FIELDS; type, id and timestamp are always returned
+            cursor: (timestamp, id) of the last item of the previous page
+            limit: page size
+        """
+        types = [t for t in (types or GALLERY_FEED_SOURCES) if t in GALLERY_FEED_SOURCES]
+        fields = [f for f in (fields or GALLERY_FEED_FIELDS) if f in GALLERY_FEED_FIELDS]
+        if not types:
+            return []
+
+        subqueries = []
+        params: List[Any] = []
+        for feed_type in types:
+            table, condition, columns = GALLERY_FEED_SOURCES[feed_type]
+            projection = ', '.join(f"{columns.get(f, 'NULL')} AS {f}" for f in fields)
+            where = [condition] if condition else []
+            if cursor:
+                where.append('(timestamp, id) < (?, ?)')
+                params.extend(cursor)
+            where_clause = f"WHERE {' AND '.join(where)}" if where else ''
+
+            subqueries.append(f'''
+                SELECT * FROM (
+                    SELECT '{feed_type}' AS type, id, timestamp{', ' + projection if projection else ''}
+                    FROM {table} {where_clause}
+                    ORDER BY timestamp DESC, id DESC LIMIT ?
+                )
+            ''')
+            params.append(limit)
+
+        query = f"{' UNION ALL '.join(subqueries)} ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        async with self._reader() as db:
+            async with db.execute(query, params) as cursor_:
+                rows = await cursor_.fetchall()
+                return [dict(row) for row in rows]
+
     # Token Usage Operations
     async def insert_token_usage(self, data: Dict[str, Any]) -> bool:
         """Insert token usage record"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._writer() as db:
                 await db.execute('''
                     INSERT INTO token_usage (id, service, operation, cost, details, timestamp)
                     VALUES (?, ?, ?, ?, ?, ?)
@@ -335,7 +813,6 @@ class Database:
                     json.dumps(data.get('details')) if data.get('details') else None,
                     data['timestamp']
                 ))
-                await db.commit()
                 return True
         except Exception as e:
             logger.error(f"Error inserting token usage: {e}")
@@ -343,8 +820,7 @@ class Database:
 
     async def get_token_usage(self, limit: int = 1000) -> List[Dict]:
         """Get all token usage records"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._reader() as db:
             async with db.execute(
                 'SELECT * FROM token_usage ORDER BY timestamp DESC LIMIT ?',
                 (limit,)
@@ -358,11 +834,78 @@ class Database:
                     result.append(data)
                 return result
 
+    async def _rebuild_token_rollups(self, db: aiosqlite.Connection):
+        """Recompute rollup tables from token_usage (runs inside the writer transaction)"""
+        await db.execute('DELETE FROM token_usage_rollup')
+        await db.execute('DELETE FROM token_usage_totals')
+        await db.execute(f'''
+            INSERT INTO token_usage_rollup (bucket, service, operation, cost_micros, count)
+            SELECT {_HOUR_BUCKET.format(row='token_usage')}, service, operation,
+                   SUM({_COST_MICROS.format(row='token_usage')}), COUNT(*)
+            FROM token_usage
+            GROUP BY 1, 2, 3
+        ''')
+        await db.execute(f'''
+            INSERT INTO token_usage_totals (service, cost_micros, count)
+            SELECT service, SUM({_COST_MICROS.format(row='token_usage')}), COUNT(*)
+            FROM token_usage
+            GROUP BY service
+        ''')
+
+    async def get_token_usage_totals(self) -> Dict[str, Dict[str, Any]]:
+        """Spend per service from the rollup table: {service: {cost_micros, count}}"""
+        async with self._reader() as db:
+            async with db.execute('SELECT service, cost_micros, count FROM token_usage_totals') as cursor:
+                rows = await cursor.fetchall()
+                return {
+                    row['service']: {"cost_micros": row['cost_micros'], "count": row['count']}
+                    for row in rows
+                }
+
+    async def get_token_usage_timeseries(
+        self,
+        granularity: str = 'day',
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        service: Optional[str] = None
+    ) -> List[Dict]:
+        """Spend per bucket/service/operation from the hourly rollups
+
+        Args:
+            granularity: 'hour' or 'day'
+            since/until: ISO bucket bounds (inclusive), e.g. '2025-01-31' or '2025-01-31T13'
+            service: optional service filter
+        """
+        width = TIMESERIES_GRANULARITIES[granularity]
+        query = f'''
+            SELECT substr(bucket, 1, {width}) AS bucket, service, operation,
+                   SUM(cost_micros) AS cost_micros, SUM(count) AS count
+            FROM token_usage_rollup
+            WHERE count > 0
+        '''
+        params: List[Any] = []
+        if since:
+            query += ' AND bucket >= ?'
+            params.append(since[:13])
+        if until:
+            # Prefixo inclusivo: '2025-01-31' cobre todas as horas do dia
+            query += f' AND substr(bucket, 1, {min(len(until), 13)}) <= ?'
+            params.append(until[:13])
+        if service:
+            query += ' AND service = ?'
+            params.append(service)
+        query += ' GROUP BY 1, 2, 3 ORDER BY 1, 2, 3'
+
+        async with self._reader() as db:
+            async with db.execute(query, params) as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+
     # API Balances Operations
     async def upsert_api_balance(self, service: str, initial_balance: float) -> bool:
         """Insert or update API balance"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self._writer() as db:
                 # Check if exists
                 async with db.execute('SELECT id FROM api_balances WHERE service = ?', (service,)) as cursor:
                     existing = await cursor.fetchone()
@@ -381,8 +924,6 @@ class Database:
                         INSERT INTO api_balances (id, service, initial_balance, current_balance, last_updated)
                         VALUES (?, ?, ?, ?, ?)
                     ''', (str(uuid.uuid4()), service, initial_balance, initial_balance, timestamp))
-
-                await db.commit()
                 return True
         except Exception as e:
             logger.error(f"Error upserting API balance: {e}")
@@ -390,20 +931,99 @@ class Database:
 
     async def get_api_balance(self, service: str) -> Optional[Dict]:
         """Get API balance for a service"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._reader() as db:
             async with db.execute('SELECT * FROM api_balances WHERE service = ?', (service,)) as cursor:
                 row = await cursor.fetchone()
                 return dict(row) if row else None
 
     async def get_all_api_balances(self) -> List[Dict]:
         """Get all API balances"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._reader() as db:
             async with db.execute('SELECT * FROM api_balances') as cursor:
                 rows = await cursor.fetchall()
                 return [dict(row) for row in rows]
 
+    # Idempotency Keys Operations
+    async def claim_idempotency_key(
+        self,
+        key: str,
+        fingerprint: str,
+        owner: str,
+        expires_at: str,
+        locked_until: str,
+        resource_id: Optional[str] = None
+    ) -> bool:
+        """Atomically take a key: new, expired, or in progress with an expired lock. False if someone holds it"""
+        now = datetime.now(timezone.utc).isoformat()
+        async with self._writer() as db:
+            async with db.execute('''
+                INSERT INTO idempotency_keys
+                (key, fingerprint, status, owner, resource_id, created_at, expires_at, locked_until)
+                VALUES (?, ?, 'in_progress', ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    status = 'in_progress',
+                    owner = excluded.owner,
+                    resource_id = excluded.resource_id,
+                    status_code = NULL,
+                    response = NULL,
+                    created_at = excluded.created_at,
+                    expires_at = excluded.expires_at,
+                    locked_until = excluded.locked_until
+                WHERE idempotency_keys.expires_at < ?
+                   OR (idempotency_keys.status = 'in_progress' AND idempotency_keys.locked_until < ?)
+                RETURNING key
+            ''', (key, fingerprint, owner, resource_id, now, expires_at, locked_until, now, now)) as cursor:
+                return await cursor.fetchone() is not None
+
+    async def get_idempotency_key(self, key: str) -> Optional[Dict]:
+        """Current state of an idempotency key (expired rows are reported as missing)"""
+        async with self._reader() as db:
+            async with db.execute(
+                'SELECT * FROM idempotency_keys WHERE key = ? AND expires_at >= ?',
+                (key, datetime.now(timezone.utc).isoformat())
+            ) as cursor:
+                row = await cursor.fetchone()
+                return dict(row) if row else None
+
+    async def complete_idempotency_key(
+        self,
+        key: str,
+        owner: str,
+        status_code: int,
+        response: str,
+        resource_id: Optional[str] = None,
+        expires_at: Optional[str] = None
+    ) -> bool:
+        """Store the response of the owner's run so repeats replay it (expires_at: shorten the replay window)"""
+        async with self._writer() as db:
+            cursor = await db.execute('''
+                UPDATE idempotency_keys
+                SET status = 'completed', status_code = ?, response = ?,
+                    resource_id = COALESCE(?, resource_id), locked_until = NULL,
+                    expires_at = COALESCE(?, expires_at)
+                WHERE key = ? AND owner = ?
+            ''', (status_code, response, resource_id, expires_at, key, owner))
+            return cursor.rowcount > 0
+
+    async def release_idempotency_key(self, key: str, owner: str) -> bool:
+        """Drop the owner's claim after a failed run (the next request may try again)"""
+        async with self._writer() as db:
+            cursor = await db.execute(
+                "DELETE FROM idempotency_keys WHERE key = ? AND owner = ? AND status = 'in_progress'",
+                (key, owner)
+            )
+            return cursor.rowcount > 0
+
+    async def purge_expired_idempotency_keys(self) -> int:
+        """Delete keys past their replay window"""
+        async with self._writer() as db:
+            cursor = await db.execute(
+                'DELETE FROM idempotency_keys WHERE expires_at < ?',
+                (datetime.now(timezone.utc).isoformat(),)
+            )
+            return cursor.rowcount
+
 
 # Global database instance
 db = Database()
@@ -3,10 +3,70 @@ Wrapper to replace emergentintegrations with google-generativeai
 """
 import google.generativeai as genai
 import os
-from typing import List, Optional, Dict, Any
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 import base64
 
+# Cache de GenerativeModel por (modelo, system prompt, generation config)
+MODEL_CACHE_SIZE = int(os.environ.get('GEMINI_MODEL_CACHE_SIZE', '32'))
+
+DEFAULT_GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+}
+
+_model_cache: "OrderedDict[Tuple, genai.GenerativeModel]" = OrderedDict()
+_model_cache_lock = threading.Lock()
+_configured_api_key: Optional[str] = None
+
+
+def _configure(api_key: str):
+    """Call genai.configure only when the key changes (it rebuilds the clients)"""
+    global _configured_api_key
+    if api_key != _configured_api_key:
+        genai.configure(api_key=api_key)
+        _configured_api_key = api_key
+        with _model_cache_lock:
+            _model_cache.clear()
+
+
+def get_model(
+    model_name: str,
+    system_instruction: Optional[str] = None,
+    generation_config: Optional[Dict[str, Any]] = None
+) -> genai.GenerativeModel:
+    """Return a cached GenerativeModel (LRU, GEMINI_MODEL_CACHE_SIZE entries)"""
+    key = (
+        model_name,
+        system_instruction,
+        tuple(sorted(generation_config.items())) if generation_config else None
+    )
+    with _model_cache_lock:
+        model = _model_cache.get(key)
+        if model is not None:
+            _model_cache.move_to_end(key)
+            return model
+
+        model = genai.GenerativeModel(
+            model_name=model_name,
+            generation_config=generation_config,
+            system_instruction=system_instruction
+        )
+        _model_cache[key] = model
+        if len(_model_cache) > MODEL_CACHE_SIZE:
+            _model_cache.popitem(last=False)
+        return model
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
 
 class FileContentWithMimeType:
     """File content wrapper"""
@@ -33,7 +93,7 @@ class LlmChat:
         self.model_params = {}
 
         # Configure the API
-        genai.configure(api_key=api_key)
+        _configure(api_key)
 
     def with_model(self, provider: str, model: str):
         """Set the model to use"""
@@ -48,37 +108,29 @@ class LlmChat:
     async def send_message(self, message: UserMessage) -> str:
         """Send message and get text response"""
         try:
-            # Create model
-            generation_config = {
-                "temperature": 0.7,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 8192,
-            }
-
-            model = genai.GenerativeModel(
-                model_name=self.model_name,
-                generation_config=generation_config,
-                system_instruction=self.system_message if self.system_message else None
+            model = get_model(
+                self.model_name,
+                self.system_message if self.system_message else None,
+                DEFAULT_GENERATION_CONFIG
             )
 
             # Prepare content
             content_parts = []
 
-            # Add file contents if present
+            # Add file contents if present (leitura fora do event loop)
+            loop = asyncio.get_event_loop()
             for file_content in message.file_contents:
-                with open(file_content.file_path, 'rb') as f:
-                    image_data = f.read()
-                    content_parts.append({
-                        'mime_type': file_content.mime_type,
-                        'data': image_data
-                    })
+                image_data = await loop.run_in_executor(None, _read_file, file_content.file_path)
+                content_parts.append({
+                    'mime_type': file_content.mime_type,
+                    'data': image_data
+                })
 
             # Add text
             content_parts.append(message.text)
 
-            # Generate response
-            response = model.generate_content(content_parts)
+            # Generate response (async API: não bloqueia o event loop)
+            response = await model.generate_content_async(content_parts)
 
             return response.text
 
@@ -90,12 +142,10 @@ class LlmChat:
         try:
             # For image generation, use the appropriate model
             if 'image' in self.model_params.get('modalities', []):
-                model = genai.GenerativeModel(
-                    model_name=self.model_name,
-                )
+                model = get_model(self.model_name)
 
                 # Generate image
-                response = model.generate_content(message.text)
+                response = await model.generate_content_async(message.text)
 
                 images = []
                 text_response = ""
@@ -0,0 +1,132 @@
+"""
+Shared HTTP Client
+Um único httpx.AsyncClient para todos os downloads de saída (imagens, vídeos).
+
+- keep-alive: conexões TCP/TLS reaproveitadas entre requests
+- HTTP/2 quando o pacote `h2` está instalado (multiplexa vários downloads numa conexão)
+- limite de conexões simultâneas por host (um CDN lento não esgota o pool)
+- leitura em streaming com teto de tamanho + timeouts em todas as fases
+"""
+
+import os
+import asyncio
+import logging
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+# HTTP/2 é opcional
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+HTTP_MAX_CONNECTIONS = int(os.environ.get('HTTP_MAX_CONNECTIONS', '100'))
+HTTP_MAX_KEEPALIVE = int(os.environ.get('HTTP_MAX_KEEPALIVE', '20'))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get('HTTP_KEEPALIVE_EXPIRY', '30'))      # segundos
+HTTP_PER_HOST_LIMIT = int(os.environ.get('HTTP_PER_HOST_LIMIT', '8'))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '10'))        # segundos
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', '60'))              # segundos
+HTTP_MAX_DOWNLOAD_BYTES = int(os.environ.get('HTTP_MAX_DOWNLOAD_BYTES', str(50 * 1024 * 1024)))
+
+
+class DownloadTooLargeError(ValueError):
+    """Raised when a response body exceeds the download size cap"""
+
+
+class SharedHttpClient:
+    """Pool de conexões compartilhado pela aplicação inteira"""
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = HTTP_MAX_KEEPALIVE,
+        per_host_limit: int = HTTP_PER_HOST_LIMIT,
+        max_download_bytes: int = HTTP_MAX_DOWNLOAD_BYTES
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.per_host_limit = per_host_limit
+        self.max_download_bytes = max_download_bytes
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self.requests = 0
+        self.bytes_downloaded = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The underlying AsyncClient (created on first use, inside the event loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+                ),
+                timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+            )
+            logger.info(f"🌐 Shared HTTP client ready (HTTP/2: {'✅' if HTTP2_AVAILABLE else '❌'}, "
+                        f"{self.max_connections} connections, {self.per_host_limit}/host)")
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        semaphore = self._host_limits.get(host)
+        if semaphore is None:
+            semaphore = self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return semaphore
+
+    async def fetch_bytes(
+        self,
+        url: str,
+        max_bytes: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> bytes:
+        """GET url and return the body; raises httpx.HTTPStatusError or DownloadTooLargeError"""
+        max_bytes = max_bytes or self.max_download_bytes
+        request_timeout = httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT) if timeout else httpx.USE_CLIENT_DEFAULT
+
+        async with self._host_limit(url):
+            async with self.client.stream('GET', url, timeout=request_timeout) as response:
+                response.raise_for_status()
+
+                declared = response.headers.get('content-length')
+                if declared and declared.isdigit() and int(declared) > max_bytes:
+                    raise DownloadTooLargeError(f"{url} is {declared} bytes (limit {max_bytes})")
+
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) > max_bytes:
+                        raise DownloadTooLargeError(f"{url} exceeded {max_bytes} bytes")
+
+        self.requests += 1
+        self.bytes_downloaded += len(body)
+        return bytes(body)
+
+    async def close(self):
+        """Close pooled connections (shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._host_limits.clear()
+        logger.info("🌐 Shared HTTP client closed")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "bytes_downloaded": self.bytes_downloaded,
+            "hosts": len(self._host_limits),
+            "http2": HTTP2_AVAILABLE
+        }
+
+
+# Instância global
+http_client = SharedHttpClient()
@@ -0,0 +1,193 @@
+"""
+Idempotency for paid generation calls
+Duplo clique e retry do frontend em /video/generate e /images/generate não iniciam um segundo job pago.
+
+- chave: header Idempotency-Key ou, sem ele, hash do conteúdo (imagem, prompt, modelo, provider, duração...)
+- no mesmo processo: requests idênticos em andamento esperam o primeiro (single-flight)
+- entre workers do uvicorn: a chave é reivindicada atomicamente na tabela idempotency_keys;
+  quem perde espera o resultado gravado pelo dono
+- respostas 2xx ficam gravadas pela janela da chave e são repetidas (mesmo video_id);
+  falhas liberam a chave para uma nova tentativa
+- replay_auto=False: sem Idempotency-Key só requests simultâneos são unidos - um "gerar de novo"
+  deliberado com o mesmo conteúdo gera outro resultado (a resposta fica só dois intervalos de
+  consulta, para os duplicados que ainda estão esperando em outro worker)
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from database import db as database
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+IDEMPOTENCY_TTL = float(os.environ.get('IDEMPOTENCY_TTL', str(24 * 3600)))       # chave enviada pelo cliente
+IDEMPOTENCY_AUTO_TTL = float(os.environ.get('IDEMPOTENCY_AUTO_TTL', '300'))      # chave derivada do conteúdo
+IDEMPOTENCY_LOCK_TTL = float(os.environ.get('IDEMPOTENCY_LOCK_TTL', '1800'))     # dono morto: chave volta a ser reivindicável
+IDEMPOTENCY_WAIT = float(os.environ.get('IDEMPOTENCY_WAIT', '900'))              # espera máxima por outro worker
+IDEMPOTENCY_POLL = float(os.environ.get('IDEMPOTENCY_POLL', '1'))                # segundos entre consultas
+IDEMPOTENCY_PURGE_INTERVAL = 3600
+IDEMPOTENCY_MAX_KEY_LENGTH = 255
+
+# handler() -> (status_code, corpo JSON)
+Handler = Callable[[], Awaitable[Tuple[int, Dict[str, Any]]]]
+
+
+class IdempotencyError(Exception):
+    """Key can't be used for this request (400 invalid, 409 still running, 422 reused with other params)"""
+
+    def __init__(self, status_code: int, message: str, resource_id: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.resource_id = resource_id
+
+
+class IdempotentResponse(NamedTuple):
+    status_code: int
+    body: Dict[str, Any]
+    replayed: bool
+
+
+def request_fingerprint(scope: str, fields: Dict[str, Any]) -> str:
+    """SHA-256 of the request fields that decide what the provider generates"""
+    material = json.dumps({"scope": scope, **fields}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def _in(seconds: float) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+
+class IdempotencyStore:
+    """Single-flight em memória + tabela persistida compartilhada entre processos"""
+
+    def __init__(
+        self,
+        ttl: float = IDEMPOTENCY_TTL,
+        auto_ttl: float = IDEMPOTENCY_AUTO_TTL,
+        lock_ttl: float = IDEMPOTENCY_LOCK_TTL,
+        wait: float = IDEMPOTENCY_WAIT,
+        poll_interval: float = IDEMPOTENCY_POLL
+    ):
+        self.ttl = ttl
+        self.auto_ttl = auto_ttl
+        self.lock_ttl = lock_ttl
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self._inflight: Dict[str, Tuple[asyncio.Future, str]] = {}
+        self._next_purge = 0.0
+
+    def _resolve_key(self, scope: str, client_key: Optional[str], fingerprint: str) -> Tuple[str, float]:
+        if client_key is None:
+            return f"{scope}:auto:{fingerprint}", self.auto_ttl
+        client_key = client_key.strip()
+        if not client_key or len(client_key) > IDEMPOTENCY_MAX_KEY_LENGTH:
+            raise IdempotencyError(400, f"Idempotency-Key must have 1-{IDEMPOTENCY_MAX_KEY_LENGTH} characters")
+        return f"{scope}:key:{client_key}", self.ttl
+
+    async def run(
+        self,
+        scope: str,
+        client_key: Optional[str],
+        fingerprint: str,
+        handler: Handler,
+        resource_id: Optional[str] = None,
+        replay_auto: bool = True
+    ) -> IdempotentResponse:
+        """Run handler at most once per key; duplicates get the first run's response
+
+        resource_id (ex.: video_id criado antes do handler) é gravado já na reivindicação,
+        para que um duplicado que desistir de esperar saiba qual job acompanhar.
+        replay_auto=False: sem client_key, a resposta não é repetida depois que o request termina.
+        """
+        key, ttl = self._resolve_key(scope, client_key, fingerprint)
+        replay_ttl = ttl if client_key is not None or replay_auto else self.poll_interval * 2
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            future, inflight_fingerprint = inflight
+            if inflight_fingerprint != fingerprint:
+                raise IdempotencyError(422, "Idempotency-Key already used with different parameters")
+            logger.info(f"🔁 Duplicate request coalesced with the one in flight ({key[:40]})")
+            result = await asyncio.shield(future)
+            return result._replace(replayed=True)
+
+        future = asyncio.get_event_loop().create_future()
+        self._inflight[key] = (future, fingerprint)
+        try:
+            result = await self._execute(key, ttl, replay_ttl, fingerprint, handler, resource_id)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # marca como lida: sem duplicados esperando não há quem a consuma
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    async def _execute(
+        self,
+        key: str,
+        ttl: float,
+        replay_ttl: float,
+        fingerprint: str,
+        handler: Handler,
+        resource_id: Optional[str]
+    ) -> IdempotentResponse:
+        if time.monotonic() >= self._next_purge:
+            await self.purge_expired()
+
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait
+        while not await database.claim_idempotency_key(
+            key, fingerprint, owner, _in(ttl), _in(self.lock_ttl), resource_id
+        ):
+            row = await database.get_idempotency_key(key)
+            if row is None:
+                continue  # liberada/expirada entre as duas consultas: tenta reivindicar de novo
+            if row['fingerprint'] != fingerprint:
+                raise IdempotencyError(422, "Idempotency-Key already used with different parameters")
+            if row['status'] == 'completed':
+                logger.info(f"🔁 Replaying stored response for {key[:40]}")
+                return IdempotentResponse(row['status_code'], json.loads(row['response']), True)
+            if time.monotonic() >= deadline:
+                raise IdempotencyError(409, "A request with this key is still in progress", row['resource_id'])
+            # Em andamento em outro worker
+            await asyncio.sleep(self.poll_interval)
+
+        try:
+            status_code, body = await handler()
+        except BaseException:
+            await database.release_idempotency_key(key, owner)
+            raise
+
+        if 200 <= status_code < 300:
+            await database.complete_idempotency_key(
+                key, owner, status_code, json.dumps(body), resource_id,
+                expires_at=_in(replay_ttl) if replay_ttl != ttl else None
+            )
+        else:
+            await database.release_idempotency_key(key, owner)
+        return IdempotentResponse(status_code, body, False)
+
+    async def purge_expired(self):
+        """Delete keys past their replay window"""
+        self._next_purge = time.monotonic() + IDEMPOTENCY_PURGE_INTERVAL
+        purged = await database.purge_expired_idempotency_keys()
+        if purged:
+            logger.info(f"🧹 Purged {purged} expired idempotency keys")
+
+
+# Instância global
+idempotency = IdempotencyStore()
@@ -0,0 +1,135 @@
+"""
+Perceptual Image Hashing
+dHash de 64 bits (NumPy) + índice multi-index hashing para busca por distância de Hamming.
+
+Fotos re-comprimidas, redimensionadas ou "printadas" mudam o SHA-256 mas mantêm o dHash
+a poucos bits de distância - isso permite reaproveitar análises de quase-duplicatas.
+"""
+
+import io
+import os
+import logging
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+PHASH_MAX_DISTANCE = int(os.environ.get('PHASH_MAX_DISTANCE', '6'))  # bits de 64
+
+HASH_BITS = 64
+_HASH_SIZE = 8
+_INDEX_CHUNKS = 4  # blocos de 16 bits
+
+
+def dhash(image: Union[bytes, Image.Image]) -> int:
+    """64-bit difference hash: sign of horizontal gradients on a 9x8 grayscale thumbnail"""
+    if isinstance(image, (bytes, bytearray)):
+        image = Image.open(io.BytesIO(image))
+
+    # draft() deixa o decoder JPEG reduzir a escala direto (bem mais rápido em fotos grandes)
+    image.draft('L', (_HASH_SIZE * 8, _HASH_SIZE * 8))
+    thumb = image.convert('L').resize((_HASH_SIZE + 1, _HASH_SIZE), Image.Resampling.LANCZOS)
+
+    pixels = np.asarray(thumb, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def hash_to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def hex_to_hash(value: str) -> int:
+    return int(value, 16)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHashIndex:
+    """Multi-index hashing: 64 bits divididos em 4 blocos de 16 bits.
+
+    Pelo princípio da casa dos pombos, dois hashes a distância <= max_distance
+    diferem em no máximo max_distance // 4 bits em pelo menos um bloco; cada bloco
+    é uma tabela hash, então a busca só sonda as chaves vizinhas desse raio e
+    verifica os poucos candidatos encontrados.
+    """
+
+    def __init__(self, max_distance: int = PHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        width = HASH_BITS // _INDEX_CHUNKS
+        mask = (1 << width) - 1
+
+        # (shift, mask) de cada bloco
+        self._chunks: List[Tuple[int, int]] = [
+            (HASH_BITS - width * (n + 1), mask) for n in range(_INDEX_CHUNKS)
+        ]
+
+        # Máscaras de flip com até `radius` bits dentro de um bloco
+        radius = max_distance // _INDEX_CHUNKS
+        self._probes: List[int] = [
+            sum(1 << bit for bit in bits)
+            for r in range(radius + 1)
+            for bits in combinations(range(width), r)
+        ]
+
+        self._tables: List[Dict[int, Set[str]]] = [{} for _ in self._chunks]
+        self._hashes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _keys(self, value: int) -> Iterable[int]:
+        return ((value >> shift) & mask for shift, mask in self._chunks)
+
+    def add(self, item_id: str, value: int):
+        if item_id in self._hashes:
+            self.remove(item_id)
+        self._hashes[item_id] = value
+        for table, key in zip(self._tables, self._keys(value)):
+            table.setdefault(key, set()).add(item_id)
+
+    def remove(self, item_id: str) -> bool:
+        value = self._hashes.pop(item_id, None)
+        if value is None:
+            return False
+        for table, key in zip(self._tables, self._keys(value)):
+            bucket = table.get(key)
+            if bucket:
+                bucket.discard(item_id)
+                if not bucket:
+                    del table[key]
+        return True
+
+    def clear(self):
+        self._hashes.clear()
+        for table in self._tables:
+            table.clear()
+
+    def search(self, value: int, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Items within max_distance bits, nearest first"""
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+
+        candidates: Set[str] = set()
+        for table, key in zip(self._tables, self._keys(value)):
+            for probe in self._probes:
+                bucket = table.get(key ^ probe)
+                if bucket:
+                    candidates.update(bucket)
+
+        matches = []
+        for item_id in candidates:
+            distance = (self._hashes[item_id] ^ value).bit_count()
+            if distance <= max_distance:
+                matches.append((item_id, distance))
+        matches.sort(key=lambda match: match[1])
+        return matches
+
+
+# Instância global
+phash_index = MultiIndexHashIndex()
@@ -0,0 +1,215 @@
+"""
+Streaming Image Upload
+Recebe a imagem como multipart/form-data (ou corpo cru image/*) e grava direto no blob store
+em blocos, sem base64 e sem o arquivo inteiro em memória.
+
+- tamanho máximo verificado a cada bloco (413 sem ler o resto do corpo)
+- tipo verificado pelos primeiros bytes (magic numbers), não pelo Content-Type do cliente
+- resultado: image_id = SHA-256 do conteúdo (mesma foto => mesmo id)
+"""
+
+import os
+import logging
+from typing import List, Optional, Tuple
+
+from fastapi import Request
+
+from blob_store import BlobInfo, BlobSpool, blob_store, is_valid_digest, parse_blob_ref
+from http_client import http_client
+
+# python-multipart: o pacote mudou de nome (multipart -> python_multipart)
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+IMAGE_UPLOAD_MAX_BYTES = int(os.environ.get('IMAGE_UPLOAD_MAX_BYTES', str(20 * 1024 * 1024)))
+
+_SNIFF_BYTES = 16
+
+
+class UploadRejected(ValueError):
+    """Upload refused while reading (status_code: 400, 413 or 415)"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """MIME type from the first bytes of the file, or None if it isn't a supported image"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[4:8] == b'ftyp' and head[8:12] in (b'heic', b'heix', b'mif1', b'msf1'):
+        return 'image/heic'
+    return None
+
+
+class _ImageSink:
+    """Recebe os bytes do arquivo: identifica o tipo no começo e aplica o limite de tamanho"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.spool: Optional[BlobSpool] = None
+        self.content_type: Optional[str] = None
+        self._head = b''
+
+    async def write(self, chunk: bytes):
+        if self.spool is None:
+            self.spool = blob_store.open_spool()
+
+        if self.content_type is None:
+            self._head += chunk[:_SNIFF_BYTES]
+            if len(self._head) >= _SNIFF_BYTES:
+                self.content_type = sniff_image_type(self._head)
+                if self.content_type is None:
+                    raise UploadRejected(415, "Unsupported image type (JPEG, PNG, WEBP or HEIC)")
+
+        if self.spool.size + len(chunk) > self.max_bytes:
+            raise UploadRejected(413, f"Image larger than {self.max_bytes} bytes")
+        await self.spool.write(chunk)
+
+    async def commit(self) -> BlobInfo:
+        if self.spool is None or self.spool.size == 0:
+            raise UploadRejected(400, "Empty upload")
+        if self.content_type is None:
+            # Arquivo menor que a janela de detecção
+            self.content_type = sniff_image_type(self._head)
+            if self.content_type is None:
+                raise UploadRejected(415, "Unsupported image type (JPEG, PNG, WEBP or HEIC)")
+        return await self.spool.commit(self.content_type)
+
+    def discard(self):
+        if self.spool is not None:
+            self.spool.discard()
+
+
+def _parse_disposition(value: bytes) -> Tuple[Optional[str], Optional[str]]:
+    """(field name, filename) from a part's Content-Disposition header"""
+    _, params = parse_options_header(value)
+    name = params.get(b'name')
+    filename = params.get(b'filename')
+    return (name.decode('utf-8', 'replace') if name is not None else None,
+            filename.decode('utf-8', 'replace') if filename is not None else None)
+
+
+async def _receive_multipart(request: Request, sink: _ImageSink, boundary: bytes) -> Optional[str]:
+    """Feed the first file part to the sink; returns its filename"""
+    state = {"header_field": b"", "header_value": b"", "headers": {}, "active": False, "done": False}
+    result = {"filename": None}
+    pending: List[bytes] = []
+
+    def on_part_begin():
+        state["headers"] = {}
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_field"].lower()] = state["header_value"]
+        state["header_field"] = b""
+        state["header_value"] = b""
+
+    def on_headers_finished():
+        _, filename = _parse_disposition(state["headers"].get(b"content-disposition", b""))
+        # Campos de texto são ignorados; só o primeiro arquivo é gravado
+        state["active"] = not state["done"] and filename is not None
+        if state["active"]:
+            result["filename"] = filename
+
+    def on_part_data(data, start, end):
+        if state["active"]:
+            pending.append(bytes(data[start:end]))
+
+    def on_part_end():
+        if state["active"]:
+            state["active"] = False
+            state["done"] = True
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    async for chunk in request.stream():
+        parser.write(chunk)
+        # Callbacks são síncronos: os bytes do arquivo são gravados aqui, fora do parser
+        for data in pending:
+            await sink.write(data)
+        pending.clear()
+    parser.finalize()
+
+    if not state["done"]:
+        raise UploadRejected(400, "Multipart body has no complete file part")
+    return result["filename"]
+
+
+async def receive_image_upload(
+    request: Request,
+    max_bytes: int = IMAGE_UPLOAD_MAX_BYTES
+) -> Tuple[BlobInfo, Optional[str]]:
+    """Stream an image upload into the blob store: returns (blob, original filename)
+
+    Aceita multipart/form-data (primeiro arquivo do form) ou o corpo cru com Content-Type image/*.
+    """
+    content_type, params = parse_options_header(request.headers.get('content-type', ''))
+    content_type = content_type.decode('latin-1').lower()
+
+    declared = request.headers.get('content-length')
+    if declared and declared.isdigit() and int(declared) > max_bytes + 64 * 1024:  # folga p/ o envelope multipart
+        raise UploadRejected(413, f"Image larger than {max_bytes} bytes")
+
+    sink = _ImageSink(max_bytes)
+    try:
+        if content_type == 'multipart/form-data':
+            boundary = params.get(b'boundary')
+            if not boundary:
+                raise UploadRejected(400, "Missing multipart boundary")
+            filename = await _receive_multipart(request, sink, boundary)
+        elif content_type.startswith('image/'):
+            filename = None
+            async for chunk in request.stream():
+                await sink.write(chunk)
+        else:
+            raise UploadRejected(415, "Send multipart/form-data or an image/* body")
+
+        blob = await sink.commit()
+    except BaseException:
+        sink.discard()
+        raise
+
+    logger.info(f"✅ Image streamed to blob store: {blob.digest[:12]} ({blob.size} bytes, {blob.content_type})")
+    return blob, filename
+
+
+async def load_uploaded_image(image_id: str) -> bytes:
+    """Bytes of an uploaded image by id; FileNotFoundError if unknown"""
+    if not is_valid_digest(image_id or ''):
+        raise FileNotFoundError(f"Invalid image_id: {image_id}")
+    return await blob_store.read(image_id)
+
+
+async def fetch_image_bytes(url: str) -> bytes:
+    """Image bytes by URL; our own /api/blobs URLs are read straight from the blob store"""
+    digest = parse_blob_ref(url)
+    if digest:
+        try:
+            return await blob_store.read(digest)
+        except FileNotFoundError:
+            pass  # mesmo formato de URL, mas de outro servidor
+    return await http_client.fetch_bytes(url)
@@ -0,0 +1,252 @@
+"""
+Image Worker Pool
+Trabalho de CPU com imagens (base64, verify/decode do PIL, dHash) roda num pool de processos
+limitado, fora do event loop - uploads simultâneos não atrasam os outros requests.
+
+- backpressure: no máximo IMAGE_QUEUE_LIMIT tarefas em andamento/na fila; quem não consegue
+  vaga em IMAGE_QUEUE_TIMEOUT segundos recebe ImagePoolBusyError (HTTP 503)
+- payloads pequenos são processados direto (o IPC custaria mais que o trabalho)
+- probe_image: formato e dimensões lidos só do cabeçalho, sem decodificar pixels
+"""
+
+import os
+import io
+import base64
+import struct
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', str(min(4, os.cpu_count() or 1))))
+IMAGE_QUEUE_LIMIT = int(os.environ.get('IMAGE_QUEUE_LIMIT', '32'))
+IMAGE_QUEUE_TIMEOUT = float(os.environ.get('IMAGE_QUEUE_TIMEOUT', '10'))     # segundos
+IMAGE_INLINE_BYTES = int(os.environ.get('IMAGE_INLINE_BYTES', str(64 * 1024)))
+
+
+class ImagePoolBusyError(RuntimeError):
+    """Raised when no worker slot frees up within the queue timeout"""
+
+
+# ==================== HEADER-ONLY PROBE ====================
+
+class ImageProbe(NamedTuple):
+    format: str             # 'JPEG', 'PNG', 'WEBP', 'GIF'
+    mime_type: str
+    width: int
+    height: int
+
+
+# Marcadores SOF do JPEG (exceto DHT/JPG/DAC) - trazem altura e largura
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _probe_jpeg(data) -> Optional[ImageProbe]:
+    offset = 2
+    size = len(data)
+    while offset + 9 <= size:
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:  # byte de preenchimento
+            offset += 1
+            continue
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack_from('>HH', data, offset + 5)
+            return ImageProbe('JPEG', 'image/jpeg', width, height)
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:  # marcadores sem tamanho
+            offset += 2
+            continue
+        offset += 2 + struct.unpack_from('>H', data, offset + 2)[0]
+    return None
+
+
+def probe_image(data) -> Optional[ImageProbe]:
+    """Format and dimensions from the file header only (no pixel decoding); None if unknown"""
+    head = bytes(data[:32])
+    if head.startswith(b'\xff\xd8\xff'):
+        return _probe_jpeg(data)
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and len(head) >= 24:
+        width, height = struct.unpack_from('>II', head, 16)
+        return ImageProbe('PNG', 'image/png', width, height)
+    if head[:6] in (b'GIF87a', b'GIF89a') and len(head) >= 10:
+        width, height = struct.unpack_from('<HH', head, 6)
+        return ImageProbe('GIF', 'image/gif', width, height)
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP' and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack_from('<HH', head, 26)
+            return ImageProbe('WEBP', 'image/webp', width & 0x3FFF, height & 0x3FFF)
+        if chunk == b'VP8L':
+            bits = struct.unpack_from('<I', head, 21)[0]
+            return ImageProbe('WEBP', 'image/webp', (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+        if chunk == b'VP8X':
+            width = int.from_bytes(head[24:27], 'little') + 1
+            height = int.from_bytes(head[27:30], 'little') + 1
+            return ImageProbe('WEBP', 'image/webp', width, height)
+    return None
+
+
+# ==================== FUNÇÕES DOS WORKERS (top-level: picklable) ====================
+
+def _strip_data_url(data: str) -> str:
+    return data.split(',', 1)[1] if ',' in data else data
+
+
+def decode_base64_image(data: str) -> bytes:
+    """Base64 (with or without a data:image/...;base64, prefix) -> bytes"""
+    return base64.b64decode(_strip_data_url(data))
+
+
+def verify_image(data: bytes) -> Dict[str, Any]:
+    """Full PIL verification: {format, mime_type, width, height}; raises on corrupt images"""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    image.verify()
+    return {
+        "format": image.format,
+        "mime_type": Image.MIME.get(image.format, 'application/octet-stream'),
+        "width": image.width,
+        "height": image.height
+    }
+
+
+def image_dhash(data: bytes) -> int:
+    from image_hashing import dhash
+    return dhash(data)
+
+
+def inspect_base64_image(data: str) -> Dict[str, Any]:
+    """Decode + verify + dHash in one round trip (legacy base64 upload)"""
+    image_bytes = decode_base64_image(data)
+    info = verify_image(image_bytes)
+    try:
+        info["phash"] = image_dhash(image_bytes)
+    except Exception:
+        info["phash"] = None
+    info["size_bytes"] = len(image_bytes)
+    return info
+
+
+def _warm_up() -> int:
+    # Importa o PIL (e registra os plugins de formato) no worker antes do primeiro request
+    try:
+        from PIL import Image
+        Image.init()
+    except ImportError:
+        pass  # sem PIL o primeiro request falha com a mensagem de sempre
+    return os.getpid()
+
+
+# ==================== POOL ====================
+
+class ImageWorkerPool:
+    """ProcessPoolExecutor limitado com backpressure"""
+
+    def __init__(
+        self,
+        workers: int = IMAGE_WORKERS,
+        queue_limit: int = IMAGE_QUEUE_LIMIT,
+        queue_timeout: float = IMAGE_QUEUE_TIMEOUT,
+        inline_bytes: int = IMAGE_INLINE_BYTES
+    ):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self.inline_bytes = inline_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.completed = 0
+        self.inline = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: fork de um processo com threads (aiosqlite, executor) pode travar
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    async def start(self):
+        """Spawn the workers now so the first upload doesn't pay the process start-up"""
+        self._slots = asyncio.Semaphore(self.queue_limit)
+        loop = asyncio.get_event_loop()
+        executor = self._get_executor()
+        try:
+            pids = await asyncio.gather(*(loop.run_in_executor(executor, _warm_up) for _ in range(self.workers)))
+        except Exception as e:
+            # Sem aquecimento: o pool é recriado sob demanda no primeiro uso
+            logger.error(f"❌ Image worker pool failed to start: {e}")
+            self._executor = None
+            return
+        logger.info(f"🖼️ Image worker pool ready ({len(set(pids))} processes, queue limit {self.queue_limit})")
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) in a worker process, waiting at most queue_timeout for a slot"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.queue_limit)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ImagePoolBusyError(f"Image workers busy ({self.queue_limit} tasks queued)")
+
+        self.in_flight += 1
+        try:
+            return await asyncio.get_event_loop().run_in_executor(self._get_executor(), fn, *args)
+        except BrokenProcessPool:
+            # Um worker morreu (ex.: OOM numa imagem gigante): recria o pool para os próximos
+            logger.error("❌ Image worker pool broken - restarting")
+            self._executor = None
+            raise
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._slots.release()
+
+    async def _run_sized(self, fn: Callable, data, size: int) -> Any:
+        if size <= self.inline_bytes:
+            self.inline += 1
+            return fn(data)
+        return await self.run(fn, data)
+
+    async def decode_base64(self, data: str) -> bytes:
+        return await self._run_sized(decode_base64_image, data, len(data))
+
+    async def verify(self, data: bytes) -> Dict[str, Any]:
+        return await self._run_sized(verify_image, data, len(data))
+
+    async def dhash(self, data: bytes) -> int:
+        return await self._run_sized(image_dhash, data, len(data))
+
+    async def inspect_base64(self, data: str) -> Dict[str, Any]:
+        return await self._run_sized(inspect_base64_image, data, len(data))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("🖼️ Image worker pool stopped")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "inline": self.inline,
+            "rejected": self.rejected
+        }
+
+
+# Instância global
+image_pool = ImageWorkerPool()
@@ -0,0 +1,97 @@
+"""
+Load test: concurrent /api/images/analyze calls must overlap (non-blocking Gemini calls)
+
+Usage (server running with GEMINI_KEY configured):
+    uvicorn server:app --port 8001
+    python load_test_analyze.py [concurrency] [base_url]
+
+Reports wall time vs. sum of request latencies (overlap factor ~= concurrency when calls
+run in parallel, ~= 1 when they serialize) and /health latency while the analyses run
+(a blocked event loop shows up as multi-second health checks).
+
+Cada request envia uma imagem diferente (ruído aleatório) com reuse_similar=False: o cache de
+análises (hash do conteúdo + dHash) não responde nenhum deles, então todos chegam ao Gemini.
+"""
+import asyncio
+import base64
+import io
+import random
+import sys
+import time
+
+import httpx
+from PIL import Image
+
+
+def _sample_image(seed: int) -> str:
+    # Blocos 8x8 de cores aleatórias: outro conteúdo (e outro dHash) para cada request
+    rng = random.Random(f"{time.time_ns()}-{seed}")
+    tiles = Image.frombytes('RGB', (8, 8), bytes(rng.randrange(256) for _ in range(8 * 8 * 3)))
+    image = tiles.resize((512, 512), Image.NEAREST)
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=85)
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+async def _analyze(client: httpx.AsyncClient, image_data: str, n: int, t0: float, cached: list):
+    start = time.perf_counter()
+    response = await client.post(
+        "/api/images/analyze", json={"image_data": image_data, "reuse_similar": False}
+    )
+    end = time.perf_counter()
+    hit = response.status_code == 200 and response.json().get("cached", False)
+    if hit:
+        cached.append(n)
+    print(f"  #{n:<3} {start - t0:6.2f}s -> {end - t0:6.2f}s  ({end - start:5.2f}s)  HTTP {response.status_code}"
+          f"{'  (cache hit)' if hit else ''}")
+    return end - start
+
+
+async def _probe_health(client: httpx.AsyncClient, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.2)
+
+
+async def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    base_url = sys.argv[2] if len(sys.argv) > 2 else "http://localhost:8001"
+    images = [_sample_image(n) for n in range(concurrency)]
+
+    print("=" * 60)
+    print(f"Analyze load test: {concurrency} concurrent requests -> {base_url}")
+    print("=" * 60)
+
+    limits = httpx.Limits(max_connections=concurrency + 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        stop = asyncio.Event()
+        health_samples = []
+        cached = []
+        probe = asyncio.create_task(_probe_health(client, stop, health_samples))
+
+        t0 = time.perf_counter()
+        latencies = await asyncio.gather(*(
+            _analyze(client, images[n], n, t0, cached) for n in range(concurrency)
+        ))
+        wall = time.perf_counter() - t0
+
+        stop.set()
+        await probe
+
+    total = sum(latencies)
+    print("-" * 60)
+    print(f"Wall time:          {wall:6.2f}s")
+    print(f"Sum of latencies:   {total:6.2f}s")
+    print(f"Overlap factor:     {total / wall:6.2f}x  (ideal {concurrency}x, serialized 1x)")
+    if health_samples:
+        print(f"/health max during load: {max(health_samples) * 1000:.0f} ms ({len(health_samples)} probes)")
+    if cached:
+        print(f"⚠️ {len(cached)} request(s) answered from the analysis cache - overlap not measured for them")
+
+    return 0 if not cached and (concurrency == 1 or total / wall > 1.5) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
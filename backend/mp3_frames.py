@@ -0,0 +1,253 @@
+"""
+MP3 Frame Utilities
+Leitura de cabeçalhos de frame MPEG Layer III direto dos bytes (sem decodificar).
+
+- duração exata: cabeçalho Xing/Info (com gapless LAME) ou VBRI quando existe,
+  senão varredura frame a frame sobre um memoryview (sem cópias)
+- junção de MP3s sintetizados em partes: cada parte perde ID3v2/ID3v1 e o frame
+  Xing/Info (que descreve só aquela parte) e os frames de áudio são concatenados em ordem
+"""
+
+import struct
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+# Bitrates (kbps) por índice - Layer III
+_BITRATES_MPEG1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0)
+_BITRATES_MPEG2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0)
+
+# Sample rates (Hz) por versão: bits de versão -> tabela
+_SAMPLE_RATES = {
+    0b11: (44100, 48000, 32000),  # MPEG 1
+    0b10: (22050, 24000, 16000),  # MPEG 2
+    0b00: (11025, 12000, 8000),   # MPEG 2.5
+}
+
+
+class FrameHeader(NamedTuple):
+    version: int            # 1 = MPEG 1, 2 = MPEG 2/2.5
+    bitrate: int            # bits por segundo
+    sample_rate: int
+    padding: int
+    mono: bool
+    frame_length: int       # bytes, incluindo o cabeçalho
+    samples: int            # amostras por frame
+
+
+def parse_frame_header(buf, offset: int = 0) -> Optional[FrameHeader]:
+    """Parse the 4-byte Layer III frame header at `offset`, or None if it isn't one"""
+    if offset + 4 > len(buf):
+        return None
+    b0, b1, b2, b3 = buf[offset], buf[offset + 1], buf[offset + 2], buf[offset + 3]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version_bits = (b1 >> 3) & 0b11
+    layer_bits = (b1 >> 1) & 0b11
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0b11
+    if version_bits == 0b01 or layer_bits != 0b01 or sample_rate_index == 0b11:
+        return None  # versão reservada / não é Layer III / sample rate reservado
+
+    mpeg1 = version_bits == 0b11
+    bitrate = (_BITRATES_MPEG1 if mpeg1 else _BITRATES_MPEG2)[bitrate_index] * 1000
+    if not bitrate:
+        return None  # "free format" e índice inválido não são suportados
+
+    sample_rate = _SAMPLE_RATES[version_bits][sample_rate_index]
+    padding = (b2 >> 1) & 1
+    samples = 1152 if mpeg1 else 576
+    frame_length = (samples // 8) * bitrate // sample_rate + padding
+
+    return FrameHeader(
+        version=1 if mpeg1 else 2,
+        bitrate=bitrate,
+        sample_rate=sample_rate,
+        padding=padding,
+        mono=(b3 >> 6) == 0b11,
+        frame_length=frame_length,
+        samples=samples
+    )
+
+
+def id3v2_size(buf) -> int:
+    """Size of a leading ID3v2 tag (0 if there is none)"""
+    if len(buf) < 10 or bytes(buf[:3]) != b'ID3':
+        return 0
+    size = (buf[6] & 0x7F) << 21 | (buf[7] & 0x7F) << 14 | (buf[8] & 0x7F) << 7 | (buf[9] & 0x7F)
+    footer = 10 if buf[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _side_info_size(header: FrameHeader) -> int:
+    if header.version == 1:
+        return 17 if header.mono else 32
+    return 9 if header.mono else 17
+
+
+def is_info_frame(buf, offset: int, header: FrameHeader) -> bool:
+    """True for a Xing/Info (LAME) or VBRI header frame - metadata, not audio"""
+    xing = offset + 4 + _side_info_size(header)
+    if bytes(buf[xing:xing + 4]) in (b'Xing', b'Info'):
+        return True
+    return bytes(buf[offset + 36:offset + 40]) == b'VBRI'
+
+
+def audio_frames_span(data) -> Tuple[int, int]:
+    """(start, end) of the audio frames: skips ID3v2, a Xing/Info/VBRI frame and a trailing ID3v1 tag"""
+    buf = memoryview(data)
+    end = len(buf)
+    if end >= 128 and bytes(buf[end - 128:end - 125]) == b'TAG':
+        end -= 128
+
+    start = id3v2_size(buf)
+    header = parse_frame_header(buf, start)
+    if header and is_info_frame(buf, start, header):
+        start += header.frame_length
+    return min(start, end), end
+
+
+class Mp3Info(NamedTuple):
+    duration: float         # segundos
+    frames: int
+    sample_rate: int
+    bitrate: int            # média, bits por segundo
+    vbr: bool
+    source: str             # 'xing', 'info', 'vbri' ou 'scan'
+
+
+_U32 = struct.Struct('>I')
+
+# Bits do cabeçalho que definem tamanho e duração do frame (sync, versão, layer, bitrate,
+# sample rate, padding) - CRC, canal e flags não importam
+_HEADER_MASK = 0xFFFEFE00
+
+
+def _build_frame_table():
+    table = {}
+    for version_bits in _SAMPLE_RATES:
+        for bitrate_index in range(1, 15):
+            for sample_rate_index in range(3):
+                for padding in (0, 1):
+                    header = (0xFFE00000 | version_bits << 19 | 0b01 << 17 |
+                              bitrate_index << 12 | sample_rate_index << 10 | padding << 9)
+                    info = parse_frame_header(_U32.pack(header))
+                    table[header & _HEADER_MASK] = (info.frame_length, info.samples, info.sample_rate)
+    return table
+
+
+# cabeçalho mascarado -> (frame_length, samples, sample_rate); 252 combinações válidas
+_FRAME_TABLE = _build_frame_table()
+
+
+def _read_info_frame(buf, offset: int, header: FrameHeader) -> Optional[Tuple[int, int, str]]:
+    """(frames, gapless samples to trim, source) from a Xing/Info or VBRI header, if it has a frame count"""
+    xing = offset + 4 + _side_info_size(header)
+    tag = bytes(buf[xing:xing + 4])
+    if tag in (b'Xing', b'Info') and xing + 12 <= len(buf):
+        flags = _U32.unpack_from(buf, xing + 4)[0]
+        if not flags & 0x1:
+            return None
+        frames = _U32.unpack_from(buf, xing + 8)[0]
+
+        # Tag LAME logo após os campos opcionais: delay/padding do encoder (gapless)
+        lame = xing + 12 + (4 if flags & 0x2 else 0) + (100 if flags & 0x4 else 0) + (4 if flags & 0x8 else 0)
+        trim = 0
+        if bytes(buf[lame:lame + 4]) in (b'LAME', b'Lavf', b'Lavc') and lame + 24 <= len(buf):
+            b0, b1, b2 = buf[lame + 21], buf[lame + 22], buf[lame + 23]
+            trim = (b0 << 4 | b1 >> 4) + ((b1 & 0x0F) << 8 | b2)
+        return frames, trim, tag.decode().lower()
+
+    vbri = offset + 36
+    if bytes(buf[vbri:vbri + 4]) == b'VBRI' and vbri + 18 <= len(buf):
+        return _U32.unpack_from(buf, vbri + 14)[0], 0, 'vbri'
+    return None
+
+
+def scan_mp3(data) -> Optional[Mp3Info]:
+    """Exact duration and stream info of an MP3 (bytes, bytearray or memoryview); None if no frames"""
+    buf = memoryview(data)
+    end = len(buf)
+    if end >= 128 and bytes(buf[end - 128:end - 125]) == b'TAG':
+        end -= 128
+
+    offset = id3v2_size(buf)
+    # Primeiro frame pode estar depois de lixo/padding após o ID3
+    while offset + 4 <= end and (_U32.unpack_from(buf, offset)[0] & _HEADER_MASK) not in _FRAME_TABLE:
+        offset += 1
+    first = parse_frame_header(buf, offset)
+    if first is None:
+        return None
+
+    if offset + first.frame_length <= end and is_info_frame(buf, offset, first):
+        info_frame = _read_info_frame(buf, offset, first)
+        if info_frame and info_frame[0]:
+            frames, trim, source = info_frame
+            duration = max(frames * first.samples - trim, 0) / first.sample_rate
+            audio_bytes = end - offset - first.frame_length
+            return Mp3Info(
+                duration=duration,
+                frames=frames,
+                sample_rate=first.sample_rate,
+                bitrate=int(audio_bytes * 8 / duration) if duration else first.bitrate,
+                vbr=source != 'info',
+                source=source
+            )
+        offset += first.frame_length  # cabeçalho sem contagem de frames: ignora e varre
+
+    # Varredura: um lookup de dicionário por frame, sem cópias; os totais saem da contagem
+    # de cada cabeçalho no fim
+    table = _FRAME_TABLE
+    unpack = _U32.unpack_from
+    counts = {}
+    resync = False
+    while offset + 4 <= end:
+        header = unpack(buf, offset)[0] & _HEADER_MASK
+        entry = table.get(header)
+        if entry is None:
+            offset += 1
+            resync = True
+            continue
+        length = entry[0]
+        if offset + length > end:
+            break  # frame truncado no fim do arquivo
+        if resync:
+            # Depois de lixo, só aceita o sync se o próximo frame também for válido
+            after = offset + length
+            if after + 4 <= end and (unpack(buf, after)[0] & _HEADER_MASK) not in table:
+                offset += 1
+                continue
+            resync = False
+        counts[header] = counts.get(header, 0) + 1
+        offset += length
+
+    if not counts:
+        return None
+    duration = 0.0
+    audio_bytes = 0
+    for header, count in counts.items():
+        length, samples, sample_rate = table[header]
+        duration += count * samples / sample_rate
+        audio_bytes += count * length
+    return Mp3Info(
+        duration=duration,
+        frames=sum(counts.values()),
+        sample_rate=first.sample_rate,
+        bitrate=int(audio_bytes * 8 / duration),
+        vbr=len({header & 0xF000 for header in counts}) > 1,
+        source='scan'
+    )
+
+
+def mp3_duration(data) -> float:
+    """Exact MP3 duration in seconds (0.0 if the data has no MPEG audio frames)"""
+    info = scan_mp3(data)
+    return info.duration if info else 0.0
+
+
+def join_mp3(parts: Iterable[bytes]) -> bytes:
+    """Concatenate MP3 parts frame-wise (same encoder settings), without re-encoding"""
+    out = bytearray()
+    for part in parts:
+        start, end = audio_frames_span(part)
+        out += memoryview(part)[start:end]
+    return bytes(out)
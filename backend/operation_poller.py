@@ -0,0 +1,225 @@
+"""
+Long-Running Operation Poller
+Uma única task asyncio acompanha todas as operações pendentes (ex.: Veo 3.1 generate_videos).
+
+Cada operação vira um Future: quem chama só faz `await poller.wait(...)`.
+Intervalo adaptativo por operação: começa rápido, cresce com backoff exponencial até o teto,
+com jitter para não sincronizar as consultas. A cada tick todas as operações vencidas são
+consultadas em paralelo (limitado por um semáforo); cada consulta tem teto de max_interval
+segundos, para que uma chamada travada não atrase as demais.
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+OPERATION_POLL_INITIAL = float(os.environ.get('OPERATION_POLL_INITIAL', '2'))      # segundos
+OPERATION_POLL_MAX = float(os.environ.get('OPERATION_POLL_MAX', '20'))             # segundos
+OPERATION_POLL_BACKOFF = float(os.environ.get('OPERATION_POLL_BACKOFF', '1.5'))
+OPERATION_POLL_JITTER = float(os.environ.get('OPERATION_POLL_JITTER', '0.2'))      # ±20%
+OPERATION_POLL_TIMEOUT = float(os.environ.get('OPERATION_POLL_TIMEOUT', '600'))    # segundos
+OPERATION_POLL_CONCURRENCY = int(os.environ.get('OPERATION_POLL_CONCURRENCY', '16'))
+
+# refresh(operation) -> operation atualizada
+RefreshFn = Callable[[Any], Awaitable[Any]]
+
+
+class OperationTimeoutError(TimeoutError):
+    """Raised when an operation is still running after its deadline"""
+
+
+@dataclass
+class _PendingOperation:
+    name: str
+    operation: Any
+    refresh: RefreshFn
+    future: asyncio.Future
+    deadline: float
+    interval: float
+    next_poll: float
+    started_at: float = field(default_factory=time.monotonic)
+    polls: int = 0
+
+
+class OperationPoller:
+    """Poller compartilhado de operações de longa duração"""
+
+    def __init__(
+        self,
+        initial_interval: float = OPERATION_POLL_INITIAL,
+        max_interval: float = OPERATION_POLL_MAX,
+        backoff: float = OPERATION_POLL_BACKOFF,
+        jitter: float = OPERATION_POLL_JITTER,
+        timeout: float = OPERATION_POLL_TIMEOUT,
+        concurrency: int = OPERATION_POLL_CONCURRENCY
+    ):
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self._pending: Dict[int, _PendingOperation] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._next_id = 0
+        self.completed = 0
+        self.failed = 0
+        self.polls = 0
+
+    def _jittered(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._task = asyncio.create_task(self._run(), name="operation-poller")
+            logger.info("⏱️ Operation poller started")
+
+    async def wait(
+        self,
+        operation: Any,
+        refresh: RefreshFn,
+        timeout: Optional[float] = None,
+        name: Optional[str] = None,
+        initial_delay: Optional[float] = None
+    ) -> Any:
+        """Wait until `operation.done` using the shared poller; returns the final operation
+
+        initial_delay: seconds before the first poll (default: the jittered initial interval)
+        """
+        if getattr(operation, 'done', False):
+            return operation
+
+        loop = asyncio.get_running_loop()
+        self._ensure_running()
+
+        now = time.monotonic()
+        op_id = self._next_id
+        self._next_id += 1
+        entry = _PendingOperation(
+            name=name or getattr(operation, 'name', None) or f"operation-{op_id}",
+            operation=operation,
+            refresh=refresh,
+            future=loop.create_future(),
+            deadline=now + (timeout or self.timeout),
+            interval=self.initial_interval,
+            next_poll=now + (self._jittered(self.initial_interval) if initial_delay is None else initial_delay)
+        )
+        self._pending[op_id] = entry
+        self._wakeup.set()
+
+        try:
+            return await entry.future
+        finally:
+            # Cancelamento do chamador: para de consultar esta operação
+            self._pending.pop(op_id, None)
+
+    async def stop(self):
+        """Cancel the poller task and every pending waiter
+
+        Waiters get CancelledError (not an error): o registro continua 'processing' e a
+        operação persistida é retomada no próximo startup.
+        """
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        for entry in self._pending.values():
+            entry.future.cancel()
+        self._pending.clear()
+        logger.info("⏱️ Operation poller stopped")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "completed": self.completed,
+            "failed": self.failed,
+            "polls": self.polls,
+            "running": bool(self._task and not self._task.done())
+        }
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            due = [(op_id, entry) for op_id, entry in self._pending.items() if entry.next_poll <= now]
+
+            if due:
+                await asyncio.gather(*(self._poll(op_id, entry) for op_id, entry in due))
+                continue
+
+            if self._pending:
+                delay = min(entry.next_poll for entry in self._pending.values()) - now
+            else:
+                delay = None  # ocioso até a próxima operação
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, op_id: int, entry: _PendingOperation):
+        if entry.future.done():
+            self._pending.pop(op_id, None)
+            return
+
+        try:
+            async with self._semaphore:
+                # Teto por consulta: um operations.get travado não segura o tick das outras operações
+                operation = await asyncio.wait_for(entry.refresh(entry.operation), timeout=self.max_interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Erro transitório (ou consulta estourou o teto): tenta de novo com backoff até o deadline
+            if isinstance(e, asyncio.TimeoutError):
+                e = TimeoutError(f"poll timed out after {self.max_interval:g}s")
+            logger.warning(f"⚠️ Poll failed for {entry.name}: {e}")
+            operation = entry.operation
+            if time.monotonic() >= entry.deadline:
+                # Prazo esgotado: definitivo (quem chamou não deve reenviar o job por causa disso)
+                self._finish(op_id, entry, exception=OperationTimeoutError(
+                    f"{entry.name} could not be polled before its deadline: {e}"
+                ))
+                return
+
+        self.polls += 1
+        entry.polls += 1
+        entry.operation = operation
+        now = time.monotonic()
+
+        if getattr(operation, 'done', False):
+            logger.info(f"✅ {entry.name} done after {now - entry.started_at:.0f}s ({entry.polls} polls)")
+            self._finish(op_id, entry, result=operation)
+        elif now >= entry.deadline:
+            self._finish(op_id, entry, exception=OperationTimeoutError(
+                f"{entry.name} still running after {now - entry.started_at:.0f}s"
+            ))
+        else:
+            entry.interval = min(entry.interval * self.backoff, self.max_interval)
+            entry.next_poll = min(now + self._jittered(entry.interval), entry.deadline)
+
+    def _finish(self, op_id: int, entry: _PendingOperation, result: Any = None, exception: Optional[BaseException] = None):
+        self._pending.pop(op_id, None)
+        if entry.future.done():
+            return
+        if exception is not None:
+            self.failed += 1
+            entry.future.set_exception(exception)
+        else:
+            self.completed += 1
+            entry.future.set_result(result)
+
+
+# Instância global
+operation_poller = OperationPoller()
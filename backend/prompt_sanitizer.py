@@ -0,0 +1,414 @@
+"""
+Prompt Sanitizer Engine
+Remove/substitui conteúdo que dispara os filtros de política (FAL.AI, Google Veo, Sora).
+
+As regras são compiladas uma única vez no import:
+- um detector de literais obrigatórios (uma versão case-folded do texto + str.find) descobre
+  quais regras podem casar; regras ausentes não custam nada
+- as regras de remoção do tipo `A.*?B[^.]*?\\.` são executadas por um matcher linear
+  equivalente (sem backtracking quadrático em textos adversariais)
+- a saída é idêntica à aplicação sequencial das regras originais (ver bench_sanitizer.py)
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+_IGNORECASE = re.IGNORECASE
+
+# Detector: texto em minúsculas + equivalências extras do re.IGNORECASE (İ/ı ~ i, ſ ~ s),
+# válido para chaves no alfabeto abaixo (ASCII + Latin-1 minúsculo)
+_CASE_FOLD = {0x130: 'i', 0x131: 'i', 0x17f: 's'}
+_DETECTABLE_KEY = re.compile(r"[a-z0-9 %\[\]à-öø-ÿ]+")
+_ANY = 'any'            # .*? com DOTALL (atravessa frases)
+_SENTENCE = 'sentence'  # [^.]*? (não atravessa '.')
+
+
+class _Rule:
+    """Base rule: `key` is a literal that every match must contain (used by the detector)"""
+
+    def __init__(self, key: str, replacement: Optional[str]):
+        self.key = key
+        self.replacement = replacement
+        self.key_id = -1
+        self.created_key_ids: Optional[List[int]] = None  # recalculado pelo engine (None = todas)
+
+    def apply(self, text: str) -> Tuple[str, bool]:
+        raise NotImplementedError
+
+
+class _LiteralRule(_Rule):
+    """Case-sensitive str.replace"""
+
+    def __init__(self, word: str, replacement: str):
+        super().__init__(word, replacement)
+        self.word = word
+
+    def apply(self, text: str) -> Tuple[str, bool]:
+        new_text = text.replace(self.word, self.replacement)
+        return new_text, new_text != text
+
+
+class _RegexRule(_Rule):
+    """re.sub with a plain replacement string"""
+
+    def __init__(self, pattern: str, replacement: str, key: str, flags: int = _IGNORECASE):
+        super().__init__(key, replacement)
+        self.pattern = re.compile(pattern, flags)
+
+    def apply(self, text: str) -> Tuple[str, bool]:
+        new_text, count = self.pattern.subn(self.replacement, text)
+        return new_text, count > 0
+
+
+class _SpanRule(_Rule):
+    """Linear removal of `A gap B gap C ...` chains (case-insensitive).
+
+    `first` is a literal; the `rest` elements are regex fragments without '.' inside
+    'sentence' gaps (the final r'\\.' element is the sentence terminator).
+
+    Equivalente a re.sub('', ...) com o padrão lazy original, mas cada busca avança
+    sempre para frente:
+    - elementos com gap 'any' (.*? DOTALL) vêm antes dos elementos com gap 'sentence'
+      ([^.]*?); a ocorrência mais cedo de cada elemento 'any' é sempre a melhor escolha
+    - na fase 'sentence', se a primeira ocorrência de uma frase falha, as seguintes
+      da mesma frase também falham, então pulamos para a próxima frase
+    - sentence_start=True reproduz o prefixo `[^.]*?` (remove a frase desde o início)
+    """
+
+    def __init__(
+        self,
+        first: str,
+        rest: Sequence[Tuple[str, str]] = (),
+        key: Optional[str] = None,
+        sentence_start: bool = False
+    ):
+        super().__init__(key or first, '')
+        self.first = re.compile(re.escape(first), _IGNORECASE)
+        self.sentence_start = sentence_start
+        self.any_elements: List[re.Pattern] = []
+        self.sentence_elements: List[Optional[re.Pattern]] = []  # None = '.' final
+
+        for element, gap in rest:
+            if gap == _ANY:
+                if self.sentence_elements:
+                    raise ValueError("'any' gaps must come before 'sentence' gaps")
+                self.any_elements.append(re.compile(element, _IGNORECASE))
+            elif element == r'\.':
+                self.sentence_elements.append(None)
+            else:
+                self.sentence_elements.append(re.compile(element, _IGNORECASE))
+
+    def _match_sentence(self, text: str, pos: int) -> int:
+        """End of the sentence-phase match starting at pos, or -1"""
+        dot = text.find('.', pos)
+        limit = dot if dot >= 0 else len(text)
+        for element in self.sentence_elements:
+            if element is None:
+                return dot + 1 if dot >= 0 else -1
+            match = element.search(text, pos, limit)
+            if not match:
+                return -1
+            pos = match.end()
+        return pos
+
+    def _match_rest(self, text: str, pos: int) -> int:
+        """End of the match after the first element, or -1"""
+        if not self.any_elements:
+            return self._match_sentence(text, pos)
+
+        for element in self.any_elements[:-1]:
+            match = element.search(text, pos)
+            if not match:
+                return -1
+            pos = match.end()
+
+        last = self.any_elements[-1]
+        while True:
+            match = last.search(text, pos)
+            if not match:
+                return -1
+            if not self.sentence_elements:
+                return match.end()
+            end = self._match_sentence(text, match.end())
+            if end >= 0:
+                return end
+            # Próxima frase
+            dot = text.find('.', match.end())
+            if dot < 0:
+                return -1
+            pos = dot + 1
+
+    def apply(self, text: str) -> Tuple[str, bool]:
+        parts = []
+        pos = last = 0
+        while True:
+            match = self.first.search(text, pos)
+            if not match:
+                break
+
+            end = self._match_rest(text, match.end())
+            if end < 0:
+                if self.any_elements:
+                    break  # nenhum início posterior pode casar
+                dot = text.find('.', match.end())
+                if dot < 0:
+                    break
+                pos = dot + 1
+                continue
+
+            start = match.start()
+            if self.sentence_start:
+                start = text.rfind('.', pos, start) + 1 or pos
+            parts.append(text[last:start])
+            last = pos = end
+
+        if not parts:
+            return text, False
+        parts.append(text[last:])
+        return ''.join(parts), True
+
+
+def _can_overlap(replacement: str, key: str) -> bool:
+    """True if inserting `replacement` can create a new occurrence of `key`"""
+    r, k = replacement.lower(), key.lower()
+    for offset in range(-len(k) + 1, len(r)):
+        if all(k[t] == r[offset + t] for t in range(len(k)) if 0 <= offset + t < len(r)):
+            return True
+    return False
+
+
+class SanitizerEngine:
+    """Ordered rules + one-pass key detector + whitespace cleanup"""
+
+    def __init__(self, rules: Sequence[_Rule], cleanup: Sequence[Tuple[str, str]], strip: bool = True):
+        self.rules = list(rules)
+        self.cleanup = [(re.compile(pattern), replacement) for pattern, replacement in cleanup]
+        self.strip = strip
+
+        # O detector ignora maiúsculas sempre (superconjunto seguro para regras case-sensitive)
+        keys: Dict[str, int] = {}
+        for rule in self.rules:
+            key = rule.key.lower()
+            if not _DETECTABLE_KEY.fullmatch(key):
+                raise ValueError(f"Rule key not supported by the detector: {rule.key!r}")
+            rule.key_id = keys.setdefault(key, len(keys))
+        self._keys = list(keys)
+
+        # Após uma substituição só é preciso re-checar as chaves posteriores que ela pode criar;
+        # remoções ('') juntam trechos arbitrários e exigem a detecção completa
+        for n, rule in enumerate(self.rules):
+            if rule.replacement:
+                rule.created_key_ids = sorted({
+                    other.key_id for other in self.rules[n + 1:]
+                    if _can_overlap(rule.replacement, other.key)
+                })
+
+    def _detect(self, text: str, key_ids: Optional[Sequence[int]] = None) -> Set[int]:
+        """IDs of the rule keys present in text (case-insensitive)"""
+        if 'İ' in text or 'ı' in text or 'ſ' in text:  # raros: str.translate é lento
+            text = text.translate(_CASE_FOLD)
+        folded = text.lower()
+        keys = self._keys
+        if key_ids is None:
+            return {key_id for key_id, key in enumerate(keys) if key in folded}
+        return {key_id for key_id in key_ids if keys[key_id] in folded}
+
+    def sanitize(self, text: str) -> str:
+        present = self._detect(text)
+        if present:
+            for rule in self.rules:
+                if rule.key_id not in present:
+                    continue
+                text, changed = rule.apply(text)
+                if not changed:
+                    continue
+                if rule.created_key_ids is None:
+                    present = self._detect(text)
+                elif rule.created_key_ids:
+                    present |= self._detect(text, rule.created_key_ids)
+
+        for pattern, replacement in self.cleanup:
+            text = pattern.sub(replacement, text)
+        return text.strip() if self.strip else text
+
+
+# ==================== VIDEO PROMPT RULES ====================
+
+_VIDEO_RULES: List[_Rule] = [
+    # STEP 1: Remove ALL mentions of facial fidelity/identity/preservation
+    # (disparam a detecção de DEEPFAKE em todos os serviços)
+    _SpanRule('[Manter', [(r'\]', _ANY)], key='manter'),                          # \[Manter[^\]]*\]
+    _SpanRule('[', [('identidade', _ANY), (r'\]', _ANY)], key='identidade'),      # \[.*?identidade.*?\]
+    _SpanRule('[', [('fidelidade', _ANY), (r'\]', _ANY)], key='fidelidade'),      # \[.*?fidelidade.*?\]
+    _SpanRule('[', [('NÃO DEVEM', _ANY), (r'\]', _ANY)], key='não devem'),        # \[.*?NÃO DEVEM.*?\]
+    _SpanRule('[', [('preserv', _ANY), (r'\]', _ANY)], key='preserv'),            # \[.*?preserv.*?\]
+    _SpanRule('manter', [('identidade', _ANY), (r'\.', _SENTENCE)]),              # [Mm]anter.*?identidade[^.]*\.
+    _SpanRule('preserv', [('fidelidade', _ANY), (r'\.', _SENTENCE)]),             # [Pp]reserv.*?fidelidade[^.]*\.
+    _SpanRule('exata', [('semelhança', _ANY), (r'\.', _SENTENCE)]),               # [Ee]xata.*?semelhança[^.]*\.
+    _SpanRule('identidade', [('visual', _ANY), (r'\.', _SENTENCE)]),              # [Ii]dentidade.*?visual[^.]*\.
+    _SpanRule('características', [                                                # [Cc]aracterísticas.*?físicas
+        ('físicas', _ANY), ('mantidas', _SENTENCE), (r'\.', _SENTENCE)            #   [^.]*?mantidas[^.]*?\.
+    ]),
+    _SpanRule('expressões faciais', [                                             # [^.]*?expressões faciais
+        ('fidelidade', _SENTENCE), (r'\.', _SENTENCE)                             #   [^.]*?fidelidade[^.]*?\.
+    ], sentence_start=True),
+    _SpanRule('As expressões faciais devem ser preservadas', [(r'\.', _SENTENCE)],
+              key='expressões faciais'),
+    _SpanRule('com alta fidelidade', key='fidelidade'),
+    _SpanRule('devem ser preservadas', [('fidelidade', _SENTENCE)], key='preserv'),
+    _SpanRule('alta fidelidade', key='fidelidade'),
+    _SpanRule('preservadas com alta fidelidade', [(r'\.', _SENTENCE)],            # [^.]*?preservadas com alta
+              key='preserv', sentence_start=True),                                #   fidelidade[^.]*?\.
+    _SpanRule('expressões faciais', [('alta fidelidade', _SENTENCE), (r'\.', _SENTENCE)]),
+    _SpanRule('semelhança', [('exata', _ANY)]),                                   # [Ss]emelhança.*?exata.*?
+    _SpanRule('100%', [('identidade|fidelidade|semelhança', _ANY)]),
+
+    # STEP 2: Replace VIOLENT and GRAPHIC content words
+    _RegexRule(r'ameaçador(a|amente|es)?', 'impressionante', 'ameaçador'),
+    _RegexRule(r'assustador(a|es)?', 'surpreendente', 'assustador'),
+    _RegexRule(r'violento?(a|amente|s)?', 'intenso', 'violent'),
+    _RegexRule(r'afiado?(a|s)?', 'visível', 'afiad'),
+    _RegexRule(r'ataca(r|ndo|m)?', 'aproxima', 'ataca'),
+    _RegexRule(r'ataque', 'aproximação', 'ataque'),
+    _RegexRule(r'medo', 'admiração', 'medo'),
+    _RegexRule(r'terror', 'impacto', 'terror'),
+    _RegexRule(r'pânico', 'intensidade', 'pânico'),
+    _RegexRule(r'perigoso?(a|s)?', 'impressionante', 'perigos'),
+    _RegexRule(r'sangue', 'efeito visual dramático', 'sangue'),
+    _RegexRule(r'sangrento?(a|s)?', 'dramático', 'sangrent'),
+    _RegexRule(r'mort(e|o|a|os|as)', 'drama', 'mort'),
+    _RegexRule(r'morre(r|ndo|u|m)?', 'desaparece', 'morre'),
+    _RegexRule(r'mata(r|ndo|m|ram)?', 'neutraliza', 'mata'),
+    _RegexRule(r'agressiv(o|a|amente|os|as)', 'energétic', 'agressiv'),
+    _RegexRule(r'ferimento', 'marca dramática', 'ferimento'),
+    _RegexRule(r'ferido?(a|s)?', 'afetado', 'ferid'),
+    _RegexRule(r'ferir', 'impactar', 'ferir'),
+    _RegexRule(r'tortura', 'tensão extrema', 'tortura'),
+    _RegexRule(r'mutilação', 'transformação', 'mutilação'),
+    _RegexRule(r'brutal(idade)?', 'intenso', 'brutal'),
+
+    # STEP 3: Replace WEAPONS mentions (contextual)
+    _RegexRule(r'\barma\b', 'objeto cênico', 'arma'),
+    _RegexRule(r'\barmas\b', 'objetos cênicos', 'armas'),
+    _RegexRule(r'\bfaca\b', 'objeto metálico', 'faca'),
+    _RegexRule(r'\bfacas\b', 'objetos metálicos', 'facas'),
+    _RegexRule(r'\bespada\b', 'lâmina cênica', 'espada'),
+    _RegexRule(r'\bpistola\b', 'objeto de cena', 'pistola'),
+    _RegexRule(r'\brevólver\b', 'objeto de cena', 'revólver'),
+
+    # STEP 4: Replace EXPLICIT content (if any slips through)
+    _RegexRule(r'\bnu\b', 'natural', 'nu'),
+    _RegexRule(r'\bnua\b', 'natural', 'nua'),
+    _RegexRule(r'\bnudez\b', 'naturalidade', 'nudez'),
+    _RegexRule(r'\bdespido?(a|s)?\b', 'simples', 'despid'),
+
+    # STEP 5: Replace ILLEGAL ACTIVITIES
+    _RegexRule(r'\bdroga\b', 'substância', 'droga'),
+    _RegexRule(r'\bdrogas\b', 'substâncias', 'drogas'),
+]
+
+# STEP 6: Clean up extra spaces and formatting
+_VIDEO_CLEANUP = [
+    (r'\s+', ' '),            # Multiple spaces to single
+    (r'\.\s*\.', '.'),        # Double periods
+    (r'\s+([,.])', r'\1'),    # Space before punctuation
+]
+
+
+# ==================== ANALYSIS RULES ====================
+
+_ANALYSIS_WORDS = {
+    # 1. VIOLÊNCIA E CONTEÚDO GRÁFICO
+    'ameaçador': 'impressionante',
+    'ameaçadora': 'impressionante',
+    'ameaçadoramente': 'majestosamente',
+    'assustador': 'surpreendente',
+    'assustadora': 'surpreendente',
+    'violento': 'intenso',
+    'violenta': 'intensa',
+    'violentamente': 'intensamente',
+    'afiados': 'visíveis',
+    'afiado': 'visível',
+    'afiada': 'visível',
+    'ataque': 'aproximação',
+    'atacar': 'se aproximar',
+    'atacando': 'se aproximando',
+    'medo': 'admiração',
+    'terror': 'impacto',
+    'pânico': 'intensidade',
+    'sangue': 'efeito visual dramático',
+    'morte': 'drama',
+    'morrer': 'desaparecer',
+    'morto': 'imóvel',
+    'matar': 'neutralizar',
+    'agressiv': 'energétic',
+    'ferimento': 'marca dramática',
+    'ferido': 'afetado',
+    'ferir': 'impactar',
+    'tortura': 'tensão extrema',
+    'mutilação': 'transformação dramática',
+    'brutal': 'intenso',
+    'sangrento': 'dramático',
+    'arma': 'objeto cênico',
+    'armas': 'objetos cênicos',
+    'faca': 'objeto metálico',
+    'facas': 'objetos metálicos',
+    'espada': 'lâmina cênica',
+    'pistola': 'objeto de cena',
+    'revólver': 'objeto de cena',
+    # 2. CONTEÚDO SEXUAL/EXPLÍCITO
+    'nu': 'sem adornos',
+    'nua': 'natural',
+    'nudez': 'naturalidade',
+    'despido': 'simples',
+    'sensual': 'elegante',
+    # 4. DISCURSO DE ÓDIO (prevenção)
+    'odiar': 'desgostar',
+    'ódio': 'antipatia',
+    # 5. ATIVIDADES ILEGAIS
+    'droga': 'substância',
+    'drogas': 'substâncias',
+    'cocaína': 'pó branco',
+    'maconha': 'erva',
+}
+
+_ANALYSIS_RULES: List[_Rule] = [
+    *(_LiteralRule(word, replacement) for word, replacement in _ANALYSIS_WORDS.items()),
+
+    # Remove facial fidelity instructions (triggers deepfake detection)
+    _SpanRule('[Manter a identidade facial', [(r'\]', _ANY)], key='identidade'),
+    _SpanRule('[', [('NÃO DEVEM ser alterados', _ANY), (r'\]', _ANY)], key='não devem'),
+    _SpanRule('[', [('preservando 100%', _ANY), (r'\]', _ANY)], key='preservando 100%'),
+    _SpanRule('Manter a identidade facial', [(r'características físicas\.', _ANY)], key='identidade'),
+    _SpanRule('Os rostos', [('NÃO DEVEM', _ANY), (r'substituídos\.', _ANY)], key='não devem'),
+    _SpanRule('preservando 100% da fidelidade', [(r'\.', _ANY)], key='preservando 100%'),
+]
+
+_ANALYSIS_CLEANUP = [
+    (r'\s+', ' '),
+]
+
+VIDEO_PROMPT_SANITIZER = SanitizerEngine(_VIDEO_RULES, _VIDEO_CLEANUP)
+ANALYSIS_SANITIZER = SanitizerEngine(_ANALYSIS_RULES, _ANALYSIS_CLEANUP)
+
+
+def sanitize_prompt(prompt: str) -> str:
+    """Remove ALL potentially problematic content that triggers FAL.AI and Google Veo filters"""
+    return VIDEO_PROMPT_SANITIZER.sanitize(prompt)
+
+
+def sanitize_analysis(data: Any) -> Any:
+    """Clean every string in the analysis data in place (dicts/lists are mutated, not copied)"""
+    if isinstance(data, str):
+        return ANALYSIS_SANITIZER.sanitize(data)
+
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        items = node.items() if isinstance(node, dict) else enumerate(node) if isinstance(node, list) else ()
+        for key, value in items:
+            if isinstance(value, str):
+                node[key] = ANALYSIS_SANITIZER.sanitize(value)
+            elif isinstance(value, (dict, list)):
+                stack.append(value)
+    return data
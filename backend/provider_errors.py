@@ -0,0 +1,116 @@
+"""
+Provider Errors - classificação de erros dos providers de vídeo
+Um único lugar decide o que um erro significa: mensagem amigável para o usuário (rotas de vídeo)
+e se a falha é do provider (5xx/timeout) - o que alimenta os circuit breakers.
+
+- CONTENT_POLICY / INVALID_PARAMS: problema do request, o provider está saudável
+- AUTH_ERROR: credencial inválida (configuração)
+- SERVICE_UNAVAILABLE: 5xx, sobrecarga, timeouts - conta como falha do provider
+- GENERATION_ERROR: desconhecido
+"""
+
+import asyncio
+import logging
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Códigos que indicam falha do provider (e não do request)
+PROVIDER_FAILURE_CODES = frozenset({"SERVICE_UNAVAILABLE"})
+
+
+class ClassifiedError(NamedTuple):
+    error_code: str
+    friendly_message: str
+
+    @property
+    def provider_failure(self) -> bool:
+        return self.error_code in PROVIDER_FAILURE_CODES
+
+
+def classify_video_error(
+    error_message: str,
+    error_detail: Optional[str] = None,
+    log_unknown: bool = True
+) -> ClassifiedError:
+    """Classify a provider error message into (error_code, friendly_message)"""
+    # Check for specific FAL.AI error patterns
+    error_lower = error_message.lower()
+
+    # Pattern 1: Actual content policy violations
+    is_content_policy = (
+        'content_policy_violation' in error_lower or
+        'content policy' in error_lower or
+        'violates our content policy' in error_lower or
+        'blocked by safety' in error_lower or
+        'safety filter' in error_lower
+    )
+
+    # Pattern 2: Authentication/API key errors
+    is_auth_error = (
+        'unauthorized' in error_lower or
+        'invalid api key' in error_lower or
+        'authentication failed' in error_lower or
+        '401' in error_message or
+        '403' in error_message
+    )
+
+    # Pattern 3: Invalid parameters
+    is_param_error = (
+        'invalid parameter' in error_lower or
+        'bad request' in error_lower or
+        '400' in error_message or
+        'validation error' in error_lower
+    )
+
+    # Pattern 4: Service unavailable (5xx, timeouts)
+    is_service_error = (
+        '503' in error_message or
+        '502' in error_message or
+        '504' in error_message or
+        'service unavailable' in error_lower or
+        'internal server error' in error_lower or
+        'timeout' in error_lower or
+        'timed out' in error_lower
+    )
+
+    # Generate user-friendly messages based on error type
+    if is_content_policy:
+        friendly_message = """⚠️ Política de Conteúdo: O prompt contém termos que foram bloqueados pela política de conteúdo da IA.
+
+Dicas para resolver:
+• Evite palavras como: ameaçador, violento, ataque, sangue, armas
+• Use palavras neutras: impressionante, surpreendente, dramático
+• Foque na descrição visual sem conotação violenta
+
+Exemplo: Em vez de "T-Rex ameaçador rugindo", use "T-Rex impressionante com boca aberta"."""
+        error_code = "CONTENT_POLICY"
+
+    elif is_auth_error:
+        friendly_message = "❌ Erro de Autenticação: Chave de API FAL.AI inválida ou expirada. Verifique suas credenciais."
+        error_code = "AUTH_ERROR"
+
+    elif is_param_error:
+        friendly_message = f"❌ Parâmetros Inválidos: {error_message}\n\nVerifique se a imagem está acessível e o prompt está correto."
+        error_code = "INVALID_PARAMS"
+
+    elif is_service_error:
+        friendly_message = "❌ Serviço Temporariamente Indisponível: O servidor FAL.AI está sobrecarregado. Tente novamente em alguns minutos."
+        error_code = "SERVICE_UNAVAILABLE"
+
+    else:
+        # Unknown error - show actual error message for debugging
+        friendly_message = f"❌ Erro ao gerar vídeo:\n\n{error_message}\n\nDetalhes técnicos: {error_detail or 'N/A'}"
+        error_code = "GENERATION_ERROR"
+        if log_unknown:
+            logger.error(f"❌ UNKNOWN ERROR TYPE - Full message: {error_message}")
+
+    return ClassifiedError(error_code, friendly_message)
+
+
+def classify_exception(error: BaseException) -> ClassifiedError:
+    """classify_video_error for an exception (timeouts often have an empty message); doesn't log"""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return classify_video_error(f"timeout: {error}", log_unknown=False)
+    error_detail = str(error.args[0]) if error.args else None
+    return classify_video_error(str(error), error_detail, log_unknown=False)
@@ -0,0 +1,260 @@
+"""
+Provider Scheduler - limites de concorrência, rate limit e filas por prioridade
+Cada provider externo (FAL, Veo, Gemini, ElevenLabs, HuggingFace Spaces) tem:
+
+- slots de concorrência: no máximo N chamadas em andamento
+- token bucket: no máximo R chamadas iniciadas por minuto (com rajada)
+- duas filas (lanes): 'premium' é atendida antes de 'economico'; a cada PROVIDER_PRIORITY_BURST
+  liberações seguidas para premium, uma vai para economico (sem starvation)
+- admission control: lane cheia => ProviderBusyError (HTTP 429 com Retry-After)
+- vídeo (fal, google_veo): o slot cobre a submissão e é liberado quando o provider aceita o job;
+  esperar a renderização (poller compartilhado / fila da FAL) não ocupa vaga
+
+Uso: `async with provider_scheduler.slot('fal', 'premium'): ...`
+"""
+
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LANES = ("premium", "economico")  # ordem = prioridade
+
+# Padrões por provider: (slots, chamadas/minuto, rajada); 0 chamadas/minuto = sem rate limit
+_DEFAULT_LIMITS = {
+    "fal": (4, 60, 10),
+    "google_veo": (2, 10, 2),
+    "gemini": (8, 60, 10),
+    "elevenlabs": (4, 120, 10),
+    "huggingface": (1, 10, 2),
+}
+
+# Configuração via .env
+PROVIDER_QUEUE_LIMITS = {
+    "premium": int(os.environ.get('PROVIDER_QUEUE_PREMIUM', '20')),
+    "economico": int(os.environ.get('PROVIDER_QUEUE_ECONOMICO', '10')),
+}
+PROVIDER_PRIORITY_BURST = int(os.environ.get('PROVIDER_PRIORITY_BURST', '4'))
+PROVIDER_MAX_RETRY_AFTER = 300  # segundos
+
+_WAIT_SAMPLES = 256  # esperas recentes por lane (p95)
+
+
+def _limits(name: str):
+    slots, rpm, burst = _DEFAULT_LIMITS[name]
+    prefix = f"PROVIDER_{name.upper()}_"
+    return (
+        int(os.environ.get(prefix + 'CONCURRENCY', str(slots))),
+        float(os.environ.get(prefix + 'RPM', str(rpm))),
+        int(os.environ.get(prefix + 'BURST', str(burst)))
+    )
+
+
+class ProviderBusyError(RuntimeError):
+    """Lane queue is full: shed the request (HTTP 429)"""
+
+    def __init__(self, provider: str, lane: str, retry_after: int):
+        super().__init__(f"{provider} is at capacity ({lane} queue full), retry in {retry_after}s")
+        self.provider = provider
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket com reserva: reserve() devolve quanto esperar pela próxima ficha"""
+
+    def __init__(self, per_minute: float, burst: int):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        # Saldo negativo = fichas já prometidas a quem está esperando
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class _LaneStats:
+    def __init__(self):
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+    def record(self, wait: float):
+        self.admitted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.recent_waits.append(wait)
+
+
+class ProviderLimiter:
+    """Slots + token bucket + filas por lane de um provider"""
+
+    def __init__(self, name: str, concurrency: int, per_minute: float, burst: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.per_minute = per_minute
+        self._bucket = TokenBucket(per_minute, burst)
+        self._active = 0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in LANES}
+        self._stats: Dict[str, _LaneStats] = {lane: _LaneStats() for lane in LANES}
+        self._premium_streak = 0
+        self._hold_avg = 0.0  # média móvel do tempo de uso de um slot (estimativa de Retry-After)
+
+    def _queued(self, lane: str) -> int:
+        return sum(1 for waiter in self._queues[lane] if not waiter.done())
+
+    def retry_after(self, lane: str) -> int:
+        ahead = sum(self._queued(other) for other in LANES[:LANES.index(lane) + 1])
+        estimate = (self._hold_avg or 5.0) * (ahead + 1) / self.concurrency
+        return max(1, min(PROVIDER_MAX_RETRY_AFTER, math.ceil(estimate)))
+
+    def admit(self, lane: str):
+        """Raise ProviderBusyError if the lane queue is full (call before starting paid work)"""
+        if self._queued(lane) >= PROVIDER_QUEUE_LIMITS[lane]:
+            self._stats[lane].rejected += 1
+            retry_after = self.retry_after(lane)
+            logger.warning(f"🚦 {self.name}: {lane} queue full, shedding request (Retry-After {retry_after}s)")
+            raise ProviderBusyError(self.name, lane, retry_after)
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        premium, economico = (self._queues[lane] for lane in LANES)
+        for queue in (premium, economico):
+            while queue and queue[0].done():
+                queue.popleft()  # cancelados enquanto esperavam
+
+        if economico and (not premium or self._premium_streak >= PROVIDER_PRIORITY_BURST):
+            self._premium_streak = 0
+            return economico.popleft()
+        if premium:
+            self._premium_streak += 1 if economico else 0
+            return premium.popleft()
+        return None
+
+    async def acquire(self, lane: str, shed: bool = True):
+        """Wait for a slot (and a rate-limit token) in the given lane"""
+        if lane not in self._queues:
+            raise ValueError(f"Unknown lane: {lane}")
+        if shed:
+            self.admit(lane)
+
+        start = time.monotonic()
+        if self._active < self.concurrency and not any(self._queued(l) for l in LANES):
+            self._active += 1
+        else:
+            waiter = asyncio.get_event_loop().create_future()
+            self._queues[lane].append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release_slot()  # o slot chegou junto com o cancelamento: repassa
+                raise
+
+        try:
+            delay = self._bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        except BaseException:
+            self._release_slot()
+            raise
+        self._stats[lane].record(time.monotonic() - start)
+
+    def _release_slot(self):
+        waiter = self._next_waiter()
+        if waiter is not None:
+            waiter.set_result(None)  # o slot passa direto para o próximo: _active não muda
+        else:
+            self._active -= 1
+
+    def release(self, held: float):
+        self._hold_avg = held if not self._hold_avg else 0.9 * self._hold_avg + 0.1 * held
+        self._release_slot()
+
+    def stats(self) -> Dict[str, Any]:
+        lanes = {}
+        for lane in LANES:
+            stats = self._stats[lane]
+            recent = sorted(stats.recent_waits)
+            lanes[lane] = {
+                "queue_depth": self._queued(lane),
+                "queue_limit": PROVIDER_QUEUE_LIMITS[lane],
+                "admitted": stats.admitted,
+                "rejected": stats.rejected,
+                "wait_avg_ms": round(stats.total_wait / stats.admitted * 1000, 1) if stats.admitted else 0.0,
+                "wait_p95_ms": round(recent[int(len(recent) * 0.95)] * 1000, 1) if recent else 0.0,
+                "wait_max_ms": round(stats.max_wait * 1000, 1)
+            }
+        return {
+            "concurrency": self.concurrency,
+            "active": self._active,
+            "rate_per_minute": self.per_minute,
+            "avg_hold_seconds": round(self._hold_avg, 2),
+            "lanes": lanes
+        }
+
+
+class ProviderLease:
+    """A held slot; release() is idempotent (streams release it from more than one place)"""
+
+    def __init__(self, limiter: ProviderLimiter):
+        self._limiter = limiter
+        self._start = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._limiter.release(time.monotonic() - self._start)
+
+
+class ProviderScheduler:
+    """Um ProviderLimiter por provider externo"""
+
+    def __init__(self):
+        self.providers: Dict[str, ProviderLimiter] = {
+            name: ProviderLimiter(name, *_limits(name)) for name in _DEFAULT_LIMITS
+        }
+
+    def admit(self, provider: str, lane: str = "premium"):
+        """Fail fast with ProviderBusyError when the provider's lane queue is full"""
+        self.providers[provider].admit(lane)
+
+    async def acquire(self, provider: str, lane: str = "premium", shed: bool = True) -> ProviderLease:
+        """Take one of the provider's slots; the caller must release() the lease
+
+        shed=False: espera mesmo com a fila cheia (jobs já aceitos, partes de uma narração já admitida)
+        """
+        limiter = self.providers[provider]
+        await limiter.acquire(lane, shed)
+        return ProviderLease(limiter)
+
+    @asynccontextmanager
+    async def slot(self, provider: str, lane: str = "premium", shed: bool = True):
+        """Hold one of the provider's slots for the duration of the block"""
+        lease = await self.acquire(provider, lane, shed)
+        try:
+            yield
+        finally:
+            lease.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: limiter.stats() for name, limiter in self.providers.items()}
+
+
+# Instância global
+provider_scheduler = ProviderScheduler()
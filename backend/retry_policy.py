@@ -0,0 +1,240 @@
+"""
+Retry Policy - novas tentativas para falhas transitórias dos providers
+Um 502 isolado da FAL ou um 503 passageiro do Gemini não derrubam mais o request inteiro.
+
+- só erros transitórios: 408/429/5xx, timeouts e falhas de conexão (provider_errors decide pelo texto
+  quando não há status); conteúdo, parâmetros, autenticação, fila cheia e circuito aberto falham na hora
+- backoff exponencial com decorrelated jitter: espera = min(teto, uniforme(base, 3 × espera anterior)),
+  respeitando o Retry-After do provider quando vier
+- deadline: uma nova tentativa só começa se espera + duração mínima de uma tentativa cabem no
+  tempo que resta ao request
+- retry budget por provider: retries ≤ RETRY_BUDGET_RATIO das chamadas (+ um mínimo por minuto),
+  para que uma queda do provider não vire uma tempestade de retries
+
+Uso: `await retry_policies.get('elevenlabs').run(lambda: chamada())`
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from provider_errors import classify_exception
+from provider_scheduler import ProviderBusyError
+from circuit_breaker import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Padrões por provider: (tentativas, espera base s, espera máxima s, tempo total do request s, duração mínima de uma tentativa s)
+_DEFAULT_POLICIES = {
+    "video": (3, 2.0, 30.0, 1200.0, 180.0),      # FAL / Veo: uma geração leva minutos
+    "elevenlabs": (3, 0.5, 5.0, 60.0, 2.0),
+    "gemini": (3, 0.5, 4.0, 60.0, 3.0),
+}
+
+# Configuração via .env
+RETRY_BUDGET_RATIO = float(os.environ.get('RETRY_BUDGET_RATIO', '0.2'))          # retries por chamada
+RETRY_BUDGET_MIN_PER_MINUTE = float(os.environ.get('RETRY_BUDGET_MIN_PER_MINUTE', '6'))
+
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+_BUDGET_CAPACITY = 20  # teto de retries acumulados
+
+
+def _policy_settings(name: str):
+    attempts, base, max_delay, timeout, min_attempt = _DEFAULT_POLICIES[name]
+    prefix = f"RETRY_{name.upper()}_"
+    return (
+        int(os.environ.get(prefix + 'ATTEMPTS', str(attempts))),
+        float(os.environ.get(prefix + 'BASE_DELAY', str(base))),
+        float(os.environ.get(prefix + 'MAX_DELAY', str(max_delay))),
+        float(os.environ.get(prefix + 'TIMEOUT', str(timeout))),
+        float(os.environ.get(prefix + 'MIN_ATTEMPT', str(min_attempt)))
+    )
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for transient provider failures worth another attempt"""
+    if isinstance(error, (ProviderBusyError, CircuitOpenError)):
+        return False  # decisões de capacidade: o chamador já recebe 429/503 com Retry-After
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    if isinstance(error, (httpx.TransportError, ConnectionError, asyncio.TimeoutError, TimeoutError)):
+        return True
+    if 'Timeout' in type(error).__name__:
+        return True
+    return classify_exception(error).provider_failure
+
+
+def _retry_after_hint(error: BaseException) -> Optional[float]:
+    """Retry-After header (seconds) from the provider's error response, if any"""
+    headers = getattr(error, 'response_headers', None) or getattr(error, 'headers', None)
+    if headers is None:
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+    try:
+        value = headers.get('retry-after') or headers.get('Retry-After') if headers else None
+        return float(value) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class RetryBudget:
+    """Cada chamada deposita `ratio` retries; o mínimo por minuto entra com o tempo"""
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, min_per_minute: float = RETRY_BUDGET_MIN_PER_MINUTE):
+        self.ratio = ratio
+        self.refill_rate = min_per_minute / 60.0
+        self._balance = float(max(1.0, min_per_minute))
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._balance = min(_BUDGET_CAPACITY, self._balance + (now - self._updated) * self.refill_rate)
+        self._updated = now
+
+    def deposit(self):
+        self._refill()
+        self._balance = min(_BUDGET_CAPACITY, self._balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self._balance < 1:
+            return False
+        self._balance -= 1
+        return True
+
+    @property
+    def balance(self) -> float:
+        self._refill()
+        return self._balance
+
+
+class RetryPolicy:
+    """Tentativas, backoff com jitter, deadline e budget de um provider"""
+
+    def __init__(
+        self,
+        name: str,
+        attempts: int,
+        base_delay: float,
+        max_delay: float,
+        timeout: float,
+        min_attempt: float,
+        budget: Optional[RetryBudget] = None
+    ):
+        self.name = name
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.min_attempt = min_attempt
+        self.budget = budget or RetryBudget()
+        self.calls = 0
+        self.retries = 0
+        self.recovered = 0
+        self.budget_exhausted = 0
+        self.deadline_skips = 0
+
+    def next_delay(self, previous: float) -> float:
+        """Decorrelated jitter"""
+        return min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, previous * 3)))
+
+    async def run(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        deadline: Optional[float] = None,
+        attempt_timeout: Optional[float] = None,
+        label: Optional[str] = None,
+        retryable: Callable[[BaseException], bool] = is_retryable
+    ) -> Any:
+        """Call fn() until it succeeds, fails with a non-retryable error or runs out of attempts/time
+
+        deadline: instante (time.monotonic()) em que o request desiste; padrão = agora + timeout da política.
+        attempt_timeout: teto de cada tentativa (cortado pelo deadline); o estouro é retryable.
+        retryable: decide se um erro merece nova tentativa (padrão: is_retryable).
+        """
+        label = label or self.name
+        deadline = deadline if deadline is not None else time.monotonic() + self.timeout
+        self.calls += 1
+        self.budget.deposit()
+        delay = self.base_delay
+        attempt = 1
+
+        while True:
+            try:
+                if attempt_timeout is None:
+                    result = await fn()
+                else:
+                    remaining = max(0.0, deadline - time.monotonic())
+                    result = await asyncio.wait_for(fn(), timeout=min(attempt_timeout, remaining))
+                if attempt > 1:
+                    self.recovered += 1
+                    logger.info(f"🔁 {label}: succeeded on attempt {attempt}")
+                return result
+            except Exception as e:
+                if not retryable(e) or attempt >= self.attempts:
+                    raise
+
+                delay = self.next_delay(delay)
+                hint = _retry_after_hint(e)
+                if hint is not None:
+                    delay = max(delay, min(hint, self.max_delay))
+
+                if time.monotonic() + delay + self.min_attempt > deadline:
+                    self.deadline_skips += 1
+                    logger.warning(f"⏳ {label}: not retrying, no time left before the deadline ({e})")
+                    raise
+                if not self.budget.withdraw():
+                    self.budget_exhausted += 1
+                    logger.warning(f"🪫 {label}: retry budget exhausted, failing ({e})")
+                    raise
+
+                self.retries += 1
+                logger.warning(
+                    f"🔁 {label}: transient failure on attempt {attempt}/{self.attempts} "
+                    f"({type(e).__name__}: {str(e)[:120]}), retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "timeout_seconds": self.timeout,
+            "calls": self.calls,
+            "retries": self.retries,
+            "recovered": self.recovered,
+            "budget_exhausted": self.budget_exhausted,
+            "deadline_skips": self.deadline_skips,
+            "budget_balance": round(self.budget.balance, 2)
+        }
+
+
+class RetryPolicies:
+    """Uma RetryPolicy por provider"""
+
+    def __init__(self):
+        self.policies: Dict[str, RetryPolicy] = {
+            name: RetryPolicy(name, *_policy_settings(name)) for name in _DEFAULT_POLICIES
+        }
+
+    def get(self, name: str) -> RetryPolicy:
+        return self.policies[name]
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: policy.stats() for name, policy in self.policies.items()}
+
+
+# Instância global
+retry_policies = RetryPolicies()
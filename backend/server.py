@@ -1,8 +1,12 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Request, Query, Header
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 import os
+import time
+import random
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
@@ -10,16 +14,36 @@ from typing import List, Optional, Literal
 import uuid
 from datetime import datetime, timezone
 import fal_client
-from elevenlabs import ElevenLabs
+from elevenlabs import ElevenLabs, AsyncElevenLabs
 from emergent_wrapper import LlmChat, UserMessage, FileContentWithMimeType
 import base64
-import io
-from PIL import Image
+import hashlib
+import json
 from gradio_client import Client
-from database import db as database
+from database import db as database, MICROS_PER_DOLLAR, TIMESERIES_GRANULARITIES
 
 # Import video providers manager
 from video_providers import video_manager, VideoProvider
+from video_jobs import video_jobs, JobQueueFullError
+from video_leases import video_leases
+from operation_poller import operation_poller
+from http_client import http_client
+from blob_store import blob_store, blob_ref, is_valid_digest, parse_blob_ref, BLOB_REF_PREFIX
+from image_upload import receive_image_upload, load_uploaded_image, fetch_image_bytes, UploadRejected
+from tts_cache import tts_cache, tts_cache_key
+from tts_chunker import tts_chunker
+from mp3_frames import scan_mp3, mp3_duration
+from voice_catalog import voice_catalog
+from analysis_cache import analysis_cache, hash_image_bytes
+from image_hashing import hash_to_hex
+from image_worker import image_pool, probe_image, ImagePoolBusyError
+from idempotency import idempotency, request_fingerprint, IdempotencyError
+from provider_scheduler import provider_scheduler, ProviderBusyError, ProviderLease
+from video_router import video_router
+from provider_errors import classify_video_error
+from circuit_breaker import provider_breakers, CircuitOpenError
+from retry_policy import retry_policies
+from prompt_sanitizer import sanitize_prompt, sanitize_analysis
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -29,10 +53,23 @@ fal_key = os.environ.get('FAL_KEY', '')
 os.environ['FAL_KEY'] = fal_key
 
 elevenlabs_client = ElevenLabs(api_key=os.environ.get('ELEVENLABS_KEY', ''))
+elevenlabs_async_client = AsyncElevenLabs(api_key=os.environ.get('ELEVENLABS_KEY', ''))
 
 # Backend URL for serving images
 BACKEND_URL = os.environ.get('BACKEND_URL', 'http://localhost:8001')
 
+# Recuperação de vídeos no startup: primeiras consultas espalhadas em até N segundos
+VIDEO_RECOVERY_SPREAD = float(os.environ.get('VIDEO_RECOVERY_SPREAD', '30'))
+
+# Upload de áudio (MP3)
+AUDIO_UPLOAD_MAX_BYTES = int(os.environ.get('AUDIO_UPLOAD_MAX_BYTES', str(25 * 1024 * 1024)))
+
+def resolve_blob_url(value: Optional[str]) -> Optional[str]:
+    """Turn a stored blob://<sha256> reference into its public /api/blobs URL"""
+    if value and value.startswith(BLOB_REF_PREFIX):
+        return f"{BACKEND_URL}/api/blobs/{value[len(BLOB_REF_PREFIX):]}"
+    return value
+
 # Create the main app without a prefix
 app = FastAPI()
 
@@ -72,7 +109,7 @@ class VideoGeneration(BaseModel):
     image_id: str
     audio_id: Optional[str] = None
     model: Literal["veo3", "sora2", "wav2lip", "open-sora", "wav2lip-free", "google_veo3"]
-    provider: Optional[Literal["fal", "google", "google_gemini", "google_vertex"]] = "google_gemini"  # Padrão: Gemini (62% economia)
+    provider: Optional[Literal["fal", "google", "google_gemini", "google_vertex", "auto"]] = "google_gemini"  # Padrão: Gemini (62% economia)
     mode: Literal["premium", "economico"] = "premium"
     prompt: str
     duration: Optional[float] = None
@@ -95,8 +132,10 @@ class TokenUsage(BaseModel):
 # ==================== REQUEST/RESPONSE MODELS ====================
 
 class AnalyzeImageRequest(BaseModel):
+    image_id: Optional[str] = None  # id retornado por /images/upload/stream (preferido)
     image_url: Optional[str] = None  # For backward compatibility
     image_data: Optional[str] = None  # Base64 image data
+    reuse_similar: bool = True  # Reutiliza a análise de uma foto quase idêntica (dHash)
 
 class GenerateAudioRequest(BaseModel):
     text: str
@@ -105,20 +144,23 @@ class GenerateAudioRequest(BaseModel):
     similarity_boost: float = 0.75
     speed: float = 1.0
     style: float = 0.0
+    use_cache: bool = True  # False: força nova síntese (e atualiza o cache)
 
 class GenerateVideoRequest(BaseModel):
-    image_url: str
+    image_url: Optional[str] = None
+    image_id: Optional[str] = None  # id de /images/upload/stream: vira a URL do blob
     model: Literal["veo3", "sora2", "wav2lip", "open-sora", "wav2lip-free", "google_veo3"]
-    provider: Optional[Literal["fal", "google", "google_gemini", "google_vertex"]] = "google_gemini"  # Padrão: Gemini (62% economia)
+    provider: Optional[Literal["fal", "google", "google_gemini", "google_vertex", "auto"]] = "google_gemini"  # Padrão: Gemini (62% economia)
     mode: Literal["premium", "economico"] = "premium"
     prompt: str
     audio_url: Optional[str] = None
     duration: Optional[int] = 5
     cinematic_settings: Optional[dict] = None
+    background: bool = False  # True: retorna o video_id na hora e gera em segundo plano
 
 class EstimateCostRequest(BaseModel):
     model: Literal["veo3", "sora2", "wav2lip", "open-sora", "wav2lip-free", "google_veo3"]
-    provider: Optional[Literal["fal", "google", "google_gemini", "google_vertex"]] = "google_gemini"  # Padrão: Gemini
+    provider: Optional[Literal["fal", "google", "google_gemini", "google_vertex", "auto"]] = "google_gemini"  # Padrão: Gemini
     mode: Literal["premium", "economico"] = "premium"
     duration: int
     with_audio: bool = False
@@ -164,6 +206,16 @@ class ImageUploadRequest(BaseModel):
     """Request body for base64 image upload"""
     image_data: str  # Base64 encoded image with data:image prefix
 
+async def _compute_phash(image_bytes: bytes) -> Optional[int]:
+    """dHash in the image worker pool; None if the bytes are not a decodable image"""
+    try:
+        return await image_pool.dhash(image_bytes)
+    except ImagePoolBusyError:
+        raise
+    except Exception as e:
+        logger.warning(f"⚠️ Could not compute perceptual hash: {e}")
+        return None
+
 @api_router.post("/images/upload")
 async def upload_image(request: ImageUploadRequest):
     """Accept base64 image directly (no external storage needed)"""
@@ -172,63 +224,83 @@ async def upload_image(request: ImageUploadRequest):
         if not request.image_data.startswith('data:image'):
             raise HTTPException(status_code=400, detail="Invalid base64 format. Must start with 'data:image'")
         
-        # Extract base64 data
-        base64_data = request.image_data.split(',')[1] if ',' in request.image_data else request.image_data
-        
-        # Validate by decoding
-        image_bytes = base64.b64decode(base64_data)
-        
-        # Optional: Validate it's a valid image using PIL
-        img = Image.open(io.BytesIO(image_bytes))
-        img.verify()
+        # Decode + PIL verify + perceptual hash numa única ida ao pool de processos
+        try:
+            info = await image_pool.inspect_base64(request.image_data)
+        except ImagePoolBusyError:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid image: {str(e)}")
         
-        logger.info(f"✅ Image uploaded successfully - Format: {img.format}, Size: {len(image_bytes)} bytes")
+        logger.info(f"✅ Image uploaded successfully - Format: {info['format']}, Size: {info['size_bytes']} bytes")
+
+        # Perceptual hash: oferece a análise de uma foto quase idêntica já analisada
+        phash = info['phash']
+        similar = None
+        if phash is not None:
+            similar = await analysis_cache.get_similar(phash, ANALYSIS_PROMPT_VERSION)
         
         return {
             "success": True,
             "image_data": request.image_data,  # Return base64 to use directly
-            "format": img.format,
-            "size_bytes": len(image_bytes)
+            "format": info['format'],
+            "size_bytes": info['size_bytes'],
+            "phash": hash_to_hex(phash) if phash is not None else None,
+            "similar_analysis": similar
         }
+    except HTTPException:
+        raise
+    except ImagePoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Error processing image upload: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.post("/images/analyze")
-async def analyze_image(request: AnalyzeImageRequest):
-    """Analyze image with Gemini and suggest best model with cinematic prompts"""
+async def _load_image_id(image_id: str) -> bytes:
+    """Bytes of an image uploaded via /images/upload/stream (404 if unknown)"""
     try:
-        # Handle Base64 image data or URL
-        if request.image_data:
-            # Extract base64 data
-            base64_data = request.image_data
-            if ',' in base64_data:
-                base64_data = base64_data.split(',', 1)[1]
-            
-            # Decode base64 to bytes
-            img_data = base64.b64decode(base64_data)
-            logger.info(f"📎 Analyzing image from Base64 (size: {len(img_data)} bytes)")
-        elif request.image_url:
-            # Download from URL (legacy support)
-            import requests
-            img_response = requests.get(request.image_url)
-            img_data = img_response.content
-            logger.info(f"📎 Analyzing image from URL: {request.image_url}")
-        else:
-            raise HTTPException(status_code=400, detail="Either image_data or image_url must be provided")
+        return await load_uploaded_image(image_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Image not found: {image_id}")
 
-        # Save temporarily for Gemini
-        import tempfile
-        temp_dir = tempfile.gettempdir()
-        temp_path = os.path.join(temp_dir, f"{uuid.uuid4()}.jpg")
-        with open(temp_path, 'wb') as f:
-            f.write(img_data)
-        
-        # Analyze with Gemini
-        chat = LlmChat(
-            api_key=os.environ.get('GEMINI_KEY', ''),
-            session_id=str(uuid.uuid4()),
-            system_message="""Você é um diretor de fotografia especialista em criar prompts cinematográficos otimizados para Veo 3.1 e Sora 2.
+@api_router.post("/images/upload/stream")
+async def upload_image_stream(request: Request):
+    """Multipart (or raw image/*) upload streamed into the blob store; returns a compact image_id
+
+    Use o image_id em /images/analyze, /video/generate e /images/generate em vez de re-enviar base64.
+    """
+    try:
+        blob, filename = await receive_image_upload(request)
+
+        # Perceptual hash: oferece a análise de uma foto quase idêntica já analisada
+        phash = await _compute_phash(await blob_store.read(blob.digest))
+        similar = None
+        if phash is not None:
+            similar = await analysis_cache.get_similar(phash, ANALYSIS_PROMPT_VERSION)
+
+        return {
+            "success": True,
+            "image_id": blob.digest,
+            "image_url": resolve_blob_url(blob.ref),
+            "filename": filename,
+            "content_type": blob.content_type,
+            "size_bytes": blob.size,
+            "phash": hash_to_hex(phash) if phash is not None else None,
+            "similar_analysis": similar
+        }
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except ImagePoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        logger.error(f"Error processing streamed image upload: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ==================== IMAGE ANALYSIS PROMPT ====================
+
+ANALYSIS_MODEL = "gemini-2.0-flash"
+ANALYSIS_USER_PROMPT = "Analise esta imagem como um diretor de fotografia e sugira prompts cinematográficos completos para ambos os modos (Premium e Econômico)."
+ANALYSIS_SYSTEM_PROMPT = """Você é um diretor de fotografia especialista em criar prompts cinematográficos otimizados para Veo 3.1 e Sora 2.
 
 **🚨 POLÍTICA DE CONTEÚDO CRÍTICA - ANTI-DEEPFAKE 🚨**
 NUNCA mencione ou inclua QUALQUER referência a:
@@ -396,7 +468,72 @@ Retorne EXATAMENTE este JSON:
 ```
 
 **LEMBRE-SE:** Os modelos automaticamente usam a imagem como base. Você só precisa descrever o MOVIMENTO e CINEMATOGRAFIA desejados."""
-        ).with_model("gemini", "gemini-2.0-flash")
+
+# Versão do prompt: muda automaticamente quando o prompt/modelo muda (invalida o cache)
+ANALYSIS_PROMPT_VERSION = hashlib.sha256(
+    f"{ANALYSIS_MODEL}\n{ANALYSIS_SYSTEM_PROMPT}\n{ANALYSIS_USER_PROMPT}".encode()
+).hexdigest()[:16]
+
+@api_router.post("/images/analyze")
+async def analyze_image(request: AnalyzeImageRequest):
+    """Analyze image with Gemini and suggest best model with cinematic prompts"""
+    try:
+        # Handle uploaded image id, Base64 image data or URL
+        if request.image_id:
+            img_data = await _load_image_id(request.image_id)
+            logger.info(f"📎 Analyzing uploaded image {request.image_id[:12]} (size: {len(img_data)} bytes)")
+        elif request.image_data:
+            # Decode base64 to bytes (payloads grandes no pool de processos)
+            img_data = await image_pool.decode_base64(request.image_data)
+            logger.info(f"📎 Analyzing image from Base64 (size: {len(img_data)} bytes)")
+        elif request.image_url:
+            # Download from URL (legacy support) - pool compartilhado, com timeout e teto de tamanho
+            img_data = await fetch_image_bytes(request.image_url)
+            logger.info(f"📎 Analyzing image from URL: {request.image_url}")
+        else:
+            raise HTTPException(status_code=400, detail="Either image_id, image_data or image_url must be provided")
+
+        # Cache: mesma imagem + mesma versão do prompt => reutiliza a análise
+        image_hash = hash_image_bytes(img_data)
+        cached_analysis = await analysis_cache.get(image_hash, ANALYSIS_PROMPT_VERSION)
+        if cached_analysis is not None:
+            logger.info(f"⚡ Analysis cache hit ({image_hash[:12]})")
+            return {
+                "success": True,
+                "analysis": cached_analysis,
+                "cached": True
+            }
+
+        # Quase-duplicata (re-compressão, resize, screenshot): busca por distância de Hamming
+        phash = await _compute_phash(img_data)
+        if request.reuse_similar and phash is not None:
+            similar = await analysis_cache.get_similar(phash, ANALYSIS_PROMPT_VERSION)
+            if similar:
+                logger.info(f"⚡ Near-duplicate analysis reused ({similar['analysis_id']}, distance {similar['distance']})")
+                analysis_cache.put(image_hash, ANALYSIS_PROMPT_VERSION, similar['analysis'])
+                return {
+                    "success": True,
+                    "analysis": similar['analysis'],
+                    "cached": True,
+                    "similar_to": {
+                        "analysis_id": similar['analysis_id'],
+                        "distance": similar['distance']
+                    }
+                }
+
+        # Save temporarily for Gemini
+        import tempfile
+        temp_dir = tempfile.gettempdir()
+        temp_path = os.path.join(temp_dir, f"{uuid.uuid4()}.jpg")
+        with open(temp_path, 'wb') as f:
+            f.write(img_data)
+        
+        # Analyze with Gemini
+        chat = LlmChat(
+            api_key=os.environ.get('GEMINI_KEY', ''),
+            session_id=str(uuid.uuid4()),
+            system_message=ANALYSIS_SYSTEM_PROMPT
+        ).with_model("gemini", ANALYSIS_MODEL)
         
         image_file = FileContentWithMimeType(
             file_path=temp_path,
@@ -404,17 +541,20 @@ Retorne EXATAMENTE este JSON:
         )
         
         user_message = UserMessage(
-            text="Analise esta imagem como um diretor de fotografia e sugira prompts cinematográficos completos para ambos os modos (Premium e Econômico).",
+            text=ANALYSIS_USER_PROMPT,
             file_contents=[image_file]
         )
         
-        # Add timeout to Gemini call
-        import asyncio
+        # Add timeout to Gemini call: 30s no total. A tentativa pode usar o prazo inteiro (estourou = fallback);
+        # só um 503/erro de rede rápido ganha nova tentativa no tempo que sobrar
         try:
-            response = await asyncio.wait_for(
-                chat.send_message(user_message),
-                timeout=30.0  # 30 seconds timeout
-            )
+            async with provider_scheduler.slot("gemini"):
+                response = await retry_policies.get("gemini").run(
+                    lambda: chat.send_message(user_message),
+                    deadline=time.monotonic() + 30.0,
+                    attempt_timeout=30.0,  # cortado pelo deadline
+                    label="gemini analysis"
+                )
         except asyncio.TimeoutError:
             logger.error("Gemini analysis timed out")
             # Return a default analysis with new structure
@@ -447,6 +587,7 @@ Retorne EXATAMENTE este JSON:
             return {
                 "success": True,
                 "analysis": analysis_data,
+                "cached": False,
                 "warning": "Análise automática falhou. Usando configurações padrão."
             }
         
@@ -454,132 +595,16 @@ Retorne EXATAMENTE este JSON:
         os.remove(temp_path)
         
         # Parse response
-        import json
         analysis_data = json.loads(response.strip('```json').strip('```').strip())
         
-        # Function to sanitize all prompts in analysis
-        def sanitize_analysis_prompts(data):
-            """Clean all prompts in analysis data - Remove content policy violations"""
-
-            # 1. VIOLÊNCIA E CONTEÚDO GRÁFICO
-            violence_words = {
-                'ameaçador': 'impressionante',
-                'ameaçadora': 'impressionante',
-                'ameaçadoramente': 'majestosamente',
-                'assustador': 'surpreendente',
-                'assustadora': 'surpreendente',
-                'violento': 'intenso',
-                'violenta': 'intensa',
-                'violentamente': 'intensamente',
-                'afiados': 'visíveis',
-                'afiado': 'visível',
-                'afiada': 'visível',
-                'ataque': 'aproximação',
-                'atacar': 'se aproximar',
-                'atacando': 'se aproximando',
-                'medo': 'admiração',
-                'terror': 'impacto',
-                'pânico': 'intensidade',
-                'sangue': 'efeito visual dramático',
-                'morte': 'drama',
-                'morrer': 'desaparecer',
-                'morto': 'imóvel',
-                'matar': 'neutralizar',
-                'agressiv': 'energétic',
-                'ferimento': 'marca dramática',
-                'ferido': 'afetado',
-                'ferir': 'impactar',
-                'tortura': 'tensão extrema',
-                'mutilação': 'transformação dramática',
-                'brutal': 'intenso',
-                'sangrento': 'dramático',
-                'arma': 'objeto cênico',
-                'armas': 'objetos cênicos',
-                'faca': 'objeto metálico',
-                'facas': 'objetos metálicos',
-                'espada': 'lâmina cênica',
-                'pistola': 'objeto de cena',
-                'revólver': 'objeto de cena',
-            }
-
-            # 2. CONTEÚDO SEXUAL/EXPLÍCITO (adicional)
-            explicit_words = {
-                'nu': 'sem adornos',
-                'nua': 'natural',
-                'nudez': 'naturalidade',
-                'despido': 'simples',
-                'sensual': 'elegante',
-            }
-
-            # 3. DEEPFAKE E IDENTIDADE (já coberto nos patterns abaixo)
-
-            # 4. DISCURSO DE ÓDIO (prevenção)
-            hate_speech_words = {
-                'odiar': 'desgostar',
-                'ódio': 'antipatia',
-            }
-
-            # 5. ATIVIDADES ILEGAIS
-            illegal_words = {
-                'droga': 'substância',
-                'drogas': 'substâncias',
-                'cocaína': 'pó branco',
-                'maconha': 'erva',
-            }
-
-            # Combinar todos os dicionários
-            problematic_words = {
-                **violence_words,
-                **explicit_words,
-                **hate_speech_words,
-                **illegal_words
-            }
-            
-            # Clean all string fields recursively
-            def clean_text(text):
-                if not isinstance(text, str):
-                    return text
-                cleaned = text
-                
-                # Remove problematic words
-                for word, replacement in problematic_words.items():
-                    cleaned = cleaned.replace(word, replacement)
-                
-                # Remove facial fidelity instructions (triggers deepfake detection)
-                import re
-                fidelity_patterns = [
-                    r'\[Manter a identidade facial.*?\]',
-                    r'\[.*?NÃO DEVEM ser alterados.*?\]',
-                    r'\[.*?preservando 100%.*?\]',
-                    r'Manter a identidade facial.*?características físicas\.',
-                    r'Os rostos.*?NÃO DEVEM.*?substituídos\.',
-                    r'preservando 100% da fidelidade.*?\.'
-                ]
-                
-                for pattern in fidelity_patterns:
-                    cleaned = re.sub(pattern, '', cleaned, flags=re.IGNORECASE | re.DOTALL)
-                
-                # Clean up extra spaces
-                cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-                
-                return cleaned
-            
-            def clean_dict(d):
-                if isinstance(d, dict):
-                    return {k: clean_dict(v) for k, v in d.items()}
-                elif isinstance(d, list):
-                    return [clean_dict(item) for item in d]
-                elif isinstance(d, str):
-                    return clean_text(d)
-                return d
-            
-            return clean_dict(data)
-        
         # Sanitize the analysis data
-        analysis_data = sanitize_analysis_prompts(analysis_data)
+        analysis_data = sanitize_analysis(analysis_data)
 
         # Save to database (use base64 placeholder if no URL)
-        image_url_for_db = request.image_url or "base64://uploaded_image"
+        if request.image_id:
+            image_url_for_db = blob_ref(request.image_id)
+        else:
+            image_url_for_db = request.image_url or "base64://uploaded_image"
         
         analysis = ImageAnalysis(
             image_url=image_url_for_db,
@@ -589,108 +614,377 @@ Retorne EXATAMENTE este JSON:
 
         doc = analysis.model_dump()
         doc['timestamp'] = doc['timestamp'].isoformat()
+        doc['content_hash'] = image_hash
+        doc['prompt_version'] = ANALYSIS_PROMPT_VERSION
+        doc['phash'] = hash_to_hex(phash) if phash is not None else None
         await database.insert_image_analysis(doc)
+        analysis_cache.put(image_hash, ANALYSIS_PROMPT_VERSION, analysis_data, analysis.id, phash)
         
         return {
             "success": True,
-            "analysis": analysis_data
+            "analysis": analysis_data,
+            "cached": False
         }
+    except HTTPException:
+        raise
+    except ImagePoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ProviderBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Error analyzing image: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/images/analysis-cache/stats")
+async def get_analysis_cache_stats():
+    """Hit/miss counters of the image analysis cache"""
+    return {
+        "success": True,
+        "prompt_version": ANALYSIS_PROMPT_VERSION,
+        "stats": analysis_cache.stats()
+    }
+
+@api_router.delete("/images/analysis-cache")
+async def invalidate_analysis_cache(content_hash: Optional[str] = None):
+    """Invalidate cached analyses (one image by SHA-256, or everything)"""
+    try:
+        result = await analysis_cache.invalidate(content_hash)
+        return {"success": True, **result}
+    except Exception as e:
+        logger.error(f"Error invalidating analysis cache: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.get("/audio/voices")
-async def get_voices():
-    """Get available ElevenLabs voices"""
+async def get_voices(
+    request: Request,
+    category: Optional[str] = None,
+    label: Optional[List[str]] = Query(None),
+    language: Optional[str] = None
+):
+    """Get available ElevenLabs voices (from the in-memory catalogue)
+
+    Filtros: ?category=premade&label=age:child&label=age:young&language=pt
+    (mesmo label com valores diferentes = OU; labels diferentes = E; label sem chave casa qualquer valor)
+    """
     try:
-        voices_response = elevenlabs_client.voices.get_all()
+        await voice_catalog.ensure_loaded()
         
-        # Filter for child voices or Portuguese
-        voices = []
-        for voice in voices_response.voices:
-            voice_data = {
-                "voice_id": voice.voice_id,
-                "name": voice.name,
-                "category": voice.category if hasattr(voice, 'category') else "general",
-                "labels": voice.labels if hasattr(voice, 'labels') else {}
-            }
-            voices.append(voice_data)
+        headers = {"ETag": voice_catalog.etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request, voice_catalog.etag):
+            return Response(status_code=304, headers=headers)
         
-        return {"success": True, "voices": voices}
+        body = voice_catalog.render(category=category, labels=label, language=language)
+        return Response(content=body, media_type="application/json", headers=headers)
     except Exception as e:
         logger.error(f"Error fetching voices: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+TTS_MODEL = "eleven_multilingual_v2"
+TTS_OUTPUT_FORMAT = "mp3_44100_128"
+
+def _tts_voice_settings(request: GenerateAudioRequest):
+    from elevenlabs import VoiceSettings
+    
+    return VoiceSettings(
+        stability=request.stability,
+        similarity_boost=request.similarity_boost,
+        style=request.style,
+        use_speaker_boost=True
+    )
+
+def _tts_cost(request: GenerateAudioRequest) -> float:
+    # Estimate cost (ElevenLabs pricing ~$0.30 per 1000 chars)
+    return (len(request.text) / 1000) * 0.30
+
+def _tts_cache_key(request: GenerateAudioRequest) -> str:
+    # `speed` não é enviado à ElevenLabs, então não entra na chave
+    return tts_cache_key(
+        request.text, request.voice_id, TTS_MODEL, TTS_OUTPUT_FORMAT,
+        _tts_voice_settings(request).model_dump()
+    )
+
+def _tts_stream(request: GenerateAudioRequest):
+    """Start an ElevenLabs synthesis: returns (voice_settings, async iterator of MP3 chunks)"""
+    voice_settings = _tts_voice_settings(request)
+    
+    chunks = elevenlabs_async_client.text_to_speech.stream(
+        voice_id=request.voice_id,
+        text=request.text,
+        model_id=TTS_MODEL,
+        output_format=TTS_OUTPUT_FORMAT,
+        voice_settings=voice_settings
+    )
+    return voice_settings, chunks
+
+async def _synthesize_tts(request: GenerateAudioRequest, voice_settings) -> bytes:
+    """Full synthesis for /audio/generate: long texts go out in parallel chunks, joined without re-encoding"""
+    async def synth(text: str, previous_text: Optional[str], next_text: Optional[str]) -> bytes:
+        context = {}
+        if previous_text:
+            context['previous_text'] = previous_text
+        if next_text:
+            context['next_text'] = next_text
+        
+        async def collect() -> bytes:
+            # Collect audio data (bytearray: append amortizado O(1)); nova tentativa recomeça do zero
+            audio_data = bytearray()
+            # Narração já admitida: as partes esperam o slot em vez de serem recusadas no meio
+            # (um slot por tentativa: o backoff entre tentativas não segura o slot)
+            async with provider_scheduler.slot("elevenlabs", shed=False):
+                async for chunk in elevenlabs_async_client.text_to_speech.stream(
+                    voice_id=request.voice_id,
+                    text=text,
+                    model_id=TTS_MODEL,
+                    output_format=TTS_OUTPUT_FORMAT,
+                    voice_settings=voice_settings,
+                    **context
+                ):
+                    audio_data += chunk
+            return bytes(audio_data)
+        
+        # Única camada de retry das partes: budget e deadline compartilhados da política "elevenlabs"
+        return await retry_policies.get("elevenlabs").run(collect, label="elevenlabs tts")
+    
+    provider_scheduler.admit("elevenlabs")
+    return await tts_chunker.synthesize(request.text, synth)
+
+async def _save_generated_audio(
+    request: GenerateAudioRequest,
+    voice_settings,
+    audio_data: bytes,
+    audio_id: Optional[str] = None,
+    cache_key: Optional[str] = None
+) -> dict:
+    """Store synthesized audio in the blob store, insert the row (as a TTS cache entry) and track usage"""
+    # Store bytes in the blob store (row keeps only the reference)
+    blob = await blob_store.put(audio_data, "audio/mpeg")
+    
+    # Duração exata lida dos frames MP3 - antes era estimada pelo tamanho do texto
+    duration = round(mp3_duration(audio_data), 2)
+    
+    cost = _tts_cost(request)
+    
+    # Save to database
+    audio = AudioGeneration(
+        audio_url=blob.ref,
+        source="generated",
+        duration=duration,
+        text=request.text,
+        voice_id=request.voice_id,
+        voice_settings=voice_settings.model_dump(),
+        cost=cost
+    )
+    if audio_id:
+        audio.id = audio_id
+
+    doc = audio.model_dump()
+    doc['timestamp'] = doc['timestamp'].isoformat()
+    doc['cache_key'] = cache_key
+    doc['size'] = len(audio_data)
+    await database.insert_audio_generation(doc)
+    if cache_key:
+        await tts_cache.enforce_limits()
+
+    # Track usage
+    usage = TokenUsage(
+        service="elevenlabs",
+        operation="text_to_speech",
+        cost=cost,
+        details={"characters": len(request.text)}
+    )
+    usage_doc = usage.model_dump()
+    usage_doc['timestamp'] = usage_doc['timestamp'].isoformat()
+    await database.insert_token_usage(usage_doc)
+    
+    return {
+        "audio_id": audio.id,
+        "audio_url": resolve_blob_url(blob.ref),
+        "duration": duration,
+        "cost": cost,
+        "cached": False
+    }
+
+async def _cached_audio(request: GenerateAudioRequest, cache_key: str) -> Optional[dict]:
+    """TTS cache lookup (mesmo texto + voz + ajustes): the stored row or None"""
+    if not request.use_cache:
+        return None
+    return await tts_cache.get(cache_key, cost=_tts_cost(request))
+
 @api_router.post("/audio/generate")
 async def generate_audio(request: GenerateAudioRequest):
     """Generate audio with ElevenLabs"""
     try:
-        from elevenlabs import VoiceSettings
+        cache_key = _tts_cache_key(request)
+        cached = await _cached_audio(request, cache_key)
+        if cached:
+            logger.info(f"⚡ TTS cache hit ({cache_key[:12]}) - ElevenLabs não chamada")
+            return {
+                "success": True,
+                "audio_id": cached['id'],
+                "audio_url": resolve_blob_url(cached['audio_url']),
+                "duration": cached['duration'],
+                "cost": 0.0,
+                "cached": True
+            }
         
-        voice_settings = VoiceSettings(
-            stability=request.stability,
-            similarity_boost=request.similarity_boost,
-            style=request.style,
-            use_speaker_boost=True
-        )
+        voice_settings = _tts_voice_settings(request)
+        audio_data = await _synthesize_tts(request, voice_settings)
         
-        audio_generator = elevenlabs_client.text_to_speech.convert(
-            text=request.text,
-            voice_id=request.voice_id,
-            model_id="eleven_multilingual_v2",
-            voice_settings=voice_settings
-        )
+        saved = await _save_generated_audio(request, voice_settings, audio_data, cache_key=cache_key)
         
-        # Collect audio data
-        audio_data = b""
-        for chunk in audio_generator:
-            audio_data += chunk
+        return {
+            "success": True,
+            **saved
+        }
+    except ProviderBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        logger.error(f"Error generating audio: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/audio/generate/stream")
+async def generate_audio_stream(request: GenerateAudioRequest):
+    """Stream ElevenLabs MP3 chunks to the client as they arrive (saved to the blob store at the end)"""
+    audio_id = str(uuid.uuid4())
+    lease = None
+    try:
+        cache_key = _tts_cache_key(request)
+        cached = await _cached_audio(request, cache_key)
+        digest = parse_blob_ref(cached['audio_url']) if cached else None
+        info = await blob_store.get_info(digest) if digest else None
+        if info:
+            logger.info(f"⚡ TTS cache hit ({cache_key[:12]}) - streaming stored audio")
+            body = blob_store.iter_range(digest, 0, info.size - 1) if info.size > 0 else iter(())
+            return StreamingResponse(
+                body,
+                media_type="audio/mpeg",
+                headers={
+                    "X-Audio-Id": cached['id'],
+                    "X-Cache": "HIT",
+                    "X-Audio-Cost": "0",
+                    "Content-Length": str(info.size),
+                    "Cache-Control": "no-store"
+                }
+            )
+        if cached:
+            # Linha sem blob: tira do cache e sintetiza de novo
+            await tts_cache.invalidate(cache_key)
         
-        # Convert to base64
-        audio_b64 = base64.b64encode(audio_data).decode()
-        audio_url = f"data:audio/mpeg;base64,{audio_b64}"
+        # O slot da ElevenLabs fica ocupado até o fim do stream
+        lease = await provider_scheduler.acquire("elevenlabs")
         
-        # Estimate duration (rough estimate based on text length)
-        duration = len(request.text) * 0.05  # ~50ms per character
+        # Espera o primeiro chunk antes de responder: erros da ElevenLabs viram HTTP 500, não um stream quebrado.
+        # Só o início é repetido em falha transitória - depois do primeiro byte enviado não há volta
+        async def start_stream():
+            voice_settings, chunks = _tts_stream(request)
+            return voice_settings, chunks, await chunks.__anext__()
         
-        # Estimate cost (ElevenLabs pricing ~$0.30 per 1000 chars)
-        cost = (len(request.text) / 1000) * 0.30
+        voice_settings, chunks, first_chunk = await retry_policies.get("elevenlabs").run(
+            start_stream, label="elevenlabs tts stream"
+        )
+    except ProviderBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except StopAsyncIteration:
+        lease.release()
+        raise HTTPException(status_code=502, detail="ElevenLabs returned an empty audio stream")
+    except Exception as e:
+        if lease:
+            lease.release()
+        logger.error(f"Error starting audio stream: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def passthrough():
+        audio_data = bytearray(first_chunk)
+        yield first_chunk
         
-        # Save to database
+        completed = False
+        try:
+            async for chunk in chunks:
+                audio_data += chunk
+                yield chunk
+            completed = True
+        finally:
+            lease.release()
+            if completed:
+                try:
+                    saved = await _save_generated_audio(request, voice_settings, bytes(audio_data), audio_id, cache_key)
+                    logger.info(f"🔊 Streamed audio {audio_id} saved ({len(audio_data)} bytes, {saved['duration']}s)")
+                except Exception as e:
+                    logger.error(f"Error saving streamed audio {audio_id}: {str(e)}")
+            else:
+                logger.warning(f"⚠️ Audio stream {audio_id} interrupted after {len(audio_data)} bytes (not saved)")
+
+    return StreamingResponse(
+        passthrough(),
+        media_type="audio/mpeg",
+        headers={"X-Audio-Id": audio_id, "X-Cache": "MISS", "Cache-Control": "no-store"},
+        background=BackgroundTask(lease.release)  # cliente desconectou antes do primeiro chunk
+    )
+
+@api_router.post("/audio/upload")
+async def upload_audio(file: UploadFile = File(...)):
+    """Upload an MP3 narration: stored in the blob store with its exact duration"""
+    try:
+        # Leitura em blocos com teto de tamanho
+        audio_data = bytearray()
+        while True:
+            chunk = await file.read(1024 * 1024)
+            if not chunk:
+                break
+            audio_data += chunk
+            if len(audio_data) > AUDIO_UPLOAD_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"Audio larger than {AUDIO_UPLOAD_MAX_BYTES} bytes")
+
+        # Varredura dos frames fora do event loop (arquivos grandes: dezenas de ms)
+        info = await asyncio.get_event_loop().run_in_executor(None, scan_mp3, audio_data)
+        if info is None:
+            raise HTTPException(status_code=400, detail="Not an MP3 file (no MPEG audio frames found)")
+
+        blob = await blob_store.put(bytes(audio_data), "audio/mpeg")
         audio = AudioGeneration(
-            audio_url=audio_url,
-            source="generated",
-            duration=duration,
-            text=request.text,
-            voice_id=request.voice_id,
-            voice_settings=voice_settings.model_dump(),
-            cost=cost
+            audio_url=blob.ref,
+            source="uploaded",
+            duration=round(info.duration, 2)
         )
-
         doc = audio.model_dump()
         doc['timestamp'] = doc['timestamp'].isoformat()
+        doc['size'] = len(audio_data)
         await database.insert_audio_generation(doc)
 
-        # Track usage
-        usage = TokenUsage(
-            service="elevenlabs",
-            operation="text_to_speech",
-            cost=cost,
-            details={"characters": len(request.text)}
-        )
-        usage_doc = usage.model_dump()
-        usage_doc['timestamp'] = usage_doc['timestamp'].isoformat()
-        await database.insert_token_usage(usage_doc)
-        
+        logger.info(f"✅ Audio uploaded: {file.filename} ({len(audio_data)} bytes, {info.duration:.2f}s, "
+                    f"{info.bitrate // 1000} kbps{' VBR' if info.vbr else ''})")
         return {
             "success": True,
             "audio_id": audio.id,
-            "audio_url": audio_url,
-            "duration": duration,
-            "cost": cost
+            "audio_url": resolve_blob_url(blob.ref),
+            "duration": audio.duration,
+            "bitrate": info.bitrate,
+            "sample_rate": info.sample_rate,
+            "vbr": info.vbr
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error generating audio: {str(e)}")
+        logger.error(f"Error uploading audio: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/audio/tts-cache/stats")
+async def get_tts_cache_stats():
+    """Hit/miss counters and size of the TTS cache"""
+    try:
+        return {"success": True, "stats": await tts_cache.stats()}
+    except Exception as e:
+        logger.error(f"Error getting TTS cache stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.delete("/audio/tts-cache")
+async def invalidate_tts_cache(cache_key: Optional[str] = None):
+    """Remove one key (or everything) from the TTS cache; audio rows stay in the gallery"""
+    try:
+        removed = await tts_cache.invalidate(cache_key)
+        return {"success": True, "removed_entries": removed}
+    except Exception as e:
+        logger.error(f"Error invalidating TTS cache: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/video/estimate-cost")
@@ -699,6 +993,7 @@ async def estimate_cost(request: EstimateCostRequest):
     try:
         cost = 0.0
         savings_info = None
+        routed_provider = None
         
         if request.mode == "economico":
             # Modelos gratuitos do HuggingFace
@@ -723,6 +1018,14 @@ async def estimate_cost(request: EstimateCostRequest):
                 elif request.provider == "google":
                     # Legacy: tenta Gemini primeiro
                     cost = request.duration * 0.076
+                elif request.provider == "auto":
+                    # Roteamento automático: custo do provider que o video_router escolheria agora
+                    ranking = video_router.rank(request.duration, request.with_audio)
+                    if ranking:
+                        cost = video_manager.estimate_cost(ranking[0], request.duration, request.with_audio)
+                        routed_provider = ranking[0].value
+                    else:
+                        cost = request.duration * (0.40 if request.with_audio else 0.20)
                 else:
                     # FAL.AI (backup)
                     if request.with_audio:
@@ -747,6 +1050,8 @@ async def estimate_cost(request: EstimateCostRequest):
         
         if savings_info:
             response["savings"] = savings_info
+        if routed_provider:
+            response["routed_provider"] = routed_provider
         
         return response
         
@@ -834,6 +1139,26 @@ async def get_video_providers():
                 "deprecated": True
             })
         
+        # Estado do circuit breaker de cada provider (open = falhando rápido até o próximo probe)
+        for info in providers_info:
+            breaker_name = VideoProvider.GOOGLE_VEO3_DIRECT.value if info["id"] == "google_veo3_vertex" else info["id"]
+            info["circuit"] = provider_breakers.get(breaker_name).stats()
+        
+        # Veo 3.1 automático - escolhe por custo/latência, com fallback (video_router)
+        routing = video_router.rank(8)
+        if routing:
+            providers_info.append({
+                "id": "auto",
+                "name": "Veo 3.1 (automático)",
+                "provider": "auto",
+                "description": "Provider mais barato dentro do SLO de latência, com fallback automático",
+                "available": True,
+                "routing": [p.value for p in routing],
+                "max_duration": 8,
+                "supports_audio": True,
+                "quality": "premium"
+            })
+        
         # Define provider padrão: Gemini > FAL Veo3 > FAL Sora2
         default_provider = "google_veo31_gemini"
         if not providers_status.get(VideoProvider.GOOGLE_VEO31_GEMINI):
@@ -845,6 +1170,7 @@ async def get_video_providers():
         return {
             "success": True,
             "providers": providers_info,
+            "readiness": video_manager.get_readiness(),
             "default_provider": default_provider,
             "recommendation": {
                 "provider": "google_veo31_gemini",
@@ -857,116 +1183,402 @@ async def get_video_providers():
         logger.error(f"Error getting providers: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.post("/video/generate")
-async def generate_video(request: GenerateVideoRequest):
-    """Generate video with selected model (Premium or Econômico)"""
+def _video_scheduler_provider(request: GenerateVideoRequest) -> Optional[str]:
+    """Scheduler provider (slots/rate limit) that serves a video request
+
+    None para veo3 com provider="auto": o video_router reserva o slot de cada provider que tentar.
+    """
+    if request.mode == "economico":
+        return "huggingface"
+    if request.model == "veo3" and request.provider == "auto":
+        return None
+    if request.model == "veo3" and request.provider in ("google_gemini", "google_vertex", "google"):
+        return "google_veo"
+    return "fal"
+
+async def _run_video_generation(
+    request: GenerateVideoRequest,
+    sanitized_prompt: str,
+    cost: float,
+    video_id: Optional[str] = None,
+    shed: bool = False
+) -> tuple:
+    """Run the provider call for a video request inside a provider slot and return (result_url, cost)
+
+    shed=True: lane cheia => ProviderBusyError; jobs em segundo plano (já aceitos) só esperam a vez.
+    O slot cobre só a submissão: é liberado quando o provider aceita o job (o polling da
+    operação/fila não ocupa vaga) ou, sem aceite, quando a chamada termina.
+    """
+    scheduler_provider = _video_scheduler_provider(request)
+    if scheduler_provider is None:
+        return await _call_video_provider(request, sanitized_prompt, cost, video_id, shed=shed)
+    lease = await provider_scheduler.acquire(scheduler_provider, request.mode, shed=shed)
     try:
-        video_id = str(uuid.uuid4())
+        return await _call_video_provider(request, sanitized_prompt, cost, video_id, lease=lease)
+    finally:
+        lease.release()
+
+async def _call_video_provider(
+    request: GenerateVideoRequest,
+    sanitized_prompt: str,
+    cost: float,
+    video_id: Optional[str] = None,
+    shed: bool = False,
+    lease: Optional[ProviderLease] = None
+) -> tuple:
+    # Generate video based on model, mode, and provider
+    result_url = None
+    
+    def accepted_by(provider_enum: VideoProvider):
+        """on_operation: job aceito => libera o slot do scheduler e persiste a operação (sobrevive a restarts)"""
+        async def on_operation(operation_name: str):
+            if lease:
+                lease.release()
+            if video_id:
+                await database.update_video_generation(video_id, {
+                    "operation_provider": provider_enum.value,
+                    "operation_name": operation_name
+                })
+        return on_operation
+    
+    if request.mode == "premium":
+        # Veo 3.1 automático: provider mais barato dentro do SLO, com hedge/failover (video_router)
+        if request.model == "veo3" and request.provider == "auto":
+            logger.info(f"🧭 Generating Veo 3.1 video with automatic routing ({request.duration}s)")
+            
+            async def persist_routed_operation(provider_enum: VideoProvider, operation_name: str):
+                if video_id:
+                    await database.update_video_generation(video_id, {
+                        "operation_provider": provider_enum.value,
+                        "operation_name": operation_name
+                    })
+            
+            result = await video_router.generate(
+                image_url=request.image_url,
+                prompt=sanitized_prompt,
+                duration=request.duration,
+                with_audio=bool(request.audio_url),
+                lane=request.mode,
+                shed=shed,
+                on_operation=persist_routed_operation
+            )
+            result_url = result.video_url
+            cost = result.cost
+            logger.info(f"✅ Video generated successfully via {result.provider}: {result_url}")
+            logger.info(f"💰 Actual cost: ${cost:.2f}")
         
-        # Function to sanitize prompt for content policy
-        def sanitize_prompt(prompt):
-            """Remove ALL potentially problematic content that triggers FAL.AI and Google Veo filters"""
-            import re
-
-            # STEP 1: Remove ALL mentions of facial fidelity/identity/preservation
-            # These trigger DEEPFAKE DETECTION in all services
-            fidelity_removal_patterns = [
-                r'\[Manter[^\]]*\]',  # Remove all [Manter...] blocks
-                r'\[.*?identidade.*?\]',  # Any block mentioning identity
-                r'\[.*?fidelidade.*?\]',  # Any block mentioning fidelity
-                r'\[.*?NÃO DEVEM.*?\]',  # Any block with NÃO DEVEM
-                r'\[.*?preserv.*?\]',  # Any block mentioning preserve
-                r'[Mm]anter.*?identidade[^.]*\.',  # Sentences about maintaining identity
-                r'[Pp]reserv.*?fidelidade[^.]*\.',  # Sentences about preserving fidelity
-                r'[Ee]xata.*?semelhança[^.]*\.',  # Exact likeness
-                r'[Ii]dentidade.*?visual[^.]*\.',  # Visual identity
-                r'[Cc]aracterísticas.*?físicas[^.]*?mantidas[^.]*?\.',  # Physical characteristics maintained
-                r'[^.]*?expressões faciais[^.]*?fidelidade[^.]*?\.',  # Any sentence with facial expressions + fidelity
-                r'[Aa]s expressões faciais devem ser preservadas[^.]*?\.',  # Specific phrase
-                r'com alta fidelidade',  # Remove "with high fidelity" mentions
-                r'devem ser preservadas[^.]*?fidelidade[^.]*?',  # Must be preserved with fidelity
-                r'alta fidelidade[^.]*?',  # Remove "high fidelity"
-                r'[^.]*?preservadas com alta fidelidade[^.]*?\.',  # Preserved with high fidelity sentence
-                r'expressões faciais[^.]*?alta fidelidade[^.]*?\.',  # Facial expressions with high fidelity
-                r'[Ss]emelhança.*?exata.*?',  # Exact similarity
-                r'100%.*?(identidade|fidelidade|semelhança)',  # 100% identity/fidelity/likeness
-            ]
+        # Veo 3.1 - Usar provider correto (Gemini API recomendado, FAL.AI backup)
+        elif request.model == "veo3":
+            logger.info(f"🎬 Generating Veo 3.1 video with provider: {request.provider}")
+            logger.info(f"   Image: {request.image_url[:100]}")
+            logger.info(f"   Prompt: {sanitized_prompt}")
+            logger.info(f"   Duration: {request.duration}s")
+            
+            # Map provider name to VideoProvider enum
+            # Prioridade: google_gemini > fal > google_vertex (deprecado)
+            if request.provider == "google_gemini":
+                provider_enum = VideoProvider.GOOGLE_VEO31_GEMINI
+                logger.info("⭐ Using Google Veo 3.1 (Gemini API) - 62% ECONOMIA!")
+            elif request.provider == "google_vertex":
+                provider_enum = VideoProvider.GOOGLE_VEO3_DIRECT
+                logger.info("⚠️ Using Google Veo Direct (Vertex) - modelo não disponível")
+            elif request.provider == "google":
+                # Legacy: tenta Gemini primeiro, depois Vertex
+                if video_manager.google_gemini_available:
+                    provider_enum = VideoProvider.GOOGLE_VEO31_GEMINI
+                    logger.info("⭐ Using Google Veo 3.1 (Gemini API) - auto-selected")
+                else:
+                    provider_enum = VideoProvider.GOOGLE_VEO3_DIRECT
+                    logger.info("⚠️ Falling back to Google Vertex (not available)")
+            else:
+                provider_enum = VideoProvider.FAL_VEO3
+                logger.info("✅ Using FAL.AI for Veo 3.1 (backup)")
+            
+            # Generate via provider (video_manager global: clientes já aquecidos no startup)
+            result = await video_manager.generate_video(
+                provider=provider_enum,
+                image_url=request.image_url,
+                prompt=sanitized_prompt,
+                duration=request.duration,
+                # Persiste a operação assim que ela inicia: sobrevive a restarts (ver _recover_video_generations)
+                on_operation=accepted_by(provider_enum)
+            )
+            
+            # VideoGenerationResult é um objeto, não dict
+            result_url = result.video_url
+            cost = result.cost  # Update cost with actual value
+            logger.info(f"✅ Video generated successfully: {result_url}")
+            logger.info(f"💰 Actual cost: ${cost:.2f}")
+            
+        elif request.model == "sora2":
+            logger.info(f"🎬 Generating Sora 2 video with provider: {request.provider}")
+            
+            # Sora 2 atualmente só via FAL.AI
+            provider_enum = VideoProvider.FAL_SORA2
+            logger.info("✅ Using FAL.AI for Sora 2")
+            
+            result = await video_manager.generate_video(
+                provider=provider_enum,
+                image_url=request.image_url,
+                prompt=sanitized_prompt,
+                duration=request.duration,
+                on_operation=accepted_by(provider_enum)
+            )
+            
+            # VideoGenerationResult é um objeto
+            result_url = result.video_url
+            cost = result.cost  # Update cost
+            logger.info(f"✅ Sora 2 video generated: {result_url}")
+            logger.info(f"💰 Actual cost: ${cost:.2f}")
+            
+        elif request.model == "wav2lip":
+            if not request.audio_url:
+                raise HTTPException(status_code=400, detail="Audio URL required for Wav2lip")
+            
+            import asyncio
+            handler = fal_client.submit(
+                "fal-ai/wav2lip",
+                arguments={
+                    "face_url": request.image_url,
+                    "audio_url": request.audio_url
+                }
+            )
+            # Run in executor to avoid blocking
+            result = await asyncio.get_event_loop().run_in_executor(
+                None, handler.get
+            )
+            result_url = result.get('video', {}).get('url')
+    
+    elif request.mode == "economico":
+        # Free models via HuggingFace Spaces
+        if request.model == "open-sora":
+            try:
+                # Use HuggingFace Open-Sora Space
+                hf_client = Client("hpcai-tech/Open-Sora")
+                result = hf_client.predict(
+                    prompt=request.prompt,
+                    image=request.image_url,
+                    api_name="/predict"
+                )
+                result_url = result
+            except Exception as e:
+                logger.error(f"Error with Open-Sora: {str(e)}")
+                raise HTTPException(status_code=503, detail=f"Modelo Open-Sora temporariamente indisponível. Erro: {str(e)}")
+                
+        elif request.model == "wav2lip-free":
+            if not request.audio_url:
+                raise HTTPException(status_code=400, detail="Audio URL required for Wav2lip")
+            
+            try:
+                # Use HuggingFace Wav2Lip Space (procurar space público disponível)
+                # Nota: Pode variar dependendo do space disponível
+                hf_client = Client("fffiloni/Wav2Lip")
+                result = hf_client.predict(
+                    image=request.image_url,
+                    audio=request.audio_url,
+                    api_name="/predict"
+                )
+                result_url = result
+            except Exception as e:
+                logger.error(f"Error with Wav2Lip Free: {str(e)}")
+                raise HTTPException(status_code=503, detail=f"Modelo Wav2Lip Free temporariamente indisponível. Erro: {str(e)}")
+    
+    return result_url, cost
+
+async def _complete_video_generation(video_id: str, request: GenerateVideoRequest, result_url: Optional[str], cost: float):
+    """Mark a video generation as completed and track its usage"""
+    # Update record
+    await database.update_video_generation(video_id, {
+        "status": "completed",
+        "result_url": result_url,
+        "cost": cost
+    })
+
+    # Track usage (only for paid services)
+    if cost > 0:
+        usage = TokenUsage(
+            service="fal_ai",
+            operation=f"video_generation_{request.model}",
+            cost=cost,
+            details={"duration": request.duration, "model": request.model, "mode": request.mode}
+        )
+        usage_doc = usage.model_dump()
+        usage_doc['timestamp'] = usage_doc['timestamp'].isoformat()
+        await database.insert_token_usage(usage_doc)
 
-            sanitized = prompt
-            for pattern in fidelity_removal_patterns:
-                sanitized = re.sub(pattern, '', sanitized, flags=re.IGNORECASE | re.DOTALL)
-
-            # STEP 2: Replace VIOLENT and GRAPHIC content words
-            violence_replacements = [
-                (r'ameaçador(a|amente|es)?', 'impressionante'),
-                (r'assustador(a|es)?', 'surpreendente'),
-                (r'violento?(a|amente|s)?', 'intenso'),
-                (r'afiado?(a|s)?', 'visível'),
-                (r'ataca(r|ndo|m)?', 'aproxima'),
-                (r'ataque', 'aproximação'),
-                (r'medo', 'admiração'),
-                (r'terror', 'impacto'),
-                (r'pânico', 'intensidade'),
-                (r'perigoso?(a|s)?', 'impressionante'),
-                (r'sangue', 'efeito visual dramático'),
-                (r'sangrento?(a|s)?', 'dramático'),
-                (r'mort(e|o|a|os|as)', 'drama'),
-                (r'morre(r|ndo|u|m)?', 'desaparece'),
-                (r'mata(r|ndo|m|ram)?', 'neutraliza'),
-                (r'agressiv(o|a|amente|os|as)', 'energétic'),
-                (r'ferimento', 'marca dramática'),
-                (r'ferido?(a|s)?', 'afetado'),
-                (r'ferir', 'impactar'),
-                (r'tortura', 'tensão extrema'),
-                (r'mutilação', 'transformação'),
-                (r'brutal(idade)?', 'intenso'),
-            ]
+async def _process_video_job(video_id: str, payload: dict):
+    """Background worker handler for queued video generations"""
+    request = payload["request"]
+    await database.update_video_generation(video_id, {"status": "processing"})
 
-            for pattern, replacement in violence_replacements:
-                sanitized = re.sub(pattern, replacement, sanitized, flags=re.IGNORECASE)
-
-            # STEP 3: Replace WEAPONS mentions (contextual)
-            weapons_replacements = [
-                (r'\barma\b', 'objeto cênico'),
-                (r'\barmas\b', 'objetos cênicos'),
-                (r'\bfaca\b', 'objeto metálico'),
-                (r'\bfacas\b', 'objetos metálicos'),
-                (r'\bespada\b', 'lâmina cênica'),
-                (r'\bpistola\b', 'objeto de cena'),
-                (r'\brevólver\b', 'objeto de cena'),
-            ]
+    try:
+        result_url, cost = await _run_video_generation(request, payload["prompt"], payload["cost"], video_id)
+        await _complete_video_generation(video_id, request, result_url, cost)
+        logger.info(f"✅ Video job {video_id} completed: {result_url}")
+    except Exception as e:
+        logger.error(f"❌ Video job {video_id} failed: {str(e)}")
+        await database.update_video_generation(video_id, {
+            "status": "failed",
+            "error": str(e)
+        })
 
-            for pattern, replacement in weapons_replacements:
-                sanitized = re.sub(pattern, replacement, sanitized, flags=re.IGNORECASE)
+def _request_from_video_row(row: dict) -> GenerateVideoRequest:
+    """Rebuild the original request from a persisted video_generations row"""
+    return GenerateVideoRequest(
+        image_url=row['image_id'],
+        model=row['model'],
+        provider=row.get('provider') or "google_gemini",
+        mode=row['mode'],
+        prompt=row['prompt'],
+        audio_url=row.get('audio_id'),
+        duration=int(row['duration']) if row.get('duration') is not None else 5,
+        background=True
+    )
+
+async def _resume_video_operation(row: dict, initial_delay: float):
+    """Re-attach to a provider operation persisted before a restart and finish the row"""
+    video_id = row['id']
+    try:
+        request = _request_from_video_row(row)
+        result = await video_manager.resume_video(
+            VideoProvider(row['operation_provider']),
+            row['operation_name'],
+            request.image_url,
+            sanitize_prompt(request.prompt),
+            request.duration,
+            with_audio=bool(request.audio_url),
+            initial_delay=initial_delay
+        )
+        await _complete_video_generation(video_id, request, result.video_url, result.cost)
+        logger.info(f"✅ Recovered video {video_id}: {result.video_url}")
+    except Exception as e:
+        logger.error(f"❌ Recovery of video {video_id} failed: {str(e)}")
+        await database.update_video_generation(video_id, {
+            "status": "failed",
+            "error": str(e)
+        })
 
-            # STEP 4: Replace EXPLICIT content (if any slips through)
-            explicit_replacements = [
-                (r'\bnu\b', 'natural'),
-                (r'\bnua\b', 'natural'),
-                (r'\bnudez\b', 'naturalidade'),
-                (r'\bdespido?(a|s)?\b', 'simples'),
-            ]
+_recovery_tasks: set = set()
 
-            for pattern, replacement in explicit_replacements:
-                sanitized = re.sub(pattern, replacement, sanitized, flags=re.IGNORECASE)
+# Providers cujo job aceito pode ser retomado pelo id persistido (operação Gemini / request_id da FAL)
+_RESUMABLE_VIDEO_PROVIDERS = frozenset(p.value for p in (
+    VideoProvider.GOOGLE_VEO31_GEMINI, VideoProvider.FAL_VEO3, VideoProvider.FAL_SORA2, VideoProvider.FAL_WAV2LIP
+))
 
-            # STEP 5: Replace ILLEGAL ACTIVITIES
-            illegal_replacements = [
-                (r'\bdroga\b', 'substância'),
-                (r'\bdrogas\b', 'substâncias'),
-            ]
+async def _recover_video_generations():
+    """Resume persisted operations, re-enqueue pending jobs, fail interrupted rows
+
+    Roda em todo worker (no startup e a cada renovação de leases): só age sobre registros sem dono
+    vivo e só depois de reivindicá-los (video_leases.claim) - nunca duplica trabalho entre workers.
+    """
+    rows = await video_leases.unowned()
+    if not rows:
+        return
+
+    resumed = requeued = failed = 0
+    for row in rows:
+        video_id = row['id']
+        if not await video_leases.claim(video_id, row['status']):
+            continue  # outro worker reivindicou antes
+
+        if row.get('operation_name') and row.get('operation_provider') in _RESUMABLE_VIDEO_PROVIDERS:
+            # Job já pago: só reanexa (poller do Gemini / fila da FAL), primeira consulta espalhada, sem rajada
+            task = asyncio.create_task(
+                _resume_video_operation(row, random.uniform(0, VIDEO_RECOVERY_SPREAD)),
+                name=f"video-recovery-{video_id}"
+            )
+            _recovery_tasks.add(task)
+            task.add_done_callback(_recovery_tasks.discard)
+            resumed += 1
+            continue
+
+        if row['status'] == 'pending':
+            # Ainda não tinha começado: volta para a fila
+            try:
+                request = _request_from_video_row(row)
+                video_jobs.submit(video_id, {
+                    "request": request,
+                    "prompt": sanitize_prompt(request.prompt),
+                    "cost": row.get('estimated_cost') or 0.0
+                })
+                requeued += 1
+                continue
+            except Exception as e:
+                error = f"Não foi possível reenfileirar após reinício: {str(e)}"
+        else:
+            # Estava em andamento sem operação persistida: não há como retomar
+            error = "Interrompido por reinício do servidor antes de a operação ser registrada"
+
+        await database.update_video_generation(video_id, {"status": "failed", "error": error})
+        failed += 1
+
+    if resumed or requeued or failed:
+        logger.info(f"🔁 Video recovery: {resumed} resumed, {requeued} re-enqueued, {failed} failed")
+
+async def _idempotent_response(
+    scope: str,
+    idempotency_key: Optional[str],
+    fields: dict,
+    handler,
+    resource_id: Optional[str] = None,
+    replay_auto: bool = True
+):
+    """Run a paid generation at most once per Idempotency-Key (or identical content); duplicates replay its response
+
+    replay_auto=False: sem Idempotency-Key só requests simultâneos são unidos (ver idempotency.py).
+    """
+    async def run():
+        result = await handler()
+        if isinstance(result, JSONResponse):
+            return result.status_code, json.loads(result.body)
+        return 200, result
 
-            for pattern, replacement in illegal_replacements:
-                sanitized = re.sub(pattern, replacement, sanitized, flags=re.IGNORECASE)
+    try:
+        response = await idempotency.run(
+            scope, idempotency_key, request_fingerprint(scope, fields), run, resource_id, replay_auto=replay_auto
+        )
+    except IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail={"message": str(e), "resource_id": e.resource_id})
 
-            # STEP 6: Clean up extra spaces and formatting
-            sanitized = re.sub(r'\s+', ' ', sanitized)  # Multiple spaces to single
-            sanitized = re.sub(r'\.\s*\.', '.', sanitized)  # Double periods
-            sanitized = re.sub(r'\s+([,.])', r'\1', sanitized)  # Space before punctuation
-            sanitized = sanitized.strip()
+    headers = {"Idempotent-Replayed": "true"} if response.replayed else None
+    return JSONResponse(status_code=response.status_code, content=response.body, headers=headers)
 
-            return sanitized
-        
+@api_router.post("/video/generate")
+async def generate_video(
+    request: GenerateVideoRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Generate video with selected model (Premium or Econômico)
+
+    Repetições (mesmo Idempotency-Key ou, sem ele, mesmo conteúdo em poucos minutos) devolvem o mesmo video_id.
+    """
+    # Imagem enviada antes por /images/upload/stream: os providers recebem a URL do blob
+    if request.image_id:
+        if not is_valid_digest(request.image_id) or not await blob_store.get_info(request.image_id):
+            raise HTTPException(status_code=404, detail=f"Image not found: {request.image_id}")
+        request.image_url = resolve_blob_url(blob_ref(request.image_id))
+    elif not request.image_url:
+        raise HTTPException(status_code=400, detail="Either image_id or image_url must be provided")
+
+    video_id = str(uuid.uuid4())
+    fields = {
+        "image": parse_blob_ref(request.image_url) or request.image_url,
+        "audio": request.audio_url,
+        "prompt": request.prompt,
+        "model": request.model,
+        "provider": request.provider,
+        "mode": request.mode,
+        "duration": request.duration,
+        "cinematic_settings": request.cinematic_settings,
+        "background": request.background
+    }
+    return await _idempotent_response(
+        "video", idempotency_key, fields, lambda: _generate_video(request, video_id), resource_id=video_id
+    )
+
+async def _generate_video(request: GenerateVideoRequest, video_id: str):
+    """Create the video row and generate it (inline or as a background job)"""
+    try:
         # Sanitize prompt
         original_prompt = request.prompt
         sanitized_prompt = sanitize_prompt(request.prompt)
@@ -989,169 +1601,60 @@ async def generate_video(request: GenerateVideoRequest):
                 cost = request.duration * 0.05
         # Modo econômico é gratuito
         
+        # Admission control: fila do provider já cheia => 429 antes de criar o registro
+        scheduler_provider = _video_scheduler_provider(request)
+        if scheduler_provider is not None:
+            provider_scheduler.admit(scheduler_provider, request.mode)
+        
         # Save initial record
         video = VideoGeneration(
             id=video_id,
             image_id=request.image_url,
             audio_id=request.audio_url,
             model=request.model,
+            provider=request.provider,
             mode=request.mode,
             prompt=request.prompt,
             duration=request.duration,
             estimated_cost=cost,
-            status="processing"
+            status="pending" if request.background else "processing"
         )
 
         doc = video.model_dump()
         doc['timestamp'] = doc['timestamp'].isoformat()
+        # Dono = este worker: a recuperação dos outros workers não toca no registro enquanto o lease vale
+        doc['owner'] = video_leases.owner
+        doc['lease_until'] = video_leases.lease_until()
         await database.insert_video_generation(doc)
+
+        # Job mode: responde na hora e processa em segundo plano
+        if request.background:
+            try:
+                video_jobs.submit(video_id, {"request": request, "prompt": sanitized_prompt, "cost": cost})
+            except JobQueueFullError as e:
+                await database.update_video_generation(video_id, {"status": "failed", "error": str(e)})
+                return JSONResponse(status_code=503, content={
+                    "success": False,
+                    "video_id": video_id,
+                    "error_code": "QUEUE_FULL",
+                    "message": str(e)
+                })
+
+            return JSONResponse(status_code=202, content={
+                "success": True,
+                "video_id": video_id,
+                "status": "pending",
+                "status_url": f"/api/video/jobs/{video_id}",
+                "estimated_cost": cost,
+                "mode": request.mode,
+                "is_free": request.mode == "economico"
+            })
         
         # Generate video based on model, mode, and provider
-        result_url = None
-        
-        if request.mode == "premium":
-            # Veo 3.1 - Usar provider correto (Gemini API recomendado, FAL.AI backup)
-            if request.model == "veo3":
-                logger.info(f"🎬 Generating Veo 3.1 video with provider: {request.provider}")
-                logger.info(f"   Image: {request.image_url[:100]}")
-                logger.info(f"   Prompt: {sanitized_prompt}")
-                logger.info(f"   Duration: {request.duration}s")
-                
-                # Usar video_providers.py para gerenciar providers
-                from video_providers import VideoProviderManager, VideoProvider
-                
-                provider_manager = VideoProviderManager()
-                
-                # Map provider name to VideoProvider enum
-                # Prioridade: google_gemini > fal > google_vertex (deprecado)
-                if request.provider == "google_gemini":
-                    provider_enum = VideoProvider.GOOGLE_VEO31_GEMINI
-                    logger.info("⭐ Using Google Veo 3.1 (Gemini API) - 62% ECONOMIA!")
-                elif request.provider == "google_vertex":
-                    provider_enum = VideoProvider.GOOGLE_VEO3_DIRECT
-                    logger.info("⚠️ Using Google Veo Direct (Vertex) - modelo não disponível")
-                elif request.provider == "google":
-                    # Legacy: tenta Gemini primeiro, depois Vertex
-                    if video_manager.google_gemini_available:
-                        provider_enum = VideoProvider.GOOGLE_VEO31_GEMINI
-                        logger.info("⭐ Using Google Veo 3.1 (Gemini API) - auto-selected")
-                    else:
-                        provider_enum = VideoProvider.GOOGLE_VEO3_DIRECT
-                        logger.info("⚠️ Falling back to Google Vertex (not available)")
-                else:
-                    provider_enum = VideoProvider.FAL_VEO3
-                    logger.info("✅ Using FAL.AI for Veo 3.1 (backup)")
-                
-                # Generate via provider
-                result = await provider_manager.generate_video(
-                    provider=provider_enum,
-                    image_url=request.image_url,
-                    prompt=sanitized_prompt,
-                    duration=request.duration
-                )
-                
-                # VideoGenerationResult é um objeto, não dict
-                result_url = result.video_url
-                cost = result.cost  # Update cost with actual value
-                logger.info(f"✅ Video generated successfully: {result_url}")
-                logger.info(f"💰 Actual cost: ${cost:.2f}")
-                
-            elif request.model == "sora2":
-                logger.info(f"🎬 Generating Sora 2 video with provider: {request.provider}")
-                
-                # Usar video_providers.py
-                from video_providers import VideoProviderManager, VideoProvider
-                
-                provider_manager = VideoProviderManager()
-                
-                # Sora 2 atualmente só via FAL.AI
-                provider_enum = VideoProvider.FAL_SORA2
-                logger.info("✅ Using FAL.AI for Sora 2")
-                
-                result = await provider_manager.generate_video(
-                    provider=provider_enum,
-                    image_url=request.image_url,
-                    prompt=sanitized_prompt,
-                    duration=request.duration
-                )
-                
-                # VideoGenerationResult é um objeto
-                result_url = result.video_url
-                cost = result.cost  # Update cost
-                logger.info(f"✅ Sora 2 video generated: {result_url}")
-                logger.info(f"💰 Actual cost: ${cost:.2f}")
-                
-            elif request.model == "wav2lip":
-                if not request.audio_url:
-                    raise HTTPException(status_code=400, detail="Audio URL required for Wav2lip")
-                
-                import asyncio
-                handler = fal_client.submit(
-                    "fal-ai/wav2lip",
-                    arguments={
-                        "face_url": request.image_url,
-                        "audio_url": request.audio_url
-                    }
-                )
-                # Run in executor to avoid blocking
-                result = await asyncio.get_event_loop().run_in_executor(
-                    None, handler.get
-                )
-                result_url = result.get('video', {}).get('url')
-        
-        elif request.mode == "economico":
-            # Free models via HuggingFace Spaces
-            if request.model == "open-sora":
-                try:
-                    # Use HuggingFace Open-Sora Space
-                    hf_client = Client("hpcai-tech/Open-Sora")
-                    result = hf_client.predict(
-                        prompt=request.prompt,
-                        image=request.image_url,
-                        api_name="/predict"
-                    )
-                    result_url = result
-                except Exception as e:
-                    logger.error(f"Error with Open-Sora: {str(e)}")
-                    raise HTTPException(status_code=503, detail=f"Modelo Open-Sora temporariamente indisponível. Erro: {str(e)}")
-                    
-            elif request.model == "wav2lip-free":
-                if not request.audio_url:
-                    raise HTTPException(status_code=400, detail="Audio URL required for Wav2lip")
-                
-                try:
-                    # Use HuggingFace Wav2Lip Space (procurar space público disponível)
-                    # Nota: Pode variar dependendo do space disponível
-                    hf_client = Client("fffiloni/Wav2Lip")
-                    result = hf_client.predict(
-                        image=request.image_url,
-                        audio=request.audio_url,
-                        api_name="/predict"
-                    )
-                    result_url = result
-                except Exception as e:
-                    logger.error(f"Error with Wav2Lip Free: {str(e)}")
-                    raise HTTPException(status_code=503, detail=f"Modelo Wav2Lip Free temporariamente indisponível. Erro: {str(e)}")
-        
-        # Update record
-        await database.update_video_generation(video_id, {
-            "status": "completed",
-            "result_url": result_url,
-            "cost": cost
-        })
+        result_url, cost = await _run_video_generation(request, sanitized_prompt, cost, video_id, shed=True)
+
+        await _complete_video_generation(video_id, request, result_url, cost)
 
-        # Track usage (only for paid services)
-        if cost > 0:
-            usage = TokenUsage(
-                service="fal_ai",
-                operation=f"video_generation_{request.model}",
-                cost=cost,
-                details={"duration": request.duration, "model": request.model, "mode": request.mode}
-            )
-            usage_doc = usage.model_dump()
-            usage_doc['timestamp'] = usage_doc['timestamp'].isoformat()
-            await database.insert_token_usage(usage_doc)
-        
         return {
             "success": True,
             "video_id": video_id,
@@ -1161,6 +1664,21 @@ async def generate_video(request: GenerateVideoRequest):
             "is_free": request.mode == "economico"
         }
         
+    except ProviderBusyError as e:
+        await database.update_video_generation(video_id, {"status": "failed", "error": str(e)})
+        raise HTTPException(
+            status_code=429,
+            detail={"error_code": "PROVIDER_BUSY", "message": str(e)},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except CircuitOpenError as e:
+        # Provider com falhas seguidas: falha na hora em vez de esperar o timeout
+        await database.update_video_generation(video_id, {"status": "failed", "error": str(e)})
+        raise HTTPException(
+            status_code=503,
+            detail={"error_code": "PROVIDER_UNAVAILABLE", "message": str(e)},
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"❌ Error generating video: {str(e)}")
         logger.error(f"❌ Error type: {type(e).__name__}")
@@ -1175,72 +1693,7 @@ async def generate_video(request: GenerateVideoRequest):
             error_detail = str(e.args[0])
             logger.error(f"❌ Error detail: {error_detail}")
         
-        # Check for specific FAL.AI error patterns
-        error_lower = error_message.lower()
-        
-        # Pattern 1: Actual content policy violations
-        is_content_policy = (
-            'content_policy_violation' in error_lower or 
-            'content policy' in error_lower or
-            'violates our content policy' in error_lower or
-            'blocked by safety' in error_lower or
-            'safety filter' in error_lower
-        )
-        
-        # Pattern 2: Authentication/API key errors
-        is_auth_error = (
-            'unauthorized' in error_lower or
-            'invalid api key' in error_lower or
-            'authentication failed' in error_lower or
-            '401' in error_message or
-            '403' in error_message
-        )
-        
-        # Pattern 3: Invalid parameters
-        is_param_error = (
-            'invalid parameter' in error_lower or
-            'bad request' in error_lower or
-            '400' in error_message or
-            'validation error' in error_lower
-        )
-        
-        # Pattern 4: Service unavailable
-        is_service_error = (
-            '503' in error_message or
-            '502' in error_message or
-            'service unavailable' in error_lower or
-            'timeout' in error_lower
-        )
-        
-        # Generate user-friendly messages based on error type
-        if is_content_policy:
-            friendly_message = """⚠️ Política de Conteúdo: O prompt contém termos que foram bloqueados pela política de conteúdo da IA.
-
-Dicas para resolver:
-• Evite palavras como: ameaçador, violento, ataque, sangue, armas
-• Use palavras neutras: impressionante, surpreendente, dramático
-• Foque na descrição visual sem conotação violenta
-
-Exemplo: Em vez de "T-Rex ameaçador rugindo", use "T-Rex impressionante com boca aberta"."""
-            error_code = "CONTENT_POLICY"
-            
-        elif is_auth_error:
-            friendly_message = "❌ Erro de Autenticação: Chave de API FAL.AI inválida ou expirada. Verifique suas credenciais."
-            error_code = "AUTH_ERROR"
-            
-        elif is_param_error:
-            friendly_message = f"❌ Parâmetros Inválidos: {error_message}\n\nVerifique se a imagem está acessível e o prompt está correto."
-            error_code = "INVALID_PARAMS"
-            
-        elif is_service_error:
-            friendly_message = "❌ Serviço Temporariamente Indisponível: O servidor FAL.AI está sobrecarregado. Tente novamente em alguns minutos."
-            error_code = "SERVICE_UNAVAILABLE"
-            
-        else:
-            # Unknown error - show actual error message for debugging
-            friendly_message = f"❌ Erro ao gerar vídeo:\n\n{error_message}\n\nDetalhes técnicos: {error_detail or 'N/A'}"
-            error_code = "GENERATION_ERROR"
-            logger.error(f"❌ UNKNOWN ERROR TYPE - Full message: {error_message}")
+        error_code, friendly_message = classify_video_error(error_message, error_detail)
         
         # Update record with error
         await database.update_video_generation(video_id, {
@@ -1257,6 +1710,53 @@ Exemplo: Em vez de "T-Rex ameaçador rugindo", use "T-Rex impressionante com boc
             }
         )
 
+@api_router.get("/video/jobs/{video_id}")
+async def get_video_job(video_id: str):
+    """Get the status of a video generation job"""
+    try:
+        job = await database.get_video_generation(video_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Vídeo não encontrado")
+
+        response = {
+            "success": True,
+            "video_id": video_id,
+            "status": job["status"],
+            "model": job["model"],
+            "mode": job["mode"],
+            "video_url": job.get("result_url"),
+            "cost": job.get("cost"),
+            "estimated_cost": job.get("estimated_cost"),
+            "timestamp": job["timestamp"]
+        }
+
+        if job["status"] == "failed" and job.get("error"):
+            error_code, friendly_message = classify_video_error(job["error"])
+            response["error_code"] = error_code
+            response["message"] = friendly_message
+
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting video job: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/providers/scheduler")
+async def get_provider_scheduler_stats():
+    """Slots, queue depth and wait times per provider and lane"""
+    return {"success": True, "providers": provider_scheduler.stats()}
+
+@api_router.get("/providers/retries")
+async def get_provider_retry_stats():
+    """Retries, recoveries and retry budget per provider policy"""
+    return {"success": True, "policies": retry_policies.stats()}
+
+@api_router.get("/video/routing")
+async def get_video_routing_stats():
+    """Rolling latency/error stats per Veo provider and the current auto-routing order"""
+    return {"success": True, **video_router.stats()}
+
 @api_router.post("/auth/verify")
 async def verify_password(request: VerifyPasswordRequest):
     """Verify admin password"""
@@ -1267,54 +1767,86 @@ async def verify_password(request: VerifyPasswordRequest):
     else:
         raise HTTPException(status_code=401, detail="Invalid password")
 
+def _micros_to_dollars(micros: int) -> float:
+    return micros / MICROS_PER_DOLLAR
+
+def _balance_summary(balances: List[dict], totals: dict) -> dict:
+    """Initial/spent/remaining per service; math done in integer micro-dollars"""
+    result = {}
+    for balance in balances:
+        service = balance.get('service')
+        initial_micros = round(balance.get('initial_balance', 0) * MICROS_PER_DOLLAR)
+        spent_micros = totals.get(service, {}).get('cost_micros', 0)
+        result[service] = {
+            "initial": round(_micros_to_dollars(initial_micros), 2),
+            "spent": round(_micros_to_dollars(spent_micros), 2),
+            "remaining": round(_micros_to_dollars(initial_micros - spent_micros), 2)
+        }
+    return result
+
 @api_router.get("/tokens/usage")
 async def get_token_usage():
     """Get token usage statistics"""
     try:
-        # Get all usage records
-        usage_records = await database.get_token_usage(limit=1000)
-
-        # Calculate totals
-        total_spent = sum(record.get('cost', 0) for record in usage_records)
-
-        # Group by service
-        by_service = {}
-        for record in usage_records:
-            service = record.get('service', 'unknown')
-            if service not in by_service:
-                by_service[service] = 0
-            by_service[service] += record.get('cost', 0)
+        # Totais por serviço vêm da tabela de rollup (O(serviços))
+        totals = await database.get_token_usage_totals()
+        total_spent = _micros_to_dollars(sum(t['cost_micros'] for t in totals.values()))
+        by_service = {service: _micros_to_dollars(t['cost_micros']) for service, t in totals.items()}
 
         # Get recent operations (last 10)
-        recent = sorted(usage_records, key=lambda x: x.get('timestamp', ''), reverse=True)[:10]
+        recent = await database.get_token_usage(limit=10)
 
         # Get balances
         balances = await database.get_all_api_balances()
 
-        # Calculate remaining balances
-        balance_info = {}
-        for balance in balances:
-            service = balance.get('service')
-            initial = balance.get('initial_balance', 0)
-            spent = by_service.get(service, 0)
-            remaining = initial - spent
-            balance_info[service] = {
-                "initial": round(initial, 2),
-                "spent": round(spent, 2),
-                "remaining": round(remaining, 2)
-            }
-
         return {
             "success": True,
             "total_spent": round(total_spent, 2),
             "by_service": {k: round(v, 2) for k, v in by_service.items()},
             "recent_operations": recent,
-            "balances": balance_info
+            "balances": _balance_summary(balances, totals)
         }
     except Exception as e:
         logger.error(f"Error getting token usage: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/tokens/timeseries")
+async def get_token_timeseries(
+    granularity: str = "day",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    service: Optional[str] = None
+):
+    """Spend per day/hour, service and operation
+
+    Query params:
+        granularity: 'day' or 'hour'
+        since/until: inclusive UTC bounds ('2025-01-31' or '2025-01-31T13')
+        service: optional service filter
+    """
+    if granularity not in TIMESERIES_GRANULARITIES:
+        raise HTTPException(status_code=400, detail="granularity must be 'day' or 'hour'")
+
+    try:
+        rows = await database.get_token_usage_timeseries(granularity, since, until, service)
+        return {
+            "success": True,
+            "granularity": granularity,
+            "series": [
+                {
+                    "bucket": row['bucket'],
+                    "service": row['service'],
+                    "operation": row['operation'],
+                    "cost": _micros_to_dollars(row['cost_micros']),
+                    "count": row['count']
+                }
+                for row in rows
+            ]
+        }
+    except Exception as e:
+        logger.error(f"Error getting token timeseries: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.post("/tokens/balance")
 async def update_balance(request: UpdateBalanceRequest):
     """Update or create API balance"""
@@ -1333,36 +1865,12 @@ async def update_balance(request: UpdateBalanceRequest):
 async def get_balances():
     """Get all API balances"""
     try:
-        # Get all balances
         balances = await database.get_all_api_balances()
-
-        # Get usage
-        usage_records = await database.get_token_usage(limit=1000)
-
-        # Group by service
-        by_service = {}
-        for record in usage_records:
-            service = record.get('service', 'unknown')
-            if service not in by_service:
-                by_service[service] = 0
-            by_service[service] += record.get('cost', 0)
-
-        # Calculate remaining for each service
-        result = {}
-        for balance in balances:
-            service = balance.get('service')
-            initial = balance.get('initial_balance', 0)
-            spent = by_service.get(service, 0)
-            remaining = initial - spent
-            result[service] = {
-                "initial": round(initial, 2),
-                "spent": round(spent, 2),
-                "remaining": round(remaining, 2)
-            }
+        totals = await database.get_token_usage_totals()
 
         return {
             "success": True,
-            "balances": result
+            "balances": _balance_summary(balances, totals)
         }
     except Exception as e:
         logger.error(f"Error getting balances: {str(e)}")
@@ -1377,9 +1885,13 @@ async def get_gallery_items():
 
         # Get all audios
         audios = await database.get_audio_generations(limit=100)
+        for audio in audios:
+            audio['audio_url'] = resolve_blob_url(audio['audio_url'])
 
         # Get all images
         images = await database.get_image_analyses(limit=100)
+        for image in images:
+            image['image_url'] = resolve_blob_url(image['image_url'])
 
         return {
             "success": True,
@@ -1391,6 +1903,59 @@ async def get_gallery_items():
         logger.error(f"Error getting gallery items: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _encode_feed_cursor(item: dict) -> str:
+    """Opaque keyset cursor from the last item of a page"""
+    raw = json.dumps([item["timestamp"], item["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_feed_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, item_id = json.loads(raw)
+        return str(timestamp), str(item_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@api_router.get("/gallery/feed")
+async def get_gallery_feed(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    types: Optional[str] = None
+):
+    """Lightweight gallery feed: keyset pagination, field projection and type filters
+
+    Query params:
+        limit: page size (1-200)
+        cursor: next_cursor from the previous page
+        fields: comma-separated projection (model, mode, status, duration, cost, voice_id, media_url, thumbnail_url)
+        types: comma-separated filter (video, audio, image)
+    """
+    try:
+        limit = max(1, min(limit, 200))
+        items = await database.get_gallery_feed(
+            types=types.split(',') if types else None,
+            fields=fields.split(',') if fields else None,
+            cursor=_decode_feed_cursor(cursor) if cursor else None,
+            limit=limit
+        )
+
+        for item in items:
+            for key in ('media_url', 'thumbnail_url'):
+                if key in item:
+                    item[key] = resolve_blob_url(item[key])
+
+        return {
+            "success": True,
+            "items": items,
+            "next_cursor": _encode_feed_cursor(items[-1]) if len(items) == limit else None
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting gallery feed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.delete("/gallery/video/{video_id}")
 async def delete_video(video_id: str):
     """Delete a video from gallery"""
@@ -1436,19 +2001,33 @@ class ImageGenerationRequest(BaseModel):
     """Request body for image generation"""
     prompt: str
     reference_image_base64: Optional[str] = None
+    reference_image_id: Optional[str] = None  # id de /images/upload/stream (sem re-enviar a imagem)
 
 @api_router.post("/images/generate")
-async def generate_image_with_nano_banana(request: ImageGenerationRequest):
+async def generate_image_with_nano_banana(
+    request: ImageGenerationRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """Generate image using Gemini 2.0 Flash Exp with optional reference image (base64)"""
-
+    if request.reference_image_id:
+        reference = request.reference_image_id
+    elif request.reference_image_base64:
+        reference = hashlib.sha256(request.reference_image_base64.split(',', 1)[-1].encode('ascii', 'ignore')).hexdigest()
+    else:
+        reference = None
+    fields = {"prompt": request.prompt, "reference": reference}
+    # Sem Idempotency-Key: mesmo prompt de novo = "gerar outra", só o duplo clique simultâneo é unido
+    return await _idempotent_response(
+        "image", idempotency_key, fields, lambda: _generate_image(request), replay_auto=False
+    )
+
+async def _generate_image(request: ImageGenerationRequest):
+    """Generate one image with Gemini and store it in the gallery"""
     try:
         prompt = request.prompt
         logger.info(f"🎨 Generating image with Gemini 2.0 Flash Exp: {prompt[:100]}...")
 
         import google.generativeai as genai
-        import base64
-        from PIL import Image
-        from io import BytesIO
 
         # Configure Gemini API
         genai.configure(api_key=os.getenv("GEMINI_KEY"))
@@ -1456,29 +2035,39 @@ async def generate_image_with_nano_banana(request: ImageGenerationRequest):
         # Prepare content parts for generation
         content_parts = []
 
-        # If reference image is provided (as base64), add it first
-        if request.reference_image_base64:
+        # If reference image is provided (uploaded id or base64), add it first
+        has_reference = bool(request.reference_image_id or request.reference_image_base64)
+        # Id desconhecido é erro do cliente (404), não uma geração sem referência
+        image_bytes = await _load_image_id(request.reference_image_id) if request.reference_image_id else None
+        if has_reference:
             try:
-                logger.info(f"📎 Reference image provided as base64")
+                if image_bytes is not None:
+                    logger.info(f"📎 Reference image provided as upload {request.reference_image_id[:12]}")
+                else:
+                    logger.info(f"📎 Reference image provided as base64")
 
-                # Extract base64 data (remove data:image/...;base64, prefix if present)
-                base64_data = request.reference_image_base64
-                if ',' in base64_data:
-                    base64_data = base64_data.split(',', 1)[1]
+                    image_bytes = await image_pool.decode_base64(request.reference_image_base64)
 
-                # Decode and convert to PIL Image
-                image_bytes = base64.b64decode(base64_data)
-                pil_image = Image.open(BytesIO(image_bytes))
-                logger.info(f"✅ Reference image loaded (size: {pil_image.size})")
+                # Gemini recebe os bytes originais: só o cabeçalho é lido aqui (sem decodificar pixels)
+                probe = probe_image(image_bytes)
+                if probe is None:
+                    # Formato sem probe (BMP, TIFF...): o PIL identifica, fora do event loop
+                    verified = await image_pool.verify(image_bytes)
+                    mime_type, size = verified['mime_type'], (verified['width'], verified['height'])
+                else:
+                    mime_type, size = probe.mime_type, (probe.width, probe.height)
+                logger.info(f"✅ Reference image loaded (size: {size}, type: {mime_type})")
 
                 # Add image to content parts
-                content_parts.append(pil_image)
+                content_parts.append({"mime_type": mime_type, "data": image_bytes})
 
+            except ImagePoolBusyError:
+                raise
             except Exception as img_error:
                 logger.warning(f"Failed to process reference image: {str(img_error)}")
 
         # Add text prompt with facial preservation instruction if reference image is provided
-        if request.reference_image_base64:
+        if has_reference:
             # Enhance prompt to explicitly preserve facial features
             enhanced_prompt = f"""CRITICAL INSTRUCTION: You MUST keep the EXACT same person from the reference image above. Preserve their face completely - same facial features, face shape, skin tone, eyes, nose, mouth, expression, and all unique characteristics. Preserve the microtexture of the skin, including pores, fine lines, and any unique features like moles or scars. The facial structure, proportions, and all traits must be replicated with photographic precision. The lighting and shadows on the face must remain consistent with the reference image to maintain the exact volume and shape. Only change the setting, clothing, pose, and styling as described below. DO NOT change the person's face or identity.
 
@@ -1498,7 +2087,7 @@ REMINDER: The face in the output image MUST be identical to the face in the refe
         }
 
         # Add resolution instructions to prompt
-        if request.reference_image_base64:
+        if has_reference:
             # Append resolution requirement to existing enhanced prompt
             content_parts[-1] = content_parts[-1] + "\n\nOUTPUT SPECIFICATIONS: Generate in the HIGHEST RESOLUTION possible. Target 2K or 4K quality (minimum 2048x2048 pixels). Professional photography quality with sharp details, high definition, and maximum clarity suitable for large format printing."
         else:
@@ -1513,8 +2102,9 @@ REMINDER: The face in the output image MUST be identical to the face in the refe
 
         logger.info(f"🎨 Calling Gemini 2.5 Flash Image with HIGH RESOLUTION request...")
 
-        # Generate image
-        response = model.generate_content(content_parts)
+        # Generate image (cliente async: o event loop segue livre enquanto o slot está ocupado)
+        async with provider_scheduler.slot("gemini"):
+            response = await model.generate_content_async(content_parts)
 
         logger.info(f"✅ Gemini generation completed")
 
@@ -1530,20 +2120,19 @@ REMINDER: The face in the output image MUST be identical to the face in the refe
 
             # Check for inline data (images)
             if hasattr(part, 'inline_data') and part.inline_data:
-                # Convert to base64
+                # Store bytes in the blob store (row keeps only the reference)
                 image_bytes = part.inline_data.data
-                image_data = base64.b64encode(image_bytes).decode('utf-8')
                 mime_type = part.inline_data.mime_type
-                image_url = f"data:{mime_type};base64,{image_data}"
+                image_data = await blob_store.put(image_bytes, mime_type)
+                image_url = resolve_blob_url(image_data.ref)
                 
                 # Calculate image dimensions for logging
-                try:
-                    pil_img = Image.open(BytesIO(image_bytes))
-                    width, height = pil_img.size
-                    megapixels = (width * height) / 1_000_000
-                    logger.info(f"✅ HIGH RESOLUTION Image extracted: {width}x{height} ({megapixels:.2f}MP), size: {len(image_data)} chars, type: {mime_type}")
-                except:
-                    logger.info(f"✅ Image extracted (size: {len(image_data)} chars, type: {mime_type})")
+                probe = probe_image(image_bytes)
+                if probe is not None:
+                    megapixels = (probe.width * probe.height) / 1_000_000
+                    logger.info(f"✅ HIGH RESOLUTION Image extracted: {probe.width}x{probe.height} ({megapixels:.2f}MP), size: {len(image_bytes)} bytes, type: {mime_type}")
+                else:
+                    logger.info(f"✅ Image extracted (size: {len(image_bytes)} bytes, type: {mime_type})")
                 break
 
         if not image_data:
@@ -1559,7 +2148,7 @@ REMINDER: The face in the output image MUST be identical to the face in the refe
         generated_image = GeneratedImage(
             id=image_id,
             prompt=prompt,
-            image_url=image_url,
+            image_url=image_data.ref,
             cost=0.00  # Gemini 2.0 Flash Exp is free during preview
         )
 
@@ -1575,7 +2164,7 @@ REMINDER: The face in the output image MUST be identical to the face in the refe
             details={
                 "prompt_length": len(prompt),
                 "model": "gemini-2.5-flash-image",
-                "has_reference_image": request.reference_image_base64 is not None
+                "has_reference_image": has_reference
             }
         )
         usage_doc = usage.model_dump()
@@ -1590,6 +2179,12 @@ REMINDER: The face in the output image MUST be identical to the face in the refe
             "cost": 0.039
         }
 
+    except HTTPException:
+        raise
+    except ImagePoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ProviderBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Error generating image with Gemini: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1599,6 +2194,8 @@ async def get_generated_images():
     """Get all generated images"""
     try:
         images = await database.get_generated_images(limit=100)
+        for image in images:
+            image['image_url'] = resolve_blob_url(image['image_url'])
 
         return {
             "success": True,
@@ -1622,6 +2219,78 @@ async def delete_generated_image(image_id: str):
         logger.error(f"Error deleting generated image: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ==================== BLOB ENDPOINTS ====================
+
+def _parse_range_header(range_header: str, size: int) -> Optional[tuple]:
+    """Parse a single 'bytes=start-end' range; None if unsatisfiable"""
+    unit, _, spec = range_header.partition('=')
+    if unit.strip() != 'bytes' or ',' in spec:
+        return None
+
+    start_str, _, end_str = spec.strip().partition('-')
+    try:
+        if start_str == '':
+            # Suffix range: últimos N bytes
+            length = int(end_str)
+            if length <= 0:
+                return None
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(start_str)
+            end = int(end_str) if end_str else size - 1
+    except ValueError:
+        return None
+
+    end = min(end, size - 1)
+    if start < 0 or start > end:
+        return None
+    return start, end
+
+def _etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """True when If-None-Match names this ETag (or is '*')"""
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match or not etag:
+        return False
+    return if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]
+
+@api_router.get("/blobs/{digest}")
+async def get_blob(digest: str, request: Request):
+    """Serve content-addressed bytes with strong ETag and HTTP Range support"""
+    if not is_valid_digest(digest):
+        raise HTTPException(status_code=404, detail="Blob not found")
+
+    info = await blob_store.get_info(digest)
+    if not info:
+        raise HTTPException(status_code=404, detail="Blob not found")
+
+    etag = f'"{digest}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=31536000, immutable"
+    }
+
+    # Conteúdo é imutável: o hash é o próprio ETag
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    start, end = 0, info.size - 1
+    status_code = 200
+    range_header = request.headers.get('range')
+    if_range = request.headers.get('if-range')
+    if range_header and info.size > 0 and (not if_range or if_range.strip() == etag):
+        byte_range = _parse_range_header(range_header, info.size)
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{info.size}"})
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+
+    headers["Content-Length"] = str(end - start + 1 if info.size > 0 else 0)
+    body = blob_store.iter_range(digest, start, end) if info.size > 0 else iter(())
+
+    return StreamingResponse(body, status_code=status_code, media_type=info.content_type, headers=headers)
+
 # ==================== ROOT ENDPOINTS ====================
 
 @app.get("/")
@@ -1643,8 +2312,8 @@ async def root():
 async def health_check():
     """Health check endpoint for monitoring"""
     try:
-        # Check database connection
-        await database.init_db()
+        # Check database connection (SELECT 1; o schema é criado só no startup)
+        await database.ping()
         
         return {
             "status": "healthy",
@@ -1656,6 +2325,9 @@ async def health_check():
                 "gemini": "configured" if os.environ.get('GEMINI_KEY') else "not_configured",
                 "elevenlabs": "configured" if os.environ.get('ELEVENLABS_KEY') else "not_configured",
                 "fal": "configured" if os.environ.get('FAL_KEY') else "not_configured"
+            },
+            "video_providers": {
+                name: state["status"] for name, state in video_manager.get_readiness().items()
             }
         }
     except Exception as e:
@@ -1680,5 +2352,71 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_db():
     """Initialize SQLite database on startup"""
+    await database.connect()
     await database.init_db()
-    logger.info("✅ SQLite database initialized successfully")
\ No newline at end of file
+    logger.info("✅ SQLite database initialized successfully")
+
+@app.on_event("startup")
+async def startup_idempotency():
+    """Drop idempotency keys past their replay window"""
+    await idempotency.purge_expired()
+
+@app.on_event("startup")
+async def startup_analysis_cache():
+    """Load perceptual hashes of cached analyses into the Hamming index"""
+    await analysis_cache.load_phash_index(ANALYSIS_PROMPT_VERSION)
+
+@app.on_event("startup")
+async def startup_image_pool():
+    """Spawn the image worker processes"""
+    await image_pool.start()
+
+@app.on_event("startup")
+async def startup_voice_catalog():
+    """Load the ElevenLabs voice list into memory"""
+    await voice_catalog.start(elevenlabs_async_client.voices.get_all)
+
+@app.on_event("startup")
+async def startup_video_providers():
+    """Create long-lived provider SDK clients once"""
+    await video_manager.warm_up()
+
+@app.on_event("startup")
+async def startup_video_jobs():
+    """Start background workers for queued video generations"""
+    await video_jobs.start(_process_video_job)
+
+@app.on_event("startup")
+async def startup_video_recovery():
+    """Finish video generations interrupted by a restart (now and whenever a worker's leases expire)"""
+    await video_leases.start(_recover_video_generations)
+
+@app.on_event("shutdown")
+async def shutdown_video_jobs():
+    """Stop background video workers"""
+    await video_jobs.stop()
+
+@app.on_event("shutdown")
+async def shutdown_operation_poller():
+    """Stop the shared long-running operation poller"""
+    await operation_poller.stop()
+
+@app.on_event("shutdown")
+async def shutdown_video_leases():
+    """Stop renewing video leases and hand this worker's rows to the next recovery sweep"""
+    await video_leases.stop()
+
+@app.on_event("shutdown")
+async def shutdown_image_pool():
+    """Stop the image worker processes"""
+    image_pool.shutdown()
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    """Close the shared outbound HTTP connection pool"""
+    await http_client.close()
+
+@app.on_event("shutdown")
+async def shutdown_db():
+    """Close pooled SQLite connections"""
+    await database.close()
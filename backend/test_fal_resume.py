@@ -0,0 +1,72 @@
+"""
+Tests for resuming an accepted FAL.AI job (video_providers._generate_via_fal com request_id)
+Roda contra o fal_client instalado (requirements.txt fixa 0.8.1), com a fila da FAL simulada por
+um httpx.MockTransport - nada sai da máquina e nenhum job é submetido.
+Run: python test_fal_resume.py  (ou pytest)
+"""
+import asyncio
+import os
+import sys
+
+import httpx
+
+os.environ.setdefault('FAL_KEY', 'test-key')
+
+import fal_client
+
+from video_providers import VideoProvider, video_manager
+
+VIDEO_URL = "https://v3.fal.media/files/resumed.mp4"
+
+
+def fake_queue(requests):
+    """Fila da FAL: o job já aceito termina e devolve o vídeo; submit não é permitido"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path))
+        if request.url.path.endswith('/status'):
+            return httpx.Response(200, json={"status": "COMPLETED", "logs": None, "metrics": {}})
+        if request.method == 'GET' and '/requests/' in request.url.path:
+            return httpx.Response(200, json={"video": {"url": VIDEO_URL}})
+        return httpx.Response(500, json={"detail": f"unexpected {request.method} {request.url.path}"})
+    return handler
+
+
+def run_with_fake_queue(coro_fn):
+    requests = []
+    client = fal_client.AsyncClient(key='test-key')
+    # _client é um cached_property: injeta o httpx.AsyncClient com a fila simulada
+    client.__dict__['_client'] = httpx.AsyncClient(transport=httpx.MockTransport(fake_queue(requests)))
+    original, fal_client.async_client = fal_client.async_client, client
+    fal_available, video_manager.fal_available = video_manager.fal_available, True
+    try:
+        return asyncio.run(coro_fn()), requests
+    finally:
+        fal_client.async_client = original
+        video_manager.fal_available = fal_available
+
+
+def test_resume_waits_for_the_accepted_request():
+    async def resume():
+        return await video_manager._generate_via_fal(
+            VideoProvider.FAL_VEO3, "https://example.com/a.png", "prompt", 8, False, request_id="req-123"
+        )
+
+    result, requests = run_with_fake_queue(resume)
+    assert result.video_url == VIDEO_URL
+    assert result.cost == 8 * 0.20
+    assert requests, "resume didn't reach the queue"
+    assert all('/requests/req-123' in path for _, path in requests), requests
+    assert not any(method == 'POST' for method, _ in requests), "resume submitted a new (paid) job"
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    failed = 0
+    for name, fn in tests:
+        try:
+            fn()
+            print(f"[OK] {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {name}: {e}")
+    sys.exit(1 if failed else 0)
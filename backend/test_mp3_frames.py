@@ -0,0 +1,174 @@
+"""
+Golden tests for the MP3 frame scanner (mp3_frames.py)
+Os arquivos são montados byte a byte com durações conhecidas: CBR com padding, VBR,
+Xing/Info com gapless LAME, VBRI, MPEG 2, ID3v2/ID3v1, lixo no meio e frame truncado.
+Run: python test_mp3_frames.py  (ou pytest)
+"""
+import struct
+import sys
+import time
+
+from mp3_frames import join_mp3, mp3_duration, parse_frame_header, scan_mp3
+
+MPEG1, MPEG2 = 0b11, 0b10
+
+
+def frame(bitrate_index=9, sample_rate_index=0, padding=0, version=MPEG1, mono=False, fill=b'\x00'):
+    """One Layer III frame (default: MPEG 1, 128 kbps, 44.1 kHz, stereo)"""
+    header = struct.pack('>I', 0xFFE00000 | version << 19 | 0b01 << 17 | 1 << 16 |
+                         bitrate_index << 12 | sample_rate_index << 10 | padding << 9 | (0b11 << 6 if mono else 0))
+    length = parse_frame_header(header).frame_length
+    return header + (fill * length)[:length - 4]
+
+
+def cbr_128k(frames):
+    # Padrão de padding do LAME a 44.1 kHz: 417/418 bytes alternando
+    return b''.join(frame(padding=1 if i % 25 == 24 else 0) for i in range(frames))
+
+
+def xing_frame(tag=b'Xing', frames=None, toc=True, lame=None):
+    flags = (0x1 if frames is not None else 0) | (0x4 if toc else 0)
+    body = tag + struct.pack('>I', flags)
+    if frames is not None:
+        body += struct.pack('>I', frames)
+    if toc:
+        body += bytes(range(100))
+    if lame:
+        delay, padding = lame
+        body += b'LAME3.100' + b'\x00' * 12 + bytes([delay >> 4, (delay & 0x0F) << 4 | padding >> 8, padding & 0xFF])
+    f = bytearray(frame())
+    f[36:36 + len(body)] = body
+    return bytes(f)
+
+
+def vbri_frame(frames):
+    f = bytearray(frame())
+    f[36:54] = b'VBRI' + struct.pack('>HHHII', 1, 576, 75, 0, frames)
+    return bytes(f)
+
+
+def id3v2(size=300, footer=False):
+    syncsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b'ID3\x04\x00' + (b'\x10' if footer else b'\x00') + syncsafe + b'\x00' * size + (b'3DI' + b'\x00' * 7 if footer else b'')
+
+
+def id3v1():
+    return b'TAG' + b'\x00' * 125
+
+
+def assert_close(actual, expected):
+    assert abs(actual - expected) < 1e-9, f"{actual} != {expected}"
+
+
+SPF1 = 1152 / 44100  # segundos por frame, MPEG 1 a 44.1 kHz
+
+
+def test_cbr_with_padding():
+    info = scan_mp3(cbr_128k(1000))
+    assert info.frames == 1000 and info.source == 'scan' and not info.vbr
+    assert_close(info.duration, 1000 * SPF1)
+    assert 127000 < info.bitrate < 129000
+
+
+def test_id3_tags_are_skipped():
+    data = id3v2() + cbr_128k(200) + id3v1()
+    assert_close(mp3_duration(data), 200 * SPF1)
+    data = id3v2(footer=True) + cbr_128k(200)
+    assert_close(mp3_duration(data), 200 * SPF1)
+
+
+def test_vbr_without_header():
+    data = b''.join(frame(bitrate_index=5 + i % 9) for i in range(300))
+    info = scan_mp3(data)
+    assert info.vbr and info.frames == 300
+    assert_close(info.duration, 300 * SPF1)
+
+
+def test_xing_header_with_lame_gapless():
+    # O cabeçalho diz 5000 frames: a duração vem dele, sem varrer o arquivo
+    data = xing_frame(frames=5000, lame=(576, 1104)) + cbr_128k(10)
+    info = scan_mp3(data)
+    assert info.source == 'xing' and info.vbr and info.frames == 5000
+    assert_close(info.duration, (5000 * 1152 - 576 - 1104) / 44100)
+
+
+def test_info_header_is_cbr():
+    info = scan_mp3(id3v2() + xing_frame(tag=b'Info', frames=40) + cbr_128k(40))
+    assert info.source == 'info' and not info.vbr
+    assert_close(info.duration, 40 * SPF1)
+
+
+def test_xing_without_frame_count_falls_back_to_scan():
+    info = scan_mp3(xing_frame(frames=None) + cbr_128k(77))
+    assert info.source == 'scan' and info.frames == 77
+    assert_close(info.duration, 77 * SPF1)
+
+
+def test_vbri_header():
+    info = scan_mp3(vbri_frame(1234) + cbr_128k(5))
+    assert info.source == 'vbri' and info.frames == 1234
+    assert_close(info.duration, 1234 * SPF1)
+
+
+def test_mpeg2_mono():
+    data = b''.join(frame(bitrate_index=8, sample_rate_index=0, version=MPEG2, mono=True) for _ in range(500))
+    info = scan_mp3(data)
+    assert info.sample_rate == 22050 and 63000 < info.bitrate < 65000
+    assert_close(info.duration, 500 * 576 / 22050)
+
+
+def test_garbage_and_false_sync_are_skipped():
+    garbage = b'\x00\xff\xfb\x90\x00\x12' * 50  # sync falso dentro do lixo
+    data = cbr_128k(100) + garbage + cbr_128k(100)
+    info = scan_mp3(data)
+    assert info.frames == 200
+    assert_close(info.duration, 200 * SPF1)
+
+
+def test_truncated_last_frame_is_ignored():
+    data = cbr_128k(50) + frame()[:200]
+    assert_close(mp3_duration(data), 50 * SPF1)
+
+
+def test_not_mp3():
+    assert scan_mp3(b'') is None
+    assert scan_mp3(b'\x89PNG\r\n\x1a\n' + b'\x00' * 4000) is None
+    assert mp3_duration(b'RIFF' + b'\x00' * 1000) == 0.0
+
+
+def test_memoryview_and_bytearray_inputs():
+    data = id3v2() + cbr_128k(60)
+    expected = 60 * SPF1
+    assert_close(mp3_duration(memoryview(data)), expected)
+    assert_close(mp3_duration(bytearray(data)), expected)
+    assert_close(mp3_duration(memoryview(data)[0:]), expected)
+
+
+def test_joined_parts_keep_every_frame():
+    parts = [id3v2() + xing_frame(tag=b'Info', frames=n) + cbr_128k(n) + id3v1() for n in (30, 45, 12)]
+    joined = join_mp3(parts)
+    info = scan_mp3(joined)
+    assert info.source == 'scan' and info.frames == 87
+    assert_close(info.duration, 87 * SPF1)
+
+
+def test_ten_megabytes_in_milliseconds():
+    data = cbr_128k(24000)  # ~10 MB
+    start = time.perf_counter()
+    info = scan_mp3(data)
+    elapsed = time.perf_counter() - start
+    assert info.frames == 24000
+    assert elapsed < 0.1, f"scan took {elapsed * 1000:.1f} ms"
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    failed = 0
+    for name, fn in tests:
+        try:
+            fn()
+            print(f"[OK] {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"[ERROR] {name}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,92 @@
+"""
+Text-to-Speech Cache
+Evita pagar a ElevenLabs de novo pela mesma narração (mesmo texto, voz e ajustes).
+
+Chave: SHA-256 do texto normalizado + voz + modelo + formato + ajustes da voz
+Armazenamento: linhas de audio_generations (coluna cache_key) + bytes no blob store
+Limite: LRU por bytes/entradas; a evicção só tira a linha do cache (o áudio continua na galeria)
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import unicodedata
+from typing import Any, Dict, Optional
+
+from database import db as database
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+TTS_CACHE_MAX_BYTES = int(os.environ.get('TTS_CACHE_MAX_BYTES', str(500 * 1024 * 1024)))
+TTS_CACHE_MAX_ENTRIES = int(os.environ.get('TTS_CACHE_MAX_ENTRIES', '10000'))
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_tts_text(text: str) -> str:
+    """NFC + collapsed whitespace: differences that don't change the spoken audio"""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def tts_cache_key(text: str, voice_id: str, model_id: str, output_format: str, settings: Dict[str, Any]) -> str:
+    """Content-addressed key of a synthesis request"""
+    settings_json = json.dumps(settings, sort_keys=True, separators=(',', ':'))
+    material = "\n".join((normalize_tts_text(text), voice_id, model_id, output_format, settings_json))
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class TtsCache:
+    """Cache persistente de TTS sobre audio_generations, com evicção LRU limitada por tamanho"""
+
+    def __init__(self, max_bytes: int = TTS_CACHE_MAX_BYTES, max_entries: int = TTS_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_cost = 0.0
+
+    async def get(self, cache_key: str, cost: float = 0.0) -> Optional[Dict[str, Any]]:
+        """Cached audio row {id, audio_url, duration, size} or None; `cost` is what a miss would pay"""
+        row = await database.get_cached_audio(cache_key)
+        if row:
+            self.hits += 1
+            self.saved_cost += cost
+            return row
+
+        self.misses += 1
+        return None
+
+    async def enforce_limits(self):
+        """Evict least-recently-used entries beyond the byte/entry limits (call after storing)"""
+        evicted = await database.evict_cached_audio(self.max_bytes, self.max_entries)
+        if evicted:
+            self.evictions += evicted
+            logger.info(f"🧹 TTS cache evicted {evicted} entries (LRU)")
+
+    async def invalidate(self, cache_key: Optional[str] = None) -> int:
+        """Drop one key (or everything) from the cache"""
+        removed = await database.uncache_audio(cache_key)
+        logger.info(f"🧹 TTS cache invalidated ({cache_key or 'all'}): {removed} entries")
+        return removed
+
+    async def stats(self) -> Dict[str, Any]:
+        usage = await database.get_cached_audio_usage()
+        lookups = self.hits + self.misses
+        return {
+            **usage,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_cost": round(self.saved_cost, 4)
+        }
+
+
+# Instância global
+tts_cache = TtsCache()
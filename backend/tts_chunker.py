@@ -0,0 +1,126 @@
+"""
+Chunked Text-to-Speech
+Narrações longas são divididas em partes (parágrafos > frases > palavras), sintetizadas
+em paralelo e unidas frame a frame, sem re-encode.
+
+- chamadas simultâneas limitadas pelos slots "elevenlabs" do provider_scheduler (dentro de synth)
+- cada parte é repetida sozinha (retry_policy "elevenlabs", dentro de synth): uma falha não refaz
+  (nem cobra de novo) as outras
+- previous_text/next_text: a ElevenLabs usa as partes vizinhas para manter a entonação
+"""
+
+import os
+import re
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+from mp3_frames import join_mp3
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+TTS_CHUNK_CHARS = int(os.environ.get('TTS_CHUNK_CHARS', '1000'))
+TTS_CONTEXT_CHARS = 300  # quanto das partes vizinhas vai em previous_text/next_text
+
+# synth(text, previous_text, next_text) -> bytes MP3
+SynthFn = Callable[[str, Optional[str], Optional[str]], Awaitable[bytes]]
+
+_PARAGRAPH_RE = re.compile(r'\n\s*\n')
+_SENTENCE_RE = re.compile(r'(?<=[.!?…;:])\s+')
+
+
+def _split_words(text: str, max_chars: int) -> List[str]:
+    pieces = []
+    current = ''
+    for word in text.split():
+        while len(word) > max_chars:  # "palavra" gigante (URL, etc): corte seco
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(word[:max_chars])
+            word = word[max_chars:]
+        if current and len(current) + 1 + len(word) <= max_chars:
+            current += ' ' + word
+        else:
+            if current:
+                pieces.append(current)
+            current = word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _split_paragraph(paragraph: str, max_chars: int) -> List[str]:
+    units = []
+    for sentence in _SENTENCE_RE.split(paragraph):
+        if len(sentence) <= max_chars:
+            units.append(sentence)
+        else:
+            units.extend(_split_words(sentence, max_chars))
+    return units
+
+
+def split_tts_text(text: str, max_chars: int = TTS_CHUNK_CHARS) -> List[str]:
+    """Split text into chunks of at most max_chars, preferring paragraph then sentence boundaries"""
+    chunks = []
+    current = ''
+    for paragraph in _PARAGRAPH_RE.split(text.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        units = [paragraph] if len(paragraph) <= max_chars else _split_paragraph(paragraph, max_chars)
+        for i, unit in enumerate(units):
+            separator = '\n\n' if i == 0 else ' '
+            if current and len(current) + len(separator) + len(unit) <= max_chars:
+                current += separator + unit
+            else:
+                if current:
+                    chunks.append(current)
+                current = unit
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class TtsChunker:
+    """Síntese paralela de narrações longas (o limite por conta fica com o provider_scheduler)"""
+
+    def __init__(self):
+        self.chunks_synthesized = 0
+
+    async def _synthesize_chunk(self, index: int, chunks: List[str], synth: SynthFn) -> bytes:
+        previous_text = chunks[index - 1][-TTS_CONTEXT_CHARS:] if index > 0 else None
+        next_text = chunks[index + 1][:TTS_CONTEXT_CHARS] if index + 1 < len(chunks) else None
+
+        audio = await synth(chunks[index], previous_text, next_text)
+        self.chunks_synthesized += 1
+        return audio
+
+    async def synthesize(self, text: str, synth: SynthFn, max_chars: int = TTS_CHUNK_CHARS) -> bytes:
+        """Synthesize text in parallel chunks and return one MP3 (chunks joined in order)"""
+        chunks = split_tts_text(text, max_chars) or [text]
+        if len(chunks) == 1:
+            return await self._synthesize_chunk(0, chunks, synth)
+
+        logger.info(f"🔊 Synthesizing {len(text)} chars in {len(chunks)} chunks")
+        tasks = [asyncio.ensure_future(self._synthesize_chunk(i, chunks, synth)) for i in range(len(chunks))]
+        try:
+            parts = await asyncio.gather(*tasks)
+        except BaseException:
+            # Uma parte falhou de vez (ou o request foi cancelado): não gasta créditos com o resto
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return join_mp3(parts)
+
+    def stats(self):
+        return {
+            "chunks_synthesized": self.chunks_synthesized
+        }
+
+
+# Instância global
+tts_chunker = TtsChunker()
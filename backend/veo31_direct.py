@@ -79,7 +79,8 @@ class Veo31DirectAPI:
         prompt: str,
         duration_seconds: int = 8,
         with_audio: bool = False,
-        aspect_ratio: str = "16:9"
+        aspect_ratio: str = "16:9",
+        image_bytes: Optional[bytes] = None
     ) -> dict:
         """
         Generate video from image using Veo 3.1
@@ -90,6 +91,7 @@ class Veo31DirectAPI:
             duration_seconds: Duração (2-8 segundos)
             with_audio: Se deve gerar áudio
             aspect_ratio: 16:9, 9:16, 1:1
+            image_bytes: Imagem já baixada (pelo pool HTTP async)
             
         Returns:
             {
@@ -111,7 +113,10 @@ class Veo31DirectAPI:
         payload = {
             "instances": [{
                 "image": {
-                    "bytesBase64Encoded": self._image_to_base64(image_url)
+                    "bytesBase64Encoded": (
+                        base64.b64encode(image_bytes).decode() if image_bytes is not None
+                        else self._image_to_base64(image_url)
+                    )
                 },
                 "prompt": prompt,
                 "parameters": {
@@ -145,7 +150,8 @@ class Veo31DirectAPI:
             return image_url.split(",")[1]
         else:
             # Download and encode
-            response = requests.get(image_url)
+            response = requests.get(image_url, timeout=30)
+            response.raise_for_status()
             return base64.b64encode(response.content).decode()
     
     def _calculate_cost(self, duration: int, with_audio: bool) -> float:
@@ -179,6 +185,12 @@ async def generate_video_veo31_direct(
     project_id = os.getenv("GOOGLE_CLOUD_PROJECT_ID")
     veo_client = Veo31DirectAPI(project_id=project_id)
     
+    # Baixa a imagem no pool HTTP compartilhado (keep-alive)
+    image_bytes = None
+    if not image_url.startswith("data:image"):
+        from image_upload import fetch_image_bytes
+        image_bytes = await fetch_image_bytes(image_url)
+    
     # Run in executor to avoid blocking
     loop = asyncio.get_event_loop()
     result = await loop.run_in_executor(
@@ -187,7 +199,9 @@ async def generate_video_veo31_direct(
         image_url,
         prompt,
         duration,
-        with_audio
+        with_audio,
+        "16:9",
+        image_bytes
     )
     
     return result
@@ -15,14 +15,19 @@ import os
 import time
 import base64
 import asyncio
+import logging
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Awaitable, Callable
 from PIL import Image
 import io
 
 from google import genai
 from google.genai import types
 
+from operation_poller import operation_poller
+
+logger = logging.getLogger(__name__)
+
 class Veo31GeminiGenerator:
     """Google Veo 3.1 video generator via Gemini API"""
     
@@ -238,6 +243,198 @@ class Veo31GeminiGenerator:
         
         return output_path
 
+    async def _generate_async(
+        self,
+        output_path: Optional[str] = None,
+        on_operation: Optional[Callable[[str], Awaitable[None]]] = None,
+        **request
+    ) -> str:
+        """
+        Start a generate_videos operation and wait for it on the shared poller
+        (nenhuma thread fica bloqueada em time.sleep durante os minutos de geração)
+        
+        Args:
+            output_path: Optional path to save the video
+            on_operation: Called with the operation name as soon as it starts (persistência)
+            **request: Arguments for client.aio.models.generate_videos
+            
+        Returns:
+            Path to the generated video file
+        """
+        # Depois de enviada, a criação não tem volta: a operação é criada (e cobrada) mesmo que o
+        # request seja cancelado. O shield deixa a chamada terminar para que on_operation registre a
+        # operação (persistida, ela é retomada no próximo startup) antes de o cancelamento seguir.
+        create = asyncio.ensure_future(self.client.aio.models.generate_videos(model=self.model, **request))
+        try:
+            operation = await asyncio.shield(create)
+        except asyncio.CancelledError:
+            while not create.done():
+                try:
+                    await asyncio.shield(create)
+                except asyncio.CancelledError:
+                    continue
+            if not create.cancelled() and create.exception() is None:
+                operation = create.result()
+                logger.warning(f"⏳ Operation {operation.name} started while the request was cancelled")
+                if on_operation:
+                    await on_operation(operation.name)
+            raise
+        print(f"⏳ Operation started: {operation.name}")
+        
+        if on_operation:
+            await on_operation(operation.name)
+        
+        return await self._wait_and_download(operation, output_path)
+    
+    async def resume_operation(
+        self,
+        operation_name: str,
+        output_path: Optional[str] = None,
+        initial_delay: Optional[float] = None
+    ) -> str:
+        """
+        Re-attach to an operation started before a restart and download its video
+        
+        Args:
+            operation_name: Name returned by generate_videos (e.g. models/.../operations/...)
+            output_path: Optional path to save the video
+            initial_delay: Seconds before the first poll (espalha a recuperação)
+            
+        Returns:
+            Path to the generated video file
+        """
+        print(f"🔁 Resuming Veo 3.1 operation: {operation_name}")
+        operation = types.GenerateVideosOperation(name=operation_name)
+        return await self._wait_and_download(operation, output_path, initial_delay)
+    
+    async def _wait_and_download(
+        self,
+        operation: types.GenerateVideosOperation,
+        output_path: Optional[str] = None,
+        initial_delay: Optional[float] = None
+    ) -> str:
+        """Wait on the shared poller, then download the first generated video"""
+        started = time.monotonic()
+        operation = await operation_poller.wait(
+            operation, self.client.aio.operations.get, initial_delay=initial_delay
+        )
+        logger.info(f"✅ Video generation complete! (Waited {time.monotonic() - started:.0f}s)")
+        
+        if operation.error:
+            raise RuntimeError(f"Veo 3.1 operation failed: {operation.error}")
+        if not operation.response or not operation.response.generated_videos:
+            raise RuntimeError("Veo 3.1 operation finished without videos (possibly filtered)")
+        
+        # Get generated video
+        generated_video = operation.response.generated_videos[0]
+        
+        # Determine output path
+        if not output_path:
+            timestamp = int(time.time())
+            output_path = f"veo31_video_{timestamp}.mp4"
+        
+        # Download video
+        logger.info(f"💾 Downloading video to: {output_path}")
+        await self.client.aio.files.download(file=generated_video.video)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, generated_video.video.save, output_path)
+        
+        logger.info(f"✅ Video saved successfully: {output_path}")
+        
+        return output_path
+    
+    async def generate_video_from_image_async(
+        self,
+        prompt: str,
+        image_path: str,
+        duration_seconds: int = 8,
+        resolution: str = "720p",
+        aspect_ratio: str = "16:9",
+        output_path: Optional[str] = None,
+        on_operation: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> str:
+        """
+        Non-blocking version of generate_video_from_image
+        
+        Args:
+            prompt: Text description of the video animation
+            image_path: Path to the input image
+            duration_seconds: Video duration (4, 6, or 8 seconds)
+            resolution: Video resolution ("720p" or "1080p")
+            aspect_ratio: Video aspect ratio ("16:9" or "9:16")
+            output_path: Optional path to save the video
+            on_operation: Called with the operation name as soon as it starts
+            
+        Returns:
+            Path to the generated video file
+        """
+        print(f"\n🎬 Veo 3.1 Gemini (async) - Image to Video: {prompt[:80]}")
+        
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(None, self._image_to_genai_format, image_path)
+        
+        return await self._generate_async(
+            output_path=output_path,
+            on_operation=on_operation,
+            prompt=prompt,
+            image=image,
+            config=types.GenerateVideosConfig(
+                duration_seconds=duration_seconds,
+                resolution=resolution,
+                aspect_ratio=aspect_ratio,
+                number_of_videos=1
+            )
+        )
+    
+    async def generate_video_text_only_async(
+        self,
+        prompt: str,
+        duration_seconds: int = 8,
+        resolution: str = "720p",
+        aspect_ratio: str = "16:9",
+        negative_prompt: Optional[str] = None,
+        output_path: Optional[str] = None
+    ) -> str:
+        """
+        Non-blocking version of generate_video_text_only
+        
+        Args:
+            prompt: Text description of the video
+            duration_seconds: Video duration (4, 6, or 8 seconds)
+            resolution: Video resolution ("720p" or "1080p")
+            aspect_ratio: Video aspect ratio ("16:9" or "9:16")
+            negative_prompt: Optional text describing what NOT to include
+            output_path: Optional path to save the video
+            
+        Returns:
+            Path to the generated video file
+        """
+        print(f"\n🎬 Veo 3.1 Gemini (async) - Text to Video: {prompt[:80]}")
+        
+        config = types.GenerateVideosConfig(
+            duration_seconds=duration_seconds,
+            resolution=resolution,
+            aspect_ratio=aspect_ratio,
+            number_of_videos=1
+        )
+        if negative_prompt:
+            config.negative_prompt = negative_prompt
+        
+        return await self._generate_async(output_path=output_path, prompt=prompt, config=config)
+
+
+# Gerador compartilhado: um único genai.Client (pool HTTP) para o processo inteiro
+_generator: Optional[Veo31GeminiGenerator] = None
+
+
+def get_generator() -> Veo31GeminiGenerator:
+    """Return the shared generator, rebuilding it only if GEMINI_KEY changed"""
+    global _generator
+    api_key = os.getenv("GEMINI_KEY")
+    if _generator is None or _generator.api_key != api_key:
+        _generator = Veo31GeminiGenerator(api_key)
+    return _generator
+
 
 # Async wrapper for server integration
 async def generate_video_veo31_gemini(
@@ -245,7 +442,8 @@ async def generate_video_veo31_gemini(
     image_path: str,
     duration_seconds: int = 8,
     resolution: str = "720p",
-    aspect_ratio: str = "16:9"
+    aspect_ratio: str = "16:9",
+    on_operation: Optional[Callable[[str], Awaitable[None]]] = None
 ) -> str:
     """
     Async wrapper for Veo 3.1 Gemini video generation
@@ -256,26 +454,39 @@ async def generate_video_veo31_gemini(
         duration_seconds: Video duration (4, 6, or 8 seconds)
         resolution: Video resolution ("720p" or "1080p")
         aspect_ratio: Video aspect ratio ("16:9" or "9:16")
+        on_operation: Called with the operation name as soon as it starts
         
     Returns:
         Path to the generated video file
     """
-    generator = Veo31GeminiGenerator()
+    generator = get_generator()
     
-    # Run in thread pool to avoid blocking
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(
-        None,
-        generator.generate_video_from_image,
-        prompt,
-        image_path,
-        duration_seconds,
-        resolution,
-        aspect_ratio,
-        None  # output_path
+    # Polling compartilhado (operation_poller) em vez de uma thread dormindo por vídeo
+    return await generator.generate_video_from_image_async(
+        prompt=prompt,
+        image_path=image_path,
+        duration_seconds=duration_seconds,
+        resolution=resolution,
+        aspect_ratio=aspect_ratio,
+        on_operation=on_operation
     )
 
 
+async def resume_video_veo31_gemini(operation_name: str, initial_delay: Optional[float] = None) -> str:
+    """
+    Async helper to finish an operation persisted before a restart
+    
+    Args:
+        operation_name: Persisted operation name
+        initial_delay: Seconds before the first poll
+        
+    Returns:
+        Path to the generated video file
+    """
+    generator = get_generator()
+    return await generator.resume_operation(operation_name, initial_delay=initial_delay)
+
+
 # Simple sync function for testing
 def generate_video_veo31_gemini_sync(
     prompt: str,
@@ -106,7 +106,8 @@ class Veo31DirectSimple:
         prompt: str,
         duration_seconds: int = 8,
         with_audio: bool = False,
-        aspect_ratio: str = "16:9"
+        aspect_ratio: str = "16:9",
+        image_bytes: Optional[bytes] = None
     ) -> Dict[str, Any]:
         """
         Generate video from image using Veo 3.1 via REST API
@@ -117,6 +118,7 @@ class Veo31DirectSimple:
             duration_seconds: Duração (2-8 segundos)
             with_audio: Se deve gerar áudio
             aspect_ratio: 16:9, 9:16, 1:1
+            image_bytes: Imagem já baixada (pelo pool HTTP async); evita o download síncrono
             
         Returns:
             {
@@ -135,7 +137,8 @@ class Veo31DirectSimple:
         
         try:
             # Carrega imagem e converte para base64
-            image_bytes = self._load_image_bytes(image_url)
+            if image_bytes is None:
+                image_bytes = self._load_image_bytes(image_url)
             image_b64 = base64.b64encode(image_bytes).decode('utf-8')
             
             # Endpoint da API
@@ -272,6 +275,12 @@ async def generate_video_veo31_direct(
     # Create client
     veo_client = Veo31DirectSimple(api_key=api_key)
     
+    # Baixa a imagem no pool HTTP compartilhado (keep-alive) em vez de requests na thread
+    image_bytes = None
+    if image_url.startswith(('http://', 'https://')):
+        from image_upload import fetch_image_bytes
+        image_bytes = await fetch_image_bytes(image_url)
+    
     # Run in executor (não bloqueia)
     loop = asyncio.get_event_loop()
     result = await loop.run_in_executor(
@@ -281,7 +290,8 @@ async def generate_video_veo31_direct(
         prompt,
         duration,
         with_audio,
-        aspect_ratio
+        aspect_ratio,
+        image_bytes
     )
     
     return result
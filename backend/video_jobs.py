@@ -0,0 +1,97 @@
+"""
+Video Job Queue - Background workers for video generation
+O endpoint grava o registro como 'pending' e retorna o video_id na hora;
+um pool de workers executa a chamada ao provider em segundo plano.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+VIDEO_JOB_WORKERS = int(os.environ.get('VIDEO_JOB_WORKERS', '32'))
+VIDEO_JOB_QUEUE_SIZE = int(os.environ.get('VIDEO_JOB_QUEUE_SIZE', '1000'))
+
+JobHandler = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when the job queue cannot accept more work"""
+
+
+class VideoJobQueue:
+    """Fila assíncrona de jobs de vídeo com pool de workers"""
+
+    def __init__(self, workers: int = VIDEO_JOB_WORKERS, max_size: int = VIDEO_JOB_QUEUE_SIZE):
+        self.workers = workers
+        self.max_size = max_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._handler: Optional[JobHandler] = None
+        self._active = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self, handler: JobHandler):
+        """Start the worker pool (must run inside the event loop)"""
+        if self.running:
+            return
+
+        self._handler = handler
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(n), name=f"video-job-worker-{n}")
+            for n in range(self.workers)
+        ]
+        logger.info(f"🎞️ Video job queue started ({self.workers} workers, max {self.max_size} jobs)")
+
+    async def stop(self):
+        """Cancel all workers"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("🎞️ Video job queue stopped")
+
+    def submit(self, job_id: str, payload: Dict[str, Any]):
+        """Enqueue a job without waiting"""
+        if not self.running:
+            raise RuntimeError("Video job queue is not running")
+
+        try:
+            self._queue.put_nowait((job_id, payload))
+        except asyncio.QueueFull:
+            raise JobQueueFullError("Fila de vídeos cheia. Tente novamente em alguns minutos.")
+
+    def stats(self) -> Dict[str, int]:
+        """Current queue depth and active workers"""
+        return {
+            "workers": len(self._tasks),
+            "active": self._active,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_size": self.max_size
+        }
+
+    async def _worker(self, n: int):
+        while True:
+            job_id, payload = await self._queue.get()
+            self._active += 1
+            try:
+                await self._handler(job_id, payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # O handler é responsável por marcar o job como 'failed'
+                logger.error(f"❌ Video job {job_id} crashed in worker {n}: {e}")
+            finally:
+                self._active -= 1
+                self._queue.task_done()
+
+
+# Instância global
+video_jobs = VideoJobQueue()
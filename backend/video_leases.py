@@ -0,0 +1,115 @@
+"""
+Video Leases - dono de cada registro de vídeo entre os workers do uvicorn
+Cada processo tem um owner (uuid) e um lease de VIDEO_LEASE_TTL segundos sobre os registros
+pending/processing que está executando; uma task renova os leases a cada VIDEO_LEASE_RENEW segundos
+e, na mesma volta, roda a varredura de recuperação.
+
+- a recuperação só age sobre um registro depois de reivindicá-lo com um UPDATE atômico
+  (sem dono ou lease vencido) - dois workers nunca retomam/reenfileiram o mesmo vídeo
+- o registro de um worker vivo nunca é tocado (o lease dele está sempre em dia)
+- worker que morre: os leases vencem em até VIDEO_LEASE_TTL segundos e a próxima varredura de
+  qualquer worker assume os registros; shutdown normal libera os leases na hora
+"""
+
+import os
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from database import db as database
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+VIDEO_LEASE_TTL = float(os.environ.get('VIDEO_LEASE_TTL', '90'))          # segundos
+VIDEO_LEASE_RENEW = float(os.environ.get('VIDEO_LEASE_RENEW', '20'))      # segundos entre renovações
+
+# sweep() -> varredura de recuperação (roda depois de cada renovação)
+SweepFn = Callable[[], Awaitable[None]]
+
+
+def _iso(moment: datetime) -> str:
+    return moment.isoformat()
+
+
+class VideoLeases:
+    """Leases dos registros de vídeo deste processo + varredura periódica de recuperação"""
+
+    def __init__(self, ttl: float = VIDEO_LEASE_TTL, renew_interval: float = VIDEO_LEASE_RENEW):
+        self.owner = uuid.uuid4().hex
+        self.ttl = ttl
+        self.renew_interval = min(renew_interval, ttl / 3)
+        self._task: Optional[asyncio.Task] = None
+        self._sweep: Optional[SweepFn] = None
+        self.claimed = 0
+        self.lost_races = 0
+        self.renewals = 0
+
+    def lease_until(self) -> str:
+        """Expiry for a lease taken now (ISO, UTC)"""
+        return _iso(datetime.now(timezone.utc) + timedelta(seconds=self.ttl))
+
+    async def claim(self, video_id: str, status: str) -> bool:
+        """Take an unfinished row whose owner is gone; False if another live worker has it"""
+        claimed = await database.claim_video_generation(
+            video_id, status, self.owner, self.lease_until(), _iso(datetime.now(timezone.utc))
+        )
+        if claimed:
+            self.claimed += 1
+        else:
+            self.lost_races += 1
+        return claimed
+
+    async def unowned(self) -> List[Dict[str, Any]]:
+        """Unfinished rows without a live owner (candidates for claim())"""
+        return await database.get_unfinished_video_generations(now=_iso(datetime.now(timezone.utc)))
+
+    async def start(self, sweep: SweepFn):
+        """Start renewing this worker's leases and sweeping for orphaned rows (first sweep runs now)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._sweep = sweep
+        self._task = asyncio.create_task(self._run(), name="video-leases")
+        logger.info(f"🔏 Video leases started (owner {self.owner[:8]}, ttl {self.ttl:g}s)")
+
+    async def stop(self):
+        """Stop the renewal task and release this worker's leases"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            released = await database.release_video_leases(self.owner)
+            if released:
+                logger.info(f"🔏 Released {released} video lease(s) for the next worker")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not release video leases: {e}")
+
+    async def _run(self):
+        while True:
+            try:
+                await database.renew_video_leases(self.owner, self.lease_until())
+                self.renewals += 1
+                await self._sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Video lease renewal/recovery failed: {e}")
+            await asyncio.sleep(self.renew_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "owner": self.owner,
+            "ttl_seconds": self.ttl,
+            "renew_seconds": self.renew_interval,
+            "claimed": self.claimed,
+            "lost_races": self.lost_races,
+            "renewals": self.renewals,
+            "running": bool(self._task and not self._task.done())
+        }
+
+
+# Instância global
+video_leases = VideoLeases()
@@ -6,10 +6,14 @@ Suporta múltiplos providers: FAL.AI, Google Veo Direct, etc.
 import os
 import asyncio
 import logging
-from typing import Literal, Optional, Dict, Any
+from typing import Literal, Optional, Dict, Any, Awaitable, Callable
 from enum import Enum
 from pathlib import Path
 
+from circuit_breaker import provider_breakers
+from retry_policy import retry_policies, is_retryable
+from operation_poller import OperationTimeoutError
+
 # Load .env if exists
 try:
     from dotenv import load_dotenv
@@ -61,13 +65,27 @@ class VideoGenerationResult:
 
 
 class VideoProviderManager:
-    """Gerencia múltiplos providers de geração de vídeo"""
+    """Gerencia múltiplos providers de geração de vídeo (instância única: video_manager)"""
     
     def __init__(self):
         self.fal_available = self._check_fal()
         self.google_gemini_available = self._check_google_gemini()
         self.google_vertex_available = self._check_google_vertex()
         
+        # Estado de prontidão por provider (atualizado por warm_up, lido sem custo)
+        self.readiness: Dict[str, Dict[str, Any]] = {
+            VideoProvider.FAL_VEO3.value: self._readiness("configured" if self.fal_available else "not_configured"),
+            VideoProvider.FAL_SORA2.value: self._readiness("configured" if self.fal_available else "not_configured"),
+            VideoProvider.FAL_WAV2LIP.value: self._readiness("configured" if self.fal_available else "not_configured"),
+            VideoProvider.GOOGLE_VEO31_GEMINI.value: self._readiness(
+                "configured" if self.google_gemini_available else "not_configured"
+            ),
+            VideoProvider.GOOGLE_VEO3_DIRECT.value: self._readiness(
+                "unavailable" if self.google_vertex_available else "not_configured",
+                "Modelo ainda não liberado publicamente" if self.google_vertex_available else None
+            )
+        }
+        
         logger.info(f"🎬 Video Providers Disponíveis:")
         logger.info(f"  - FAL.AI: {'✅' if self.fal_available else '❌'}")
         logger.info(f"  - Google Veo 3.1 (Gemini API): {'✅' if self.google_gemini_available else '❌'}")
@@ -118,6 +136,35 @@ class VideoProviderManager:
         logger.warning("   Configure GOOGLE_VERTEX_API_KEY ou (GOOGLE_CLOUD_PROJECT_ID + GOOGLE_APPLICATION_CREDENTIALS)")
         return False
     
+    @staticmethod
+    def _readiness(status: str, error: Optional[str] = None) -> Dict[str, Any]:
+        return {"status": status, "error": error}
+    
+    async def warm_up(self):
+        """Cria os clientes de SDK de longa duração uma única vez (startup)"""
+        loop = asyncio.get_running_loop()
+        
+        if self.google_gemini_available:
+            try:
+                from veo31_gemini import get_generator
+                await loop.run_in_executor(None, get_generator)
+                self.readiness[VideoProvider.GOOGLE_VEO31_GEMINI.value] = self._readiness("ready")
+            except Exception as e:
+                logger.error(f"❌ Google Veo 3.1 (Gemini API) warm-up failed: {e}")
+                self.readiness[VideoProvider.GOOGLE_VEO31_GEMINI.value] = self._readiness("error", str(e))
+        
+        if self.fal_available:
+            # fal_client usa FAL_KEY do ambiente; o import é o único custo
+            for provider in (VideoProvider.FAL_VEO3, VideoProvider.FAL_SORA2, VideoProvider.FAL_WAV2LIP):
+                self.readiness[provider.value] = self._readiness("ready")
+        
+        ready = [name for name, state in self.readiness.items() if state["status"] == "ready"]
+        logger.info(f"🎬 Video providers warmed up: {', '.join(ready) or 'nenhum'}")
+    
+    def get_readiness(self) -> Dict[str, Dict[str, Any]]:
+        """Estado de prontidão de cada provider (sem I/O)"""
+        return {name: dict(state) for name, state in self.readiness.items()}
+    
     def get_available_providers(self) -> Dict[str, bool]:
         """Retorna lista de providers disponíveis"""
         return {
@@ -135,7 +182,8 @@ class VideoProviderManager:
         prompt: str,
         duration: int = 8,
         with_audio: bool = False,
-        aspect_ratio: str = "16:9"
+        aspect_ratio: str = "16:9",
+        on_operation: Optional[Callable[[str], Awaitable[None]]] = None
     ) -> VideoGenerationResult:
         """
         Gera vídeo usando o provider especificado
@@ -147,22 +195,58 @@ class VideoProviderManager:
             duration: Duração em segundos
             with_audio: Se deve gerar áudio
             aspect_ratio: Proporção (16:9, 9:16, etc)
+            on_operation: Recebe o id da operação/request assim que o provider aceita o job
+                (Gemini: permite retomar após restart; FAL: request_id da fila)
         
         Returns:
             VideoGenerationResult com video_url e custos
         """
         
         if provider in [VideoProvider.FAL_VEO3, VideoProvider.FAL_SORA2, VideoProvider.FAL_WAV2LIP]:
-            return await self._generate_via_fal(provider, image_url, prompt, duration, with_audio)
+            async def generate(accepted):
+                return await self._generate_via_fal(provider, image_url, prompt, duration, with_audio, accepted)
+            
+            async def resume(request_id):
+                return await self._generate_via_fal(provider, image_url, prompt, duration, with_audio, request_id=request_id)
         
         elif provider == VideoProvider.GOOGLE_VEO31_GEMINI:
-            return await self._generate_via_google_gemini(image_url, prompt, duration, with_audio, aspect_ratio)
+            async def generate(accepted):
+                return await self._generate_via_google_gemini(image_url, prompt, duration, with_audio, aspect_ratio, accepted)
+            
+            async def resume(operation_name):
+                return await self.resume_google_gemini(operation_name, duration, initial_delay=0)
         
         elif provider == VideoProvider.GOOGLE_VEO3_DIRECT:
-            return await self._generate_via_google_vertex(image_url, prompt, duration, with_audio, aspect_ratio)
+            async def generate(accepted):
+                return await self._generate_via_google_vertex(image_url, prompt, duration, with_audio, aspect_ratio)
+            
+            resume = None
         
         else:
             raise ValueError(f"Provider não suportado: {provider}")
+        
+        operation: Dict[str, str] = {}
+        
+        async def track(operation_name: str):
+            operation["name"] = operation_name
+            if on_operation:
+                await on_operation(operation_name)
+        
+        async def attempt():
+            if "name" in operation:
+                # Job já aceito (e cobrado): retoma a mesma operação/request_id - nunca reenvia
+                return await provider_breakers.call(provider.value, lambda _: resume(operation["name"]))
+            return await provider_breakers.call(provider.value, generate, track)
+        
+        def retryable(error: BaseException) -> bool:
+            if "name" in operation and resume is None:
+                return False
+            # Prazo de polling esgotado é definitivo (o poller já insistiu até o deadline)
+            return not isinstance(error, OperationTimeoutError) and is_retryable(error)
+        
+        # Circuit breaker: provider com 5xx/timeouts seguidos falha na hora (CircuitOpenError);
+        # falhas transitórias isoladas (502/503/timeout) ganham nova tentativa dentro do deadline
+        return await retry_policies.get("video").run(attempt, retryable=retryable, label=provider.value)
     
     async def _generate_via_fal(
         self,
@@ -170,9 +254,11 @@ class VideoProviderManager:
         image_url: str,
         prompt: str,
         duration: int,
-        with_audio: bool
+        with_audio: bool,
+        on_operation: Optional[Callable[[str], Awaitable[None]]] = None,
+        request_id: Optional[str] = None
     ) -> VideoGenerationResult:
-        """Gera vídeo via FAL.AI"""
+        """Gera vídeo via FAL.AI (request_id: aguarda um job já enfileirado em vez de submeter outro)"""
         
         if not self.fal_available:
             raise RuntimeError("FAL.AI não está disponível. Verifique FAL_KEY.")
@@ -198,15 +284,31 @@ class VideoProviderManager:
         if provider == VideoProvider.FAL_VEO3:
             args["duration"] = f"{duration}s"
         
-        logger.info(f"🎬 Gerando vídeo via FAL.AI ({provider}): {prompt[:50]}...")
-        
-        # Submete job
-        handler = fal_client.submit(endpoint, arguments=args)
+        if request_id:
+            logger.info(f"🔁 Retomando job FAL.AI {request_id} ({provider})")
+            # fal_client 0.8.x: get_handle é síncrono (só monta as URLs da fila), não faz request
+            handler = fal_client.async_client.get_handle(endpoint, request_id)
+        else:
+            logger.info(f"🎬 Gerando vídeo via FAL.AI ({provider}): {prompt[:50]}...")
+            
+            # Submete job (cliente async: o event loop não bloqueia no submit nem no polling)
+            handler = await fal_client.submit_async(endpoint, arguments=args)
         
-        # Aguarda resultado (async)
-        result = await asyncio.get_event_loop().run_in_executor(
-            None, handler.get
-        )
+        try:
+            if on_operation and not request_id:
+                await on_operation(handler.request_id)
+            
+            # Aguarda resultado
+            result = await handler.get()
+        except asyncio.CancelledError:
+            # Request cancelado (ex.: perdeu o hedge): cancela o job na fila da FAL para não pagar por ele
+            cancel = getattr(handler, 'cancel', None)
+            if cancel:
+                try:
+                    await cancel()
+                except Exception as e:
+                    logger.warning(f"⚠️ FAL cancel failed for {handler.request_id}: {e}")
+            raise
         
         video_url = result.get('video', {}).get('url')
         
@@ -240,7 +342,8 @@ class VideoProviderManager:
         prompt: str,
         duration: int,
         with_audio: bool,
-        aspect_ratio: str
+        aspect_ratio: str,
+        on_operation: Optional[Callable[[str], Awaitable[None]]] = None
     ) -> VideoGenerationResult:
         """Gera vídeo via Google Veo 3.1 (Gemini API) - 62% mais barato"""
         
@@ -256,15 +359,14 @@ class VideoProviderManager:
         
         # Download image locally (Gemini API requires local file)
         import tempfile
-        import requests
+        from image_upload import fetch_image_bytes
         
-        # Download image
-        response = requests.get(image_url)
-        response.raise_for_status()
+        # Download image (pool HTTP compartilhado; uploads próprios vêm direto do blob store)
+        image_bytes = await fetch_image_bytes(image_url)
         
         # Save to temp file
         with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-            tmp_file.write(response.content)
+            tmp_file.write(image_bytes)
             temp_image_path = tmp_file.name
         
         try:
@@ -274,28 +376,11 @@ class VideoProviderManager:
                 image_path=temp_image_path,
                 duration_seconds=duration,
                 resolution="720p",
-                aspect_ratio=aspect_ratio
+                aspect_ratio=aspect_ratio,
+                on_operation=on_operation
             )
             
-            # Upload video to get URL (você pode usar Cloudinary ou outro serviço)
-            # Por enquanto, retorna path local
-            video_url = f"file://{video_path}"
-            
-            # Calcula custo (Gemini API é 62% mais barato que FAL.AI)
-            # FAL.AI: $0.20/sec sem áudio, $0.40/sec com áudio
-            # Gemini: $0.076/sec (fixo, com áudio nativo)
-            cost = duration * 0.076
-            
-            logger.info(f"✅ Vídeo gerado via Gemini! Custo: ${cost:.2f} (62% economia)")
-            
-            return VideoGenerationResult(
-                video_url=video_url,
-                provider="google_veo31_gemini",
-                duration=duration,
-                cost=cost,
-                with_audio=True,  # Veo 3.1 sempre gera com áudio
-                status="success"
-            )
+            return self._google_gemini_result(video_path, duration)
         
         finally:
             # Clean up temp file
@@ -303,6 +388,66 @@ class VideoProviderManager:
             if os.path.exists(temp_image_path):
                 os.unlink(temp_image_path)
     
+    async def resume_google_gemini(
+        self,
+        operation_name: str,
+        duration: int,
+        initial_delay: Optional[float] = None
+    ) -> VideoGenerationResult:
+        """Retoma uma operação Veo 3.1 (Gemini API) iniciada antes de um restart"""
+        
+        if not self.google_gemini_available:
+            raise RuntimeError("Google Veo 3.1 (Gemini API) não está disponível. Configure GEMINI_KEY.")
+        
+        from veo31_gemini import resume_video_veo31_gemini
+        
+        video_path = await resume_video_veo31_gemini(operation_name, initial_delay=initial_delay)
+        return self._google_gemini_result(video_path, duration)
+    
+    async def resume_video(
+        self,
+        provider: VideoProvider,
+        operation_name: str,
+        image_url: str,
+        prompt: str,
+        duration: int,
+        with_audio: bool = False,
+        initial_delay: Optional[float] = None
+    ) -> VideoGenerationResult:
+        """Retoma um job já aceito (e cobrado) antes de um restart: operação Gemini ou request_id da FAL"""
+        
+        if provider == VideoProvider.GOOGLE_VEO31_GEMINI:
+            return await self.resume_google_gemini(operation_name, duration, initial_delay=initial_delay)
+        if provider in (VideoProvider.FAL_VEO3, VideoProvider.FAL_SORA2, VideoProvider.FAL_WAV2LIP):
+            if initial_delay:
+                await asyncio.sleep(initial_delay)
+            return await self._generate_via_fal(
+                provider, image_url, prompt, duration, with_audio, request_id=operation_name
+            )
+        raise ValueError(f"Provider não permite retomar jobs: {provider}")
+    
+    def _google_gemini_result(self, video_path: str, duration: int) -> VideoGenerationResult:
+        """Resultado + custo de um vídeo Veo 3.1 (Gemini API) salvo localmente"""
+        # Upload video to get URL (você pode usar Cloudinary ou outro serviço)
+        # Por enquanto, retorna path local
+        video_url = f"file://{video_path}"
+        
+        # Calcula custo (Gemini API é 62% mais barato que FAL.AI)
+        # FAL.AI: $0.20/sec sem áudio, $0.40/sec com áudio
+        # Gemini: $0.076/sec (fixo, com áudio nativo)
+        cost = duration * 0.076
+        
+        logger.info(f"✅ Vídeo gerado via Gemini! Custo: ${cost:.2f} (62% economia)")
+        
+        return VideoGenerationResult(
+            video_url=video_url,
+            provider="google_veo31_gemini",
+            duration=duration,
+            cost=cost,
+            with_audio=True,  # Veo 3.1 sempre gera com áudio
+            status="success"
+        )
+    
     async def _generate_via_google_vertex(
         self,
         image_url: str,
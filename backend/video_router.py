@@ -0,0 +1,310 @@
+"""
+Video Router - roteamento automático do Veo 3.1 por custo e latência (provider="auto")
+Mantém estatísticas móveis de latência e erros por VideoProvider e escolhe o provider mais barato
+que cumpre o SLO de latência; com hedge, se o primário não aceitar o job em VIDEO_HEDGE_AFTER
+segundos, o próximo da lista é disparado e quem aceitar primeiro fica - o outro é cancelado.
+
+- "aceitar" = operação criada (Gemini) / request entrou na fila (FAL)
+- só a FAL cancela um job já aceito (enquanto ele está na fila); uma operação Veo criada no Gemini
+  não tem cancelamento e é cobrada de qualquer jeito. Por isso o Gemini nunca é alvo de hedge, e um
+  primário Gemini que já está submetendo (tem o slot) não é cancelado quando o hedge aceita antes:
+  se ele aceitar também, assume a corrida (o job da FAL é que é cancelado) em vez de ser abandonado
+- o hedge pode custar em dobro quando o job da FAL já saiu da fila; no caso comum o primário aceita
+  rápido e só ele roda
+- erro, fila cheia no scheduler ou circuit breaker aberto => failover imediato para o próximo provider
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from video_providers import VideoGenerationResult, VideoProvider, video_manager
+from provider_scheduler import provider_scheduler, ProviderBusyError
+from circuit_breaker import provider_breakers, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+VIDEO_ROUTER_SLO = float(os.environ.get('VIDEO_ROUTER_SLO', '240'))                  # p95 de latência total (s)
+VIDEO_ROUTER_MAX_ERROR_RATE = float(os.environ.get('VIDEO_ROUTER_MAX_ERROR_RATE', '0.3'))
+VIDEO_ROUTER_MIN_SAMPLES = int(os.environ.get('VIDEO_ROUTER_MIN_SAMPLES', '5'))      # abaixo disso: assume que cumpre
+VIDEO_ROUTER_WINDOW = float(os.environ.get('VIDEO_ROUTER_WINDOW', '1800'))          # segundos de histórico
+VIDEO_HEDGE_AFTER = float(os.environ.get('VIDEO_HEDGE_AFTER', '20'))                 # 0 = sem hedge
+VIDEO_ROUTER_MAX_SAMPLES = 100
+
+# Candidatos para veo3 (Vertex fica de fora: modelo não liberado)
+VEO_PROVIDERS = (VideoProvider.GOOGLE_VEO31_GEMINI, VideoProvider.FAL_VEO3)
+
+# Providers cujo job aceito ainda pode ser cancelado (fila da FAL): os únicos alvos de hedge
+HEDGE_TARGETS = frozenset({VideoProvider.FAL_VEO3})
+
+# on_operation(provider, operation_name): só o provider vencedor é repassado
+OperationFn = Callable[[VideoProvider, str], Awaitable[None]]
+
+
+def scheduler_name(provider: VideoProvider) -> str:
+    """provider_scheduler limiter that serves a VideoProvider"""
+    return "fal" if provider.value.startswith("fal_") else "google_veo"
+
+
+class _ProviderWindow:
+    """Amostras recentes (instante, latência de aceite, latência total, sucesso) de um provider"""
+
+    def __init__(self):
+        self.samples: Deque[Tuple[float, Optional[float], Optional[float], bool]] = deque(maxlen=VIDEO_ROUTER_MAX_SAMPLES)
+        self.hedged_out = 0
+
+    def add(self, accept: Optional[float], total: Optional[float], ok: bool):
+        self.samples.append((time.monotonic(), accept, total, ok))
+
+    def _recent(self):
+        cutoff = time.monotonic() - VIDEO_ROUTER_WINDOW
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+        return self.samples
+
+    def summary(self) -> Dict[str, Any]:
+        samples = self._recent()
+        totals = sorted(total for _, _, total, ok in samples if ok and total is not None)
+        accepts = sorted(accept for _, accept, _, _ in samples if accept is not None)
+        errors = sum(1 for *_, ok in samples if not ok)
+        return {
+            "samples": len(samples),
+            "error_rate": round(errors / len(samples), 3) if samples else 0.0,
+            "p95_latency": round(totals[int(len(totals) * 0.95)], 1) if totals else None,
+            "p50_accept_latency": round(accepts[len(accepts) // 2], 2) if accepts else None,
+            "hedged_out": self.hedged_out
+        }
+
+
+class _Race:
+    """Estado de uma geração roteada: quem aceitou primeiro vence, os outros são cancelados"""
+
+    def __init__(self, on_operation: Optional[OperationFn]):
+        self.on_operation = on_operation
+        self.winner: Optional[VideoProvider] = None
+        self.tasks: Dict[asyncio.Task, VideoProvider] = {}
+        self.submitting: Set[VideoProvider] = set()  # com slot, criação em andamento, ainda sem aceite
+        self.finished = False
+
+    def cancel_others(self, keep: VideoProvider):
+        for task, provider in self.tasks.items():
+            if provider == keep or task.done():
+                continue
+            if provider not in HEDGE_TARGETS and provider in self.submitting:
+                # A criação em andamento não pode ser desfeita: deixa terminar (aceite => assume a corrida)
+                logger.info(f"🧭 Keeping {provider.value}: its create request is already in flight")
+                continue
+            task.cancel()
+
+
+class VideoRouter:
+    """Escolhe e executa o provider Veo 3.1 (provider='auto')"""
+
+    def __init__(
+        self,
+        slo: float = VIDEO_ROUTER_SLO,
+        max_error_rate: float = VIDEO_ROUTER_MAX_ERROR_RATE,
+        hedge_after: float = VIDEO_HEDGE_AFTER
+    ):
+        self.slo = slo
+        self.max_error_rate = max_error_rate
+        self.hedge_after = hedge_after
+        self._windows: Dict[VideoProvider, _ProviderWindow] = {p: _ProviderWindow() for p in VEO_PROVIDERS}
+        self.routed = 0
+        self.hedges = 0
+        self.takeovers = 0
+        self.failovers = 0
+
+    def _meets_slo(self, provider: VideoProvider) -> bool:
+        summary = self._windows[provider].summary()
+        if summary["samples"] < VIDEO_ROUTER_MIN_SAMPLES:
+            return True  # pouco histórico: dá a chance (recupera um provider depois da janela)
+        if summary["error_rate"] > self.max_error_rate:
+            return False
+        return summary["p95_latency"] is None or summary["p95_latency"] <= self.slo
+
+    def rank(self, duration: int, with_audio: bool = False) -> List[VideoProvider]:
+        """Available Veo providers: cheapest within the SLO first, then the rest by p95 latency
+
+        Providers com circuit breaker aberto vão para o fim (só como último recurso).
+        """
+        available = video_manager.get_available_providers()
+        candidates = [p for p in VEO_PROVIDERS if available.get(p)]
+
+        def cost(provider):
+            return video_manager.estimate_cost(provider, duration, with_audio)
+
+        def latency(provider):
+            p95 = self._windows[provider].summary()["p95_latency"]
+            return p95 if p95 is not None else 0.0
+
+        within = sorted((p for p in candidates if self._meets_slo(p)), key=cost)
+        outside = sorted((p for p in candidates if not self._meets_slo(p)), key=latency)
+        ranked = within + outside
+        return sorted(ranked, key=lambda p: provider_breakers.is_open(p.value))
+
+    async def _attempt(
+        self,
+        race: _Race,
+        provider: VideoProvider,
+        shed: bool,
+        lane: str,
+        image_url: str,
+        prompt: str,
+        duration: int
+    ) -> VideoGenerationResult:
+        provider_breakers.check(provider.value)  # aberto: nem entra na fila do scheduler
+        # Slot só até o aceite: o polling do job aceito não ocupa vaga do scheduler
+        lease = await provider_scheduler.acquire(scheduler_name(provider), lane, shed=shed)
+        race.submitting.add(provider)
+        try:
+            start = time.monotonic()
+            accepted: Dict[str, float] = {}
+
+            async def on_operation(operation_name: str):
+                accepted["at"] = time.monotonic() - start
+                lease.release()
+                race.submitting.discard(provider)
+                if race.finished:
+                    # A corrida já terminou (resultado entregue ou request cancelado): nada a assumir
+                    logger.warning(f"🧭 {provider.value} accepted {operation_name} after the race finished")
+                elif race.winner is None:
+                    race.winner = provider
+                    race.cancel_others(provider)
+                    logger.info(f"🧭 {provider.value} accepted the job in {accepted['at']:.1f}s")
+                    if race.on_operation:
+                        await race.on_operation(provider, operation_name)
+                elif race.winner != provider:
+                    if provider in HEDGE_TARGETS:
+                        # Aceitou depois do vencedor: aborta (a FAL cancela o job na fila)
+                        raise asyncio.CancelledError()
+                    # Operação sem cancelamento já criada (e cobrada): fica com ela e cancela a outra
+                    logger.warning(f"🧭 {provider.value} accepted after {race.winner.value} - taking over (can't be cancelled)")
+                    race.winner = provider
+                    race.cancel_others(provider)
+                    self.takeovers += 1
+                    if race.on_operation:
+                        await race.on_operation(provider, operation_name)
+
+            try:
+                result = await video_manager.generate_video(
+                    provider=provider,
+                    image_url=image_url,
+                    prompt=prompt,
+                    duration=duration,
+                    on_operation=on_operation
+                )
+            except CircuitOpenError:
+                raise  # não chegou ao provider: não é amostra
+            except asyncio.CancelledError:
+                if "at" not in accepted:
+                    self._windows[provider].hedged_out += 1
+                    # Não aceitou a tempo: conta como lentidão para as próximas escolhas
+                    self._windows[provider].add(None, None, False)
+                raise
+            except Exception:
+                self._windows[provider].add(accepted.get("at"), None, False)
+                raise
+
+            self._windows[provider].add(accepted.get("at"), time.monotonic() - start, True)
+            return result
+        finally:
+            race.submitting.discard(provider)
+            lease.release()
+
+    async def generate(
+        self,
+        image_url: str,
+        prompt: str,
+        duration: int,
+        with_audio: bool = False,
+        lane: str = "premium",
+        shed: bool = True,
+        on_operation: Optional[OperationFn] = None
+    ) -> VideoGenerationResult:
+        """Generate with the best provider, hedging and failing over down the ranked list"""
+        pending = self.rank(duration, with_audio)
+        if not pending:
+            raise RuntimeError("Nenhum provider Veo 3.1 disponível (configure GEMINI_KEY ou FAL_KEY)")
+
+        self.routed += 1
+        logger.info(f"🧭 Auto routing Veo 3.1: {' > '.join(p.value for p in pending)}")
+        race = _Race(on_operation)
+        errors: List[BaseException] = []
+
+        def launch():
+            provider = pending.pop(0)
+            task = asyncio.ensure_future(
+                self._attempt(race, provider, shed, lane, image_url, prompt, duration)
+            )
+            race.tasks[task] = provider
+
+        launch()
+        try:
+            while True:
+                hedge = (
+                    self.hedge_after > 0 and race.winner is None
+                    and bool(pending) and pending[0] in HEDGE_TARGETS
+                )
+                running = [task for task in race.tasks if not task.done()]
+                done, _ = await asyncio.wait(
+                    running, timeout=self.hedge_after if hedge else None, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    if hedge and race.winner is None:
+                        self.hedges += 1
+                        logger.warning(f"⏱️ No provider accepted within {self.hedge_after:g}s - hedging with {pending[0].value}")
+                        launch()
+                    continue
+
+                for task in done:
+                    provider = race.tasks[task]
+                    if task.cancelled():
+                        continue
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(task.exception())
+                    logger.warning(f"⚠️ {provider.value} failed: {task.exception()}")
+                    if race.winner == provider:
+                        race.winner = None
+
+                if not any(not task.done() for task in race.tasks):
+                    if not pending:
+                        break
+                    self.failovers += 1
+                    logger.info(f"🔀 Failing over to {pending[0].value}")
+                    launch()
+        finally:
+            race.finished = True
+            for task in race.tasks:
+                task.cancel()
+            await asyncio.gather(*race.tasks, return_exceptions=True)
+
+        # Todos falharam: fila cheia/circuito aberto em todos => 429/503; senão, o último erro real
+        real_errors = [e for e in errors if not isinstance(e, (ProviderBusyError, CircuitOpenError))]
+        raise (real_errors or errors)[-1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "slo_seconds": self.slo,
+            "max_error_rate": self.max_error_rate,
+            "hedge_after_seconds": self.hedge_after,
+            "routed": self.routed,
+            "hedges": self.hedges,
+            "takeovers": self.takeovers,
+            "failovers": self.failovers,
+            "ranking": [p.value for p in self.rank(8)],
+            "providers": {
+                p.value: {**self._windows[p].summary(), "circuit": provider_breakers.get(p.value).stats()["state"]}
+                for p in VEO_PROVIDERS
+            }
+        }
+
+
+# Instância global
+video_router = VideoRouter()
@@ -0,0 +1,183 @@
+"""
+ElevenLabs Voice Catalogue
+Lista de vozes em memória: carregada no startup e renovada com stale-while-revalidate.
+
+- leitura nunca espera a ElevenLabs (exceto a primeira carga, se o startup falhou)
+- ao passar do TTL, a próxima leitura dispara um refresh em background e recebe a lista atual
+- filtros por categoria/label/idioma no servidor, com o JSON de cada filtro pré-renderizado
+- ETag = hash do catálogo: o navegador revalida com If-None-Match e recebe 304
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Configuração via .env
+VOICE_CATALOG_TTL = float(os.environ.get('VOICE_CATALOG_TTL', '3600'))          # segundos
+VOICE_CATALOG_RETRY = float(os.environ.get('VOICE_CATALOG_RETRY', '60'))        # segundos após falha
+VOICE_CATALOG_MAX_FILTERS = 64  # respostas filtradas guardadas por versão do catálogo
+
+# fetch() -> resposta de voices.get_all()
+FetchFn = Callable[[], Awaitable[Any]]
+
+
+def _voice_to_dict(voice) -> Dict[str, Any]:
+    languages = [lang.language for lang in (getattr(voice, 'verified_languages', None) or []) if lang.language]
+    return {
+        "voice_id": voice.voice_id,
+        "name": voice.name,
+        "category": getattr(voice, 'category', None) or "general",
+        "labels": getattr(voice, 'labels', None) or {},
+        "languages": sorted(set(languages)),
+        "preview_url": getattr(voice, 'preview_url', None)
+    }
+
+
+def _parse_labels(labels: Optional[Iterable[str]]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    """['age:child', 'age:young', 'pt'] -> (('', ('pt',)), ('age', ('child', 'young')))"""
+    grouped: Dict[str, set] = {}
+    for item in labels or ():
+        key, _, value = item.lower().partition(':') if ':' in item else ('', '', item.lower())
+        if value:
+            grouped.setdefault(key.strip(), set()).add(value.strip())
+    return tuple(sorted((key, tuple(sorted(values))) for key, values in grouped.items()))
+
+
+class VoiceCatalog:
+    """Cache stale-while-revalidate das vozes da conta ElevenLabs"""
+
+    def __init__(self, ttl: float = VOICE_CATALOG_TTL, retry_after: float = VOICE_CATALOG_RETRY):
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._fetch: Optional[FetchFn] = None
+        self._voices: Optional[List[Dict[str, Any]]] = None
+        self._search: List[Tuple[str, Dict[str, str], set]] = []
+        self._rendered: Dict[Any, bytes] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._next_refresh = 0.0
+        self.etag: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    async def start(self, fetch: FetchFn):
+        """Load the catalogue at startup; a failure is logged and retried on the next read"""
+        self._fetch = fetch
+        try:
+            await self.refresh()
+        except Exception:
+            pass  # já logado; a primeira leitura tenta de novo
+
+    async def refresh(self):
+        """Fetch the voice list now and swap it in atomically"""
+        try:
+            response = await self._fetch()
+            voices = [_voice_to_dict(voice) for voice in response.voices]
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            self._next_refresh = time.monotonic() + self.retry_after
+            logger.warning(f"⚠️ Voice catalogue refresh failed ({e}); "
+                           f"{'serving stale list' if self._voices is not None else 'no list yet'}")
+            raise
+
+        body = json.dumps(voices, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self._search = [
+            (
+                (voice['category'] or '').lower(),
+                {str(k).lower(): str(v).lower() for k, v in voice['labels'].items()},
+                set(voice['languages'])
+            )
+            for voice in voices
+        ]
+        self._voices = voices
+        self._rendered = {}
+        self.loaded_at = time.time()
+        self._next_refresh = time.monotonic() + self.ttl
+        self.refreshes += 1
+        self.last_error = None
+        logger.info(f"🎙️ Voice catalogue loaded: {len(voices)} voices")
+
+    def _refresh_in_background(self):
+        if self._refresh_task and not self._refresh_task.done():
+            return
+
+        async def run():
+            try:
+                await self.refresh()
+            except Exception:
+                pass  # já logado; continua servindo a lista antiga
+
+        self._refresh_task = asyncio.create_task(run(), name="voice-catalog-refresh")
+
+    async def ensure_loaded(self):
+        """Stale-while-revalidate: only the very first load is awaited"""
+        if self._voices is None:
+            # Primeira carga: uma única chamada compartilhada por todos os requests que chegarem
+            self._refresh_in_background()
+            await asyncio.shield(self._refresh_task)
+            if self._voices is None:
+                raise RuntimeError(f"Voice catalogue unavailable: {self.last_error}")
+        elif time.monotonic() >= self._next_refresh:
+            self._refresh_in_background()
+
+    def _matches(self, entry, category: Optional[str], labels, language: Optional[str]) -> bool:
+        voice_category, voice_labels, voice_languages = entry
+        if category and voice_category != category:
+            return False
+        if language and language not in voice_languages and voice_labels.get('language') != language:
+            return False
+        for key, values in labels:
+            if key:
+                if voice_labels.get(key) not in values:
+                    return False
+            elif not any(value in values for value in voice_labels.values()):
+                return False
+        return True
+
+    def render(
+        self,
+        category: Optional[str] = None,
+        labels: Optional[Iterable[str]] = None,
+        language: Optional[str] = None
+    ) -> bytes:
+        """JSON body {"success": true, "voices": [...]} for a filter, rendered once per catalogue version"""
+        category = category.lower() if category else None
+        language = language.lower() if language else None
+        parsed_labels = _parse_labels(labels)
+        key = (category, parsed_labels, language)
+
+        body = self._rendered.get(key)
+        if body is None:
+            voices = [
+                voice for voice, entry in zip(self._voices, self._search)
+                if self._matches(entry, category, parsed_labels, language)
+            ]
+            body = json.dumps({"success": True, "voices": voices}, separators=(',', ':')).encode('utf-8')
+            if len(self._rendered) >= VOICE_CATALOG_MAX_FILTERS:
+                self._rendered.clear()
+            self._rendered[key] = body
+        return body
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "voices": len(self._voices) if self._voices is not None else None,
+            "etag": self.etag,
+            "loaded_at": self.loaded_at,
+            "age_seconds": round(time.time() - self.loaded_at, 1) if self.loaded_at else None,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "last_error": self.last_error
+        }
+
+
+# Instância global
+voice_catalog = VoiceCatalog()